@@ -0,0 +1,402 @@
+"""
+Multi-process cluster mode
+
+    python cluster.py                            # one worker per core, Discord's shard count
+    SHARD_COUNT=16 CLUSTER_WORKERS=4 python cluster.py
+
+The supervisor asks Discord for the recommended shard count (unless SHARD_COUNT is set),
+splits the shards into contiguous slices and runs one worker process per slice. Each worker
+is a normal MiniMeowth (an AutoShardedBot) that only connects its own shard_ids, so gateway
+and CPU load spread over the cores. `python main.py` still runs every shard in one process.
+
+Shared state:
+- the reference data snapshot and record stores are built once by the supervisor before any
+  worker starts; workers only read them (record stores are memory-mapped, so the OS shares
+  their pages between processes)
+- caches, metrics, profilers and the stall watchdog are per process; each worker's metrics
+  exporter listens on METRICS_PORT + cluster id
+- MongoDB is the only shared mutable state (migrations are lease-locked, slash commands are
+  synced by cluster 0 only)
+
+Workers send a stats heartbeat every STATS_INTERVAL. The supervisor restarts workers that exit,
+stop sending heartbeats or never become ready (with backoff), and writes the aggregated
+cluster stats to CLUSTER_STATS_PATH for the owner-only cluster command.
+"""
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+import urllib.request
+import config
+
+CLUSTER_STATS_PATH = 'logs/cluster_stats.json'
+GATEWAY_BOT_URL = 'https://discord.com/api/v10/gateway/bot'
+
+STATS_INTERVAL = 15          # Seconds between worker heartbeats
+HEARTBEAT_TIMEOUT = 90       # A ready worker silent this long is considered hung
+READY_TIMEOUT_BASE = 120     # Seconds a worker gets to become ready...
+READY_TIMEOUT_PER_SHARD = 10  # ...plus this per shard (identify is rate limited)
+SHUTDOWN_TIMEOUT = config.SHUTDOWN_DRAIN_SECONDS + 30  # Seconds a worker gets to exit after SIGTERM
+STABLE_AFTER = 300           # A worker up this long has its restart backoff reset
+RESTART_BACKOFF = (1, 2, 5, 10, 30, 60)
+
+
+# ===== SHARD PLANNING =====
+
+def fetch_recommended_shards(token: str) -> int:
+    """Discord's recommended shard count for this bot (GET /gateway/bot)"""
+    request = urllib.request.Request(GATEWAY_BOT_URL, headers={
+        'Authorization': f'Bot {token}',
+        'User-Agent': 'DiscordBot (https://github.com/Rapptz/discord.py, 2)'
+    })
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return int(json.load(response)['shards'])
+
+
+def plan_clusters(shard_count: int, workers: int):
+    """Split shard IDs into contiguous, evenly sized slices (one per worker)"""
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    slices = []
+    start = 0
+    for index in range(workers):
+        end = start + size + (1 if index < extra else 0)
+        slices.append(list(range(start, end)))
+        start = end
+    return slices
+
+
+def shard_env():
+    """(shard_ids, shard_count) for this process, or (None, None) outside a cluster worker"""
+    shard_ids = os.getenv('CLUSTER_SHARD_IDS')
+    if not shard_ids:
+        return None, None
+    return [int(shard) for shard in shard_ids.split(',')], int(os.environ['CLUSTER_SHARD_COUNT'])
+
+
+# ===== STATS =====
+
+def _memory_mb() -> float:
+    """Resident memory of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1048576
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Peak, in KiB on Linux
+
+
+def collect_stats(bot, cluster_id: int = 0) -> dict:
+    """This process's share of the cluster stats (JSON-serialisable)"""
+    import metrics
+
+    latencies = {}
+    for shard_id, latency in bot.latencies:
+        latencies[str(shard_id)] = round(latency * 1000, 1) if math.isfinite(latency) else None
+
+    lag = metrics.LOOP_LAG.summary()
+    watchdog = getattr(bot, 'stall_watchdog', None)
+    return {
+        'cluster_id': cluster_id,
+        'pid': os.getpid(),
+        'shard_ids': sorted(bot.shards) if getattr(bot, 'shards', None) else list(bot.shard_ids or [0]),
+        'ready': bot.is_ready(),
+        'guilds': len(bot.guilds),
+        'users': sum(guild.member_count or 0 for guild in bot.guilds),
+        'latency_ms': latencies,
+        'commands': sum(row[1] for row in metrics.COMMAND_LATENCY.summary()),
+        'loop_lag_p95_ms': round(lag[0][3] * 1000, 1) if lag else None,
+        'stalls': len(watchdog.stalls) if watchdog else 0,
+        'memory_mb': round(_memory_mb(), 1),
+        'sent_at': time.time(),
+    }
+
+
+def aggregate(workers) -> dict:
+    """Cluster totals from per-worker stats dicts"""
+    latencies = [ms for stats in workers for ms in stats.get('latency_ms', {}).values() if ms is not None]
+    return {
+        'workers': len(workers),
+        'ready': sum(1 for stats in workers if stats.get('ready')),
+        'shards': sum(len(stats.get('shard_ids', [])) for stats in workers),
+        'guilds': sum(stats.get('guilds', 0) for stats in workers),
+        'users': sum(stats.get('users', 0) for stats in workers),
+        'commands': sum(stats.get('commands', 0) for stats in workers),
+        'memory_mb': round(sum(stats.get('memory_mb', 0) for stats in workers), 1),
+        'max_latency_ms': max(latencies) if latencies else None,
+    }
+
+
+def read_cluster_stats(path: str = CLUSTER_STATS_PATH):
+    """Latest stats written by the supervisor, or None"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# ===== WORKER SIDE =====
+
+class ClusterLink:
+    """Worker side of the cluster: identity plus the stats heartbeat to the supervisor"""
+
+    def __init__(self, cluster_id: int, cluster_count: int, stats_queue):
+        self.cluster_id = cluster_id
+        self.cluster_count = cluster_count
+        self.stats_queue = stats_queue
+        self.task = None
+
+    def start(self, bot):
+        self.task = asyncio.create_task(self._report(bot))
+
+    def _send(self, bot):
+        try:
+            self.stats_queue.put_nowait(('stats', self.cluster_id, collect_stats(bot, self.cluster_id)))
+        except Exception as e:
+            print(f"⚠️ Could not report cluster stats: {e}")
+
+    async def _report(self, bot):
+        self._send(bot)  # Alive, still starting
+        await bot.wait_until_ready()
+        while True:
+            self._send(bot)
+            await asyncio.sleep(STATS_INTERVAL)
+
+
+def _worker_main(cluster_id: int, cluster_count: int, shard_ids, shard_count: int, stats_queue):
+    """Worker process entry point (spawned): run the bot for a slice of the shards"""
+    os.environ['CLUSTER_SHARD_IDS'] = ','.join(map(str, shard_ids))
+    os.environ['CLUSTER_SHARD_COUNT'] = str(shard_count)
+
+    import main
+    main.bot.cluster = ClusterLink(cluster_id, cluster_count, stats_queue)
+    print(f"🧩 Cluster {cluster_id} (pid {os.getpid()}): shards {shard_ids[0]}-{shard_ids[-1]} of {shard_count}")
+    main.run()
+
+
+def _prebuild_reference_data():
+    """Build the shared snapshot/record stores once (only if stale), before the workers read them"""
+    import reference_data
+    import record_store
+    start = time.perf_counter()
+    reference_data.load_reference_data()
+    for source_path in (reference_data.POKEDEX_JSON, reference_data.MOVESETS_JSON, reference_data.EVENT_POKEDEX_JSON):
+        record_store.open_store(source_path).close()
+    print(f"✅ Reference data prebuilt for the cluster in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+# ===== SUPERVISOR =====
+
+class _Worker:
+    """Supervisor-side state for one worker process"""
+
+    def __init__(self, cluster_id: int, shard_ids):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.process = None
+        self.started = 0.0
+        self.last_seen = 0.0
+        self.ready = False
+        self.stats = None
+        self.restarts = 0
+        self.failures = 0  # Consecutive short-lived runs (restart backoff index)
+        self.next_start = 0.0
+
+    @property
+    def ready_timeout(self) -> float:
+        return READY_TIMEOUT_BASE + READY_TIMEOUT_PER_SHARD * len(self.shard_ids)
+
+    @property
+    def status(self) -> str:
+        if self.process is None:
+            return 'restarting'
+        return 'ready' if self.ready else 'starting'
+
+
+class Supervisor:
+    """Starts one worker per shard slice, restarts them and aggregates their stats"""
+
+    def __init__(self, shard_count: int, slices):
+        self.shard_count = shard_count
+        self.workers = [_Worker(index, shard_ids) for index, shard_ids in enumerate(slices)]
+        self.context = multiprocessing.get_context('spawn')
+        self.stats_queue = self.context.Queue()
+        self.stopping = False
+        self.last_write = 0.0
+
+    def _on_signal(self, signum, frame):
+        if not self.stopping:
+            print(f"\n⚠️ Supervisor received signal {signum}, stopping workers...")
+        self.stopping = True
+
+    # ===== PROCESSES =====
+
+    def _start(self, worker):
+        worker.process = self.context.Process(
+            target=_worker_main,
+            args=(worker.cluster_id, len(self.workers), worker.shard_ids, self.shard_count, self.stats_queue),
+            name=f'minimeowth-cluster-{worker.cluster_id}'
+        )
+        worker.process.start()
+        worker.started = worker.last_seen = time.monotonic()
+        worker.ready = False
+        print(f"▶️ Started cluster {worker.cluster_id} (pid {worker.process.pid}, {len(worker.shard_ids)} shards)")
+
+    def _terminate(self, worker):
+        process = worker.process
+        if process is None:
+            return
+        if process.is_alive():
+            process.terminate()
+            process.join(SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                print(f"⚠️ Cluster {worker.cluster_id} ignored SIGTERM, killing it")
+                process.kill()
+        process.join()
+
+    def _schedule_restart(self, worker, reason: str):
+        now = time.monotonic()
+        if now - worker.started >= STABLE_AFTER:
+            worker.failures = 0
+        delay = RESTART_BACKOFF[min(worker.failures, len(RESTART_BACKOFF) - 1)]
+        worker.failures += 1
+        worker.restarts += 1
+        worker.process = None
+        worker.ready = False
+        worker.next_start = now + delay
+        print(f"🔁 Cluster {worker.cluster_id} {reason}, restarting in {delay}s (restart #{worker.restarts})")
+
+    def _check_workers(self):
+        if self.stopping:
+            return  # Workers exiting on Ctrl+C / SIGTERM are not restarted
+        now = time.monotonic()
+        for worker in self.workers:
+            if worker.process is None:
+                if now >= worker.next_start:
+                    self._start(worker)
+            elif not worker.process.is_alive():
+                self._schedule_restart(worker, f"exited with code {worker.process.exitcode}")
+            elif worker.ready and now - worker.last_seen > HEARTBEAT_TIMEOUT:
+                self._terminate(worker)
+                self._schedule_restart(worker, f"sent no heartbeat for {HEARTBEAT_TIMEOUT}s")
+            elif not worker.ready and now - worker.started > worker.ready_timeout:
+                self._terminate(worker)
+                self._schedule_restart(worker, f"was not ready after {worker.ready_timeout:.0f}s")
+
+    # ===== STATS =====
+
+    def _handle(self, message):
+        kind, cluster_id, stats = message
+        if kind != 'stats' or not 0 <= cluster_id < len(self.workers):
+            return
+        worker = self.workers[cluster_id]
+        if worker.process is None or stats.get('pid') != worker.process.pid:
+            return  # From a process that has since been replaced
+        worker.last_seen = time.monotonic()
+        worker.stats = stats
+        if stats.get('ready') and not worker.ready:
+            worker.ready = True
+            print(f"✅ Cluster {cluster_id} ready ({stats['guilds']} guilds) after "
+                  f"{worker.last_seen - worker.started:.0f}s")
+
+    def _drain(self, timeout: float):
+        """Handle queued stats messages, waiting up to timeout for the first one"""
+        try:
+            self._handle(self.stats_queue.get(timeout=timeout))
+            while True:
+                self._handle(self.stats_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+    def _write_stats(self):
+        workers = []
+        for worker in self.workers:
+            stats = dict(worker.stats or {'cluster_id': worker.cluster_id, 'shard_ids': worker.shard_ids})
+            stats['status'] = worker.status
+            stats['restarts'] = worker.restarts
+            workers.append(stats)
+
+        payload = {
+            'updated_at': time.time(),
+            'shard_count': self.shard_count,
+            'totals': aggregate([stats for stats in workers if stats['status'] != 'restarting']),
+            'workers': workers,
+        }
+        os.makedirs(os.path.dirname(CLUSTER_STATS_PATH), exist_ok=True)
+        tmp_path = f"{CLUSTER_STATS_PATH}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, CLUSTER_STATS_PATH)
+        self.last_write = time.monotonic()
+
+    # ===== MAIN LOOP =====
+
+    def _launch(self):
+        """Start workers one at a time: identify is rate limited per bot, not per process"""
+        for worker in self.workers:
+            if self.stopping:
+                return
+            self._start(worker)
+            deadline = worker.started + worker.ready_timeout
+            while not self.stopping and not worker.ready and time.monotonic() < deadline:
+                self._drain(timeout=1.0)
+                if not worker.process.is_alive():
+                    break  # The main loop restarts it
+            self._write_stats()
+
+    def run(self):
+        signal.signal(signal.SIGINT, self._on_signal)
+        signal.signal(signal.SIGTERM, self._on_signal)
+
+        print(f"🧩 Cluster: {self.shard_count} shards across {len(self.workers)} workers")
+        self._launch()
+        while not self.stopping:
+            self._drain(timeout=1.0)
+            self._check_workers()
+            if time.monotonic() - self.last_write >= STATS_INTERVAL:
+                self._write_stats()
+
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers:
+            self._terminate(worker)
+        self.stats_queue.close()
+        print("👋 Cluster stopped")
+
+
+def main():
+    token = os.getenv("DISCORD_TOKEN")
+    if not token:
+        print("❌ DISCORD_TOKEN not found in environment variables")
+        sys.exit(1)
+
+    shard_count = config.SHARD_COUNT
+    if not shard_count:
+        try:
+            shard_count = fetch_recommended_shards(token)
+        except Exception as e:
+            print(f"❌ Could not fetch the recommended shard count (set SHARD_COUNT): {e}")
+            sys.exit(1)
+
+    slices = plan_clusters(shard_count, config.CLUSTER_WORKERS or os.cpu_count() or 1)
+
+    # Build the read-only reference data once, in a throwaway process (keeps the supervisor small)
+    context = multiprocessing.get_context('spawn')
+    prebuild = context.Process(target=_prebuild_reference_data, name='minimeowth-prebuild')
+    prebuild.start()
+    prebuild.join()
+    if prebuild.exitcode != 0:
+        print("⚠️ Reference data prebuild failed; workers will build it themselves")
+
+    Supervisor(shard_count, slices).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import discord
+from discord.ext import commands
+import asyncio
+import time
+from datetime import datetime, timezone
+import config
+import reference_data
+import migrations
+import metrics
+import command_profiler
+import cluster
+from database import db
+
+# How often the reference data watcher checks source files for changes (seconds)
+REFERENCE_WATCH_INTERVAL = 10
+
+
+class Admin(commands.Cog):
+    """Owner-only maintenance commands"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.watch_task = None
+
+    async def cog_load(self):
+        self.watch_task = asyncio.create_task(self.watch_reference_data())
+
+    def cog_unload(self):
+        if self.watch_task:
+            self.watch_task.cancel()
+
+    # ===== REFERENCE DATA HOT RELOAD =====
+
+    async def watch_reference_data(self):
+        """Poll reference data sources and hot-reload when they change"""
+        while True:
+            await asyncio.sleep(REFERENCE_WATCH_INTERVAL)
+            try:
+                if reference_data.sources_changed():
+                    print("👀 Reference data sources changed, reloading...")
+                    await reference_data.reload_reference_data()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep serving the current generation; retried on the next change
+                print(f"❌ Reference data reload failed: {e}")
+                await asyncio.sleep(REFERENCE_WATCH_INTERVAL * 5)
+
+    @commands.hybrid_command(name='reloaddata', aliases=['rd'])
+    @commands.is_owner()
+    async def reload_data(self, ctx):
+        """Rebuild and hot-swap reference data (Owner only)"""
+        old_generation = reference_data.get_generation()
+        start = time.perf_counter()
+
+        try:
+            generation = await reference_data.reload_reference_data()
+        except Exception as e:
+            await ctx.send(f"❌ Reload failed, still on generation {old_generation}: {e}",
+                           reference=ctx.message, mention_author=False)
+            return
+
+        data = reference_data.load_reference_data()
+        embed = discord.Embed(title="🔄 Reference Data Reloaded", color=config.EMBED_COLOR)
+        embed.add_field(name="Generation", value=f"{old_generation} → {generation}", inline=True)
+        embed.add_field(name="Time", value=f"{(time.perf_counter() - start) * 1000:.0f}ms", inline=True)
+        embed.add_field(
+            name="Contents",
+            value=f"**Species:** {len(data['registry'])}\n"
+                  f"**Shiny Dex Forms:** {len(data['full_dex_entries'])}\n"
+                  f"**Event Pokemon:** {len(data['event_pokemon_list'])}\n"
+                  f"**Indexed Names:** {len(data['name_index'])}",
+            inline=False
+        )
+        await ctx.send(embed=embed, reference=ctx.message, mention_author=False)
+
+
+    # ===== SCHEMA / INDEXES =====
+
+    @commands.hybrid_command(name='indexstats', aliases=['indexes'])
+    @commands.is_owner()
+    async def index_stats(self, ctx):
+        """Index usage ($indexStats) and schema version (Owner only)"""
+        async with ctx.typing():
+            version = await db.get_meta(migrations.SCHEMA_VERSION_KEY, 0)
+            report = await migrations.index_usage_report(db)
+
+        status_icons = {'expected': '✅', 'retire': '🗑️', 'redundant': '⚠️', 'missing': '❌', 'unknown': '❔'}
+        embed = discord.Embed(
+            title="📇 Index Usage",
+            description=f"Schema version **{version}** (latest {migrations.latest_version()})",
+            color=config.EMBED_COLOR
+        )
+
+        by_collection = {}
+        for usage in report:
+            by_collection.setdefault(usage.collection, []).append(usage)
+
+        for collection_name, usages in by_collection.items():
+            lines = []
+            for usage in usages:
+                since = f" since {usage.since:%Y-%m-%d}" if usage.since else ""
+                lines.append(f"{status_icons[usage.status]} `{usage.name}` - {usage.ops:,} ops{since}")
+            embed.add_field(name=collection_name, value="\n".join(lines)[:1024], inline=False)
+
+        embed.set_footer(text="⚠️ redundant = prefix of another index | 🗑️ = dropped by a pending migration | ops reset on mongod restart")
+        await ctx.send(embed=embed, reference=ctx.message, mention_author=False)
+
+
+    # ===== METRICS =====
+
+    @staticmethod
+    def _latency_lines(histogram, limit: int = 8, sort_by_p95: bool = False):
+        """'name - n × p50/p95/p99' lines for a histogram's busiest (or slowest) series"""
+        rows = histogram.summary()
+        if sort_by_p95:
+            rows.sort(key=lambda row: row[3], reverse=True)
+        lines = []
+        for labels, count, p50, p95, p99, _ in rows[:limit]:
+            name = " ".join(str(label) for label in labels) or "all"
+            lines.append(f"`{name}` {count:,}× {p50 * 1000:.0f}/{p95 * 1000:.0f}/{p99 * 1000:.0f}ms")
+        return "\n".join(lines) or "No samples yet"
+
+    @commands.hybrid_command(name='metrics', aliases=['latency'])
+    @commands.is_owner()
+    async def metrics_summary(self, ctx):
+        """Latency percentiles and cache hit rates (Owner only)"""
+        embed = discord.Embed(
+            title="📈 Metrics (p50/p95/p99)",
+            description=f"Gateway latency: **{self.bot.latency * 1000:.0f}ms**",
+            color=config.EMBED_COLOR
+        )
+        embed.add_field(name="Commands (busiest)", value=self._latency_lines(metrics.COMMAND_LATENCY), inline=False)
+        embed.add_field(name="Database methods (slowest p95)",
+                        value=self._latency_lines(metrics.DB_METHOD_LATENCY, sort_by_p95=True), inline=False)
+        embed.add_field(name="Mongo commands", value=self._latency_lines(metrics.MONGO_COMMAND_LATENCY, 6), inline=False)
+        embed.add_field(name="Image renders", value=self._latency_lines(metrics.RENDER_LATENCY, 4), inline=True)
+        embed.add_field(name="HTTP fetches", value=self._latency_lines(metrics.HTTP_LATENCY, 4), inline=True)
+        embed.add_field(name="Event loop lag", value=self._latency_lines(metrics.LOOP_LAG, 1), inline=False)
+
+        cache_lines = []
+        for name, (hits, misses) in sorted(metrics.cache_stats().items()):
+            total = hits + misses
+            rate = f"{hits / total:.0%}" if total else "-"
+            cache_lines.append(f"`{name}` {rate} ({hits:,}/{total:,})")
+        embed.add_field(name="Cache hit rates", value="\n".join(cache_lines) or "No samples yet", inline=False)
+
+        errors = sorted(metrics.COMMAND_ERRORS.values.items(), key=lambda item: item[1], reverse=True)[:5]
+        if errors:
+            embed.add_field(
+                name="Command errors",
+                value="\n".join(f"`{labels[0]}` {count:,}" for labels, count in errors),
+                inline=False
+            )
+
+        if config.METRICS_PORT:
+            port = config.METRICS_PORT + (self.bot.cluster.cluster_id if self.bot.cluster else 0)
+            embed.set_footer(text=f"Prometheus: http://{config.METRICS_HOST}:{port}/metrics")
+        await ctx.send(embed=embed, reference=ctx.message, mention_author=False)
+
+
+    @commands.hybrid_command(name='stalls')
+    @commands.is_owner()
+    async def stalls(self, ctx, count: int = 10):
+        """Recent event loop stalls and where they happened (Owner only)"""
+        watchdog = getattr(self.bot, 'stall_watchdog', None)
+        if watchdog is None:
+            await ctx.send("❌ Stall watchdog is not running", reference=ctx.message, mention_author=False)
+            return
+
+        recent = watchdog.recent(max(1, min(count, 25)))
+        embed = discord.Embed(
+            title="🐢 Event Loop Stalls",
+            description=f"Threshold **{watchdog.threshold * 1000:.0f}ms** • {len(watchdog.stalls)} recorded",
+            color=config.EMBED_COLOR
+        )
+
+        if not recent:
+            embed.description += "\n\nNo stalls recorded ✅"
+        else:
+            lines = [
+                f"<t:{int(stall.when.timestamp())}:R> **{stall.duration * 1000:.0f}ms** `{stall.culprit}`"
+                for stall in recent
+            ]
+            embed.add_field(name="Recent", value="\n".join(lines)[:1024], inline=False)
+
+            # Full stack of the newest stall (innermost frame last)
+            stack = "\n".join(recent[0].stack)
+            embed.add_field(name=f"Latest stack (via {recent[0].entry})"[:256],
+                            value=f"```\n{stack[-1000:]}\n```", inline=False)
+
+        await ctx.send(embed=embed, reference=ctx.message, mention_author=False)
+
+
+    @commands.hybrid_command(name='profilecmd', aliases=['prof'])
+    @commands.is_owner()
+    async def profile_command(self, ctx, command: str = None, count: int = 1, mode: str = 'cprofile'):
+        """Profile the next N runs of a command: profilecmd <command> [count] [cprofile|sample] (Owner only)"""
+        profiler = self.bot.command_profiler
+
+        # No arguments: show what is armed
+        if command is None:
+            if not profiler.sessions:
+                await ctx.send("🔬 No commands armed for profiling", reference=ctx.message, mention_author=False)
+                return
+            lines = [f"`{name}` - {session.mode}, {session.remaining} run(s) left"
+                     for name, session in profiler.sessions.items()]
+            await ctx.send("🔬 Armed:\n" + "\n".join(lines), reference=ctx.message, mention_author=False)
+            return
+
+        if command.lower() == 'off':
+            disarmed = profiler.disarm()
+            await ctx.send(f"✅ Disarmed profiling for {disarmed} command(s)", reference=ctx.message, mention_author=False)
+            return
+
+        target = self.bot.get_command(command)
+        if target is None:
+            await ctx.send(f"❌ Unknown command `{command}`", reference=ctx.message, mention_author=False)
+            return
+
+        mode = mode.lower()
+        if mode not in command_profiler.MODES:
+            await ctx.send(f"❌ Mode must be one of: {', '.join(command_profiler.MODES)}",
+                           reference=ctx.message, mention_author=False)
+            return
+
+        count = max(1, min(count, 50))
+        profiler.arm(target.qualified_name, count, mode, ctx.channel, ctx.author.id)
+        await ctx.send(
+            f"🔬 Profiling the next **{count}** run(s) of `{target.qualified_name}` with **{mode}**. "
+            f"Summaries will be posted here.",
+            reference=ctx.message, mention_author=False
+        )
+
+
+    @commands.hybrid_command(name='slowqueries', aliases=['slowq'])
+    @commands.is_owner()
+    async def slow_queries(self, ctx, count: int = 10):
+        """Recent slow MongoDB queries with their plans (Owner only)"""
+        log = db.slow_queries
+        recent = log.recent(max(1, min(count, 15)))
+        embed = discord.Embed(
+            title="🐌 Slow Queries",
+            description=f"Threshold **{log.threshold * 1000:.0f}ms** • {len(log.entries)} recorded",
+            color=config.EMBED_COLOR
+        )
+
+        if not recent:
+            embed.description += "\n\nNo slow queries recorded ✅"
+
+        for entry in recent:
+            if entry.plan:
+                plan = f"`{entry.plan}`\nexamined {entry.docs_examined} docs / {entry.keys_examined} keys → {entry.returned}"
+                if "COLLSCAN" in entry.plan:
+                    plan = "⚠️ " + plan
+            else:
+                plan = "plan not captured (explained once per shape)"
+            embed.add_field(
+                name=f"{entry.duration * 1000:.0f}ms • {entry.method} • {entry.collection}.{entry.command}"[:256],
+                value=f"<t:{int(entry.when.timestamp())}:R>\n```{str(entry.shape)[:600]}```{plan}"[:1024],
+                inline=False
+            )
+
+        await ctx.send(embed=embed, reference=ctx.message, mention_author=False)
+
+
+    @commands.hybrid_command(name='cluster', aliases=['shards'])
+    @commands.is_owner()
+    async def cluster_stats(self, ctx):
+        """Cluster-wide guilds, shards and worker health (Owner only)"""
+        link = self.bot.cluster
+        snapshot = await asyncio.to_thread(cluster.read_cluster_stats) if link else None
+
+        if snapshot is None:
+            # Single process (or no supervisor stats yet): this process is the whole cluster
+            workers = [cluster.collect_stats(self.bot, link.cluster_id if link else 0)]
+            workers[0]['status'] = 'ready' if workers[0]['ready'] else 'starting'
+            workers[0]['restarts'] = 0
+            snapshot = {'updated_at': time.time(), 'shard_count': self.bot.shard_count or 1,
+                        'totals': cluster.aggregate(workers), 'workers': workers}
+
+        totals = snapshot['totals']
+        max_latency = f"{totals['max_latency_ms']:.0f}ms" if totals['max_latency_ms'] is not None else "-"
+        embed = discord.Embed(
+            title="🧩 Cluster",
+            description=(
+                f"**{totals['ready']}/{len(snapshot['workers'])}** workers ready • "
+                f"**{snapshot['shard_count']}** shards\n"
+                f"**{totals['guilds']:,}** guilds • **{totals['users']:,}** users • "
+                f"**{totals['commands']:,}** commands\n"
+                f"Memory **{totals['memory_mb']:,.0f} MB** • worst shard latency **{max_latency}**"
+            ),
+            color=config.EMBED_COLOR
+        )
+
+        status_icons = {'ready': '🟢', 'starting': '🟡', 'restarting': '🔴'}
+        lines = []
+        for worker in snapshot['workers']:
+            shard_ids = worker.get('shard_ids') or [0]
+            you = " ← this process" if link and worker.get('cluster_id') == link.cluster_id else ""
+            lines.append(
+                f"{status_icons.get(worker['status'], '⚪')} **#{worker.get('cluster_id', 0)}** "
+                f"shards {shard_ids[0]}-{shard_ids[-1]} • {worker.get('guilds', 0):,} guilds • "
+                f"{worker.get('memory_mb', 0):.0f} MB • {worker['restarts']} restarts{you}"
+            )
+        embed.add_field(name="Workers", value="\n".join(lines)[:1024], inline=False)
+        embed.set_footer(text="Updated")
+        embed.timestamp = datetime.fromtimestamp(snapshot['updated_at'], timezone.utc)
+        await ctx.send(embed=embed, reference=ctx.message, mention_author=False)
+
+
+
+async def setup(bot):
+    await bot.add_cog(Admin(bot))
@@ -176,28 +176,6 @@ class EventDexDisplay(commands.Cog):
 
         return show_caught, show_uncaught, order, region, types, name_searches, page
 
-    def matches_filters(self, pokemon_name: str, utils, region_filter: str, type_filters: list):
-        """Check if a Pokemon matches region and type filters"""
-        info = utils.get_pokemon_info(pokemon_name)
-
-        if not info:
-            return False
-
-        if region_filter:
-            if info['region'] != region_filter:
-                return False
-
-        if type_filters:
-            pokemon_types = [info['type1']]
-            if info['type2']:
-                pokemon_types.append(info['type2'])
-
-            for type_filter in type_filters:
-                if type_filter not in pokemon_types:
-                    return False
-
-        return True
-
     @commands.hybrid_command(name='eventdex', aliases=['ed'])
     @app_commands.describe(filters="Filters: --caught, --uncaught, --orderd, --ordera, --region, --type, --name, --page")
     async def event_dex(self, ctx, *, filters: str = None):
@@ -212,15 +190,12 @@ class EventDexDisplay(commands.Cog):
         # Parse filters
         show_caught, show_uncaught, order, region_filter, type_filters, name_searches, page = self.parse_filters(filters)
 
-        # Get user's event shinies
-        user_shinies = await db.get_all_event_shinies(user_id)
+        # Get user's event shiny counts, grouped by (name, gender) inside MongoDB
+        grouped_counts = await db.get_shiny_form_counts(user_id, event=True)
 
         # Build counts: (name, gender_key) -> count
         form_counts = {}
-        for shiny in user_shinies:
-            name = shiny['name']
-            gender = shiny['gender']
-
+        for (name, gender), count in grouped_counts.items():
             has_gender_diff = utils.has_gender_difference_event(name)
 
             if has_gender_diff and gender in ['male', 'female']:
@@ -228,27 +203,19 @@ class EventDexDisplay(commands.Cog):
             else:
                 key = (name, None)
 
-            if key not in form_counts:
-                form_counts[key] = 0
-            form_counts[key] += 1
+            form_counts[key] = form_counts.get(key, 0) + count
 
-        # Get all event forms from CSV
-        all_forms = utils.get_event_entries()
+        # Event forms filtered by bitset ANDs over the precomputed event dex view
+        dex_view = utils.dex_views['event']
+        mask = dex_view.select(
+            region=region_filter,
+            types=type_filters,
+            include=utils.name_search.matching_any(name_searches) if name_searches else None
+        )
 
-        # Build filtered list
+        # Build entry list with counts
         form_entries = []
-        for pokemon_name, has_gender_diff in all_forms:
-            # Apply name search filter
-            if name_searches:
-                matches_any = any(search.lower() in pokemon_name.lower() for search in name_searches)
-                if not matches_any:
-                    continue
-
-            # Apply region/type filters
-            if region_filter or type_filters:
-                if not self.matches_filters(pokemon_name, utils, region_filter, type_filters):
-                    continue
-
+        for pokemon_name, has_gender_diff in dex_view.gather(mask):
             if has_gender_diff:
                 # Add male and female entries
                 male_count = form_counts.get((pokemon_name, 'male'), 0)
@@ -211,11 +211,12 @@ class EventDexManagement(commands.Cog):
             start_time = asyncio.get_event_loop().time()
             last_update = start_time
 
-            while (asyncio.get_event_loop().time() - start_time) < timeout:
+            shutdown = self.bot.shutdown_coordinator
+            while (asyncio.get_event_loop().time() - start_time) < timeout and not shutdown.draining:
                 try:
                     remaining = timeout - (asyncio.get_event_loop().time() - start_time)
                     wait_time = min(remaining, 30.0)
-                    before, after = await self.bot.wait_for('message_edit', timeout=wait_time, check=check)
+                    before, after = await shutdown.wait_for('message_edit', timeout=wait_time, check=check)
 
                     embed = after.embeds[0]
                     page_shinies = []
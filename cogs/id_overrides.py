@@ -1,8 +1,10 @@
 import discord
 from discord.ext import commands
+import asyncio
 from discord import app_commands
 import config
 from database import db
+from id_intervals import parse_id_ranges, count_ids
 
 class IDOverrides(commands.Cog):
     """ID override management for selective breeding mode"""
@@ -18,40 +20,17 @@ class IDOverrides(commands.Cog):
         - Range: "1-10"
         - Mixed: "1-5 10 15-20"
 
-        Returns: list of integers
+        Returns: sorted list of merged inclusive (start, end) ranges
         """
-        ids = set()
-        parts = id_string.split()
-
-        for part in parts:
-            part = part.strip()
-            if not part:
-                continue
-
-            # Check if it's a range (e.g., "1-10")
-            if '-' in part:
-                try:
-                    start, end = part.split('-', 1)
-                    start = int(start.strip())
-                    end = int(end.strip())
-
-                    if start > end:
-                        start, end = end, start  # Swap if reversed
-
-                    if end - start > 10000:  # Prevent massive ranges
-                        continue
-
-                    ids.update(range(start, end + 1))
-                except (ValueError, AttributeError):
-                    continue
-            else:
-                # Single ID
-                try:
-                    ids.add(int(part))
-                except ValueError:
-                    continue
+        return parse_id_ranges(id_string)
 
-        return sorted(list(ids))
+    def format_ranges(self, ranges, limit: int = 10):
+        """Format (start, end, ...) ranges as `a-b` / `a`, truncated after limit entries"""
+        parts = [f"`{r[0]}`" if r[0] == r[1] else f"`{r[0]}-{r[1]}`" for r in ranges[:limit]]
+        text = ", ".join(parts)
+        if len(ranges) > limit:
+            text += f"\n... and {len(ranges) - limit} more"
+        return text
 
     @commands.hybrid_command(name='setnew')
     async def setnew_command(self, ctx, *, ids: str):
@@ -94,24 +73,32 @@ class IDOverrides(commands.Cog):
             await ctx.send("❌ Utils cog not loaded", reference=ctx.message, mention_author=False)
             return
 
-        # Parse IDs
-        pokemon_ids = self.parse_id_input(id_string)
+        # Parse IDs into merged ranges (a range costs one stored interval, whatever its size)
+        ranges = self.parse_id_input(id_string)
 
-        if not pokemon_ids:
+        if not ranges:
             await ctx.send("❌ No valid IDs found. Use format: `444 555 666` or `1-10`", reference=ctx.message, mention_author=False)
             return
 
-        if len(pokemon_ids) > 1000:
-            await ctx.send("❌ Too many IDs (max 1000 at once)", reference=ctx.message, mention_author=False)
+        if len(ranges) > 100:
+            await ctx.send("❌ Too many separate IDs/ranges (max 100 at once)", reference=ctx.message, mention_author=False)
             return
 
-        # === OPTIMIZATION: Set overrides and check inventory in parallel ===
-        set_task = db.set_id_overrides_bulk(user_id, pokemon_ids, category)
-        inventory_task = db.get_pokemon_by_ids_bulk(user_id, pokemon_ids)
+        total_ids = count_ids(ranges)
 
-        await set_task
-        inventory_pokemon = await inventory_task
-        inventory_ids = set(inventory_pokemon.keys())
+        # === OPTIMIZATION: Set overrides and count inventory matches in parallel ===
+        saved, inventory_count = await asyncio.gather(
+            db.set_id_override_ranges(user_id, ranges, category),
+            db.count_pokemon_in_id_ranges(user_id, ranges)
+        )
+
+        if not saved:
+            await ctx.send(
+                f"❌ Could not save overrides (limit is {config.MAX_ID_OVERRIDE_RANGES} separate ranges). "
+                f"Use `removeid` or `clearids` to tidy up first.",
+                reference=ctx.message, mention_author=False
+            )
+            return
 
         embed = discord.Embed(
             title=f"✅ Bulk ID Override Set: {category.upper()}",
@@ -120,39 +107,33 @@ class IDOverrides(commands.Cog):
 
         embed.add_field(
             name="Total IDs Set",
-            value=f"`{len(pokemon_ids)}` IDs",
+            value=f"`{total_ids}` IDs",
             inline=True
         )
 
         embed.add_field(
             name="In Your Inventory",
-            value=f"`{len(inventory_ids)}` IDs",
+            value=f"`{inventory_count}` IDs",
             inline=True
         )
 
         embed.add_field(
             name="Not in Inventory",
-            value=f"`{len(pokemon_ids) - len(inventory_ids)}` IDs",
+            value=f"`{total_ids - inventory_count}` IDs",
             inline=True
         )
 
-        # Show ID ranges/samples
-        if len(pokemon_ids) <= 20:
-            id_display = ", ".join(f"`{pid}`" for pid in pokemon_ids)
-        else:
-            first_ten = ", ".join(f"`{pid}`" for pid in pokemon_ids[:10])
-            id_display = f"{first_ten}\n... and {len(pokemon_ids) - 10} more"
-
+        # Show ID ranges
         embed.add_field(
             name="IDs Set",
-            value=id_display,
+            value=self.format_ranges(ranges),
             inline=False
         )
 
         embed.add_field(
             name="💡 Effect",
             value=(
-                f"In **selective mode**, these {len(pokemon_ids)} Pokemon will now be treated as **{category.upper()}**.\n"
+                f"In **selective mode**, these {total_ids} Pokemon will now be treated as **{category.upper()}**.\n"
                 f"They will pair with **{'NEW' if category == 'old' else 'OLD'}** IDs for optimal compatibility."
             ),
             inline=False
@@ -262,26 +243,22 @@ class IDOverrides(commands.Cog):
             await ctx.send("❌ Utils cog not loaded", reference=ctx.message, mention_author=False)
             return
 
-        # Parse IDs
-        pokemon_ids = self.parse_id_input(ids)
+        # Parse IDs into merged ranges
+        ranges = self.parse_id_input(ids)
 
-        if not pokemon_ids:
+        if not ranges:
             await ctx.send("❌ No valid IDs found. Use format: `444 555 666` or `1-10`", reference=ctx.message, mention_author=False)
             return
 
-        # Get current overrides
-        current_overrides = await db.get_id_overrides(user_id)
-
-        # Filter to only IDs that have overrides
-        ids_with_overrides = [pid for pid in pokemon_ids if pid in current_overrides]
+        # Remove overrides (splits any interval that only partly overlaps)
+        removed = await db.remove_id_override_ranges(user_id, ranges)
 
-        if not ids_with_overrides:
+        if not removed:
             await ctx.send(f"❌ None of the specified IDs have overrides set", reference=ctx.message, mention_author=False)
             return
 
-        # Remove overrides
-        for pid in ids_with_overrides:
-            await db.remove_id_override(user_id, pid)
+        total_ids = count_ids(ranges)
+        removed_ids = count_ids(removed)
 
         embed = discord.Embed(
             title="✅ ID Overrides Removed",
@@ -290,32 +267,26 @@ class IDOverrides(commands.Cog):
 
         embed.add_field(
             name="IDs Processed",
-            value=f"`{len(pokemon_ids)}` total",
+            value=f"`{total_ids}` total",
             inline=True
         )
 
         embed.add_field(
             name="Overrides Removed",
-            value=f"`{len(ids_with_overrides)}` IDs",
+            value=f"`{removed_ids}` IDs",
             inline=True
         )
 
         embed.add_field(
             name="No Override Found",
-            value=f"`{len(pokemon_ids) - len(ids_with_overrides)}` IDs",
+            value=f"`{total_ids - removed_ids}` IDs",
             inline=True
         )
 
         # Show which IDs were removed
-        if len(ids_with_overrides) <= 20:
-            id_display = ", ".join(f"`{pid}`" for pid in ids_with_overrides)
-        else:
-            first_ten = ", ".join(f"`{pid}`" for pid in ids_with_overrides[:10])
-            id_display = f"{first_ten}\n... and {len(ids_with_overrides) - 10} more"
-
         embed.add_field(
             name="Overrides Removed",
-            value=id_display,
+            value=self.format_ranges(removed),
             inline=False
         )
 
@@ -348,23 +319,27 @@ class IDOverrides(commands.Cog):
 
         embed = discord.Embed(
             title="📋 Your ID Overrides",
-            description=f"Total: {len(overrides)} override(s)",
+            description=f"Total: {overrides.id_count()} ID(s) in {len(overrides)} range(s)",
             color=config.EMBED_COLOR
         )
 
+        intervals = list(overrides)
+
+        # Names for single-ID overrides shown below (one bulk query)
+        single_ids = [start for start, end, _ in intervals if start == end]
+        pokemon_by_id = await db.get_pokemon_by_ids_bulk(user_id, single_ids[:40])
+
         # Group by category
         old_ids = []
         new_ids = []
 
-        for pid, cat in sorted(overrides.items()):
-            # Try to get Pokemon name
-            pokemon = await db.get_pokemon_by_id(user_id, pid)
-            name = pokemon['name'] if pokemon else "Unknown"
-
-            # Get default category
-            default_cat = utils.categorize_id(pid)
-
-            entry = f"`{pid}` - {name} (was `{default_cat.upper()}`)"
+        for start, end, cat in intervals:
+            if start == end:
+                pokemon = pokemon_by_id.get(start)
+                name = pokemon['name'] if pokemon else "Unknown"
+                entry = f"`{start}` - {name} (was `{utils.categorize_id(start).upper()}`)"
+            else:
+                entry = f"`{start}-{end}` - {end - start + 1} IDs"
 
             if cat == 'old':
                 old_ids.append(entry)
@@ -431,11 +406,9 @@ class IDOverrides(commands.Cog):
         # Get default categorization
         default_cat = utils.categorize_id(pokemon_id)
 
-        # Get override if exists
-        override = await db.get_id_override(user_id, pokemon_id)
-
-        # Get actual category (with override applied)
+        # Get override if exists, and the actual category (with override applied)
         overrides = await db.get_id_overrides(user_id)
+        override = overrides.get(pokemon_id)
         actual_cat = utils.categorize_id(pokemon_id, overrides)
 
         # Try to get Pokemon info
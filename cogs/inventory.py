@@ -5,18 +5,97 @@ import asyncio
 import config
 from database import db
 
+INVENTORY_PER_PAGE = 20
+
+
+class InventoryPaginator:
+    """
+    Cursor-backed inventory pages using keyset pagination
+    Only a few pages are kept in memory; the next page is prefetched in the background
+    """
+
+    MAX_CACHED_PAGES = 3
+
+    def __init__(self, query: dict, total: int, per_page: int = INVENTORY_PER_PAGE):
+        self.query = query
+        self.total = total
+        self.per_page = per_page
+        self.total_pages = max(1, (total + per_page - 1) // per_page)
+        self.page_keys = {0: None}  # page index -> keyset start (last row of previous page)
+        self.page_cache = {}  # page index -> rows
+        self.prefetch_task = None
+
+    async def _fetch(self, index: int):
+        """
+        Fetch a page from MongoDB (walking forward from the nearest known key)
+        Stops early when the inventory turns out shorter than counted; returns [] past the end
+        """
+        known = max(i for i in self.page_keys if i <= index)
+        rows = []
+        for page in range(known, index + 1):
+            if page >= self.total_pages or page not in self.page_keys:
+                return []
+            rows = self.page_cache.get(page)
+            if rows is None:
+                rows = await db.get_pokemon_page(self.query, self.page_keys[page], self.per_page)
+                self._store(page, rows)
+        return rows
+
+    def _store(self, index: int, rows: list):
+        """Cache a page and remember where the next one starts (a short page is the last one)"""
+        if len(rows) < self.per_page:
+            # Pokemon were released/traded while browsing: clamp to what is actually left
+            self.total = index * self.per_page + len(rows)
+            self.total_pages = max(1, index + 1 if rows else index)
+            for page in [page for page in self.page_keys if page > index]:
+                del self.page_keys[page]
+            for page in [page for page in self.page_cache if page > index]:
+                del self.page_cache[page]
+        else:
+            last = rows[-1]
+            self.page_keys[index + 1] = (last['iv_percent'], last['pokemon_id'])
+        self.page_cache[index] = rows
+        while len(self.page_cache) > self.MAX_CACHED_PAGES:
+            # Evict the page furthest from the one just loaded
+            far = max(self.page_cache, key=lambda page: abs(page - index))
+            del self.page_cache[far]
+
+    async def get_page(self, index: int):
+        """Get rows for a page, then prefetch the following page"""
+        if index not in self.page_cache and self.prefetch_task and not self.prefetch_task.done():
+            try:
+                await self.prefetch_task
+            except Exception:
+                pass  # Fall through and fetch the page directly
+
+        rows = self.page_cache.get(index)
+        if rows is None:
+            rows = await self._fetch(index)
+
+        if index + 1 < self.total_pages and index + 1 not in self.page_cache:
+            if not self.prefetch_task or self.prefetch_task.done():
+                self.prefetch_task = asyncio.create_task(self._fetch(index + 1))
+
+        return rows
+
+    def close(self):
+        """Cancel any pending prefetch and drop cached pages"""
+        if self.prefetch_task and not self.prefetch_task.done():
+            self.prefetch_task.cancel()
+        self.page_cache.clear()
+
+
 class InventoryView(discord.ui.View):
     """View with pagination buttons and inventory dropdown"""
 
-    def __init__(self, ctx, category: str, category_name: str, filters_str: str, pokemon_list, cooldowns, pages, timeout=180):
+    def __init__(self, ctx, category: str, category_name: str, filters_str: str, paginator, cooldowns, timeout=180):
         super().__init__(timeout=timeout)
         self.ctx = ctx
         self.category = category
         self.category_name = category_name
         self.filters_str = filters_str
-        self.pokemon_list = pokemon_list
+        self.paginator = paginator
         self.cooldowns = cooldowns
-        self.pages = pages
         self.current_page = 0
         self.message = None
         self.update_buttons()
@@ -24,22 +103,29 @@ class InventoryView(discord.ui.View):
     def update_buttons(self):
         """Enable/disable buttons based on current page"""
         self.previous_button.disabled = (self.current_page == 0)
-        self.next_button.disabled = (self.current_page >= len(self.pages) - 1)
+        self.next_button.disabled = (self.current_page >= self.paginator.total_pages - 1)
 
-    def create_embed(self):
-        """Create embed for current page"""
+    async def create_embed(self):
+        """Create embed for current page (fetched on demand)"""
         title = f"Your {self.category_name} Pokémon Inventory"
         embed = discord.Embed(title=title, color=config.EMBED_COLOR)
 
+        rows = await self.paginator.get_page(self.current_page)
+        if self.current_page >= self.paginator.total_pages:
+            # The inventory shrank while browsing: show the new last page
+            self.current_page = self.paginator.total_pages - 1
+            rows = await self.paginator.get_page(self.current_page)
+        self.update_buttons()
+
         lines = []
-        for p in self.pages[self.current_page]:
+        for p in rows:
             cd = "🔒" if p['pokemon_id'] in self.cooldowns else ""
             g = config.GENDER_MALE if p['gender'] == 'male' else config.GENDER_FEMALE if p['gender'] == 'female' else config.GENDER_UNKNOWN
             lines.append(f"`{p['pokemon_id']}` {cd} **{p['name']}** {g} • {p['iv_percent']}% IV")
 
         embed.description = "\n".join(lines)
 
-        footer = [f"Page {self.current_page + 1}/{len(self.pages)}", f"Total: {len(self.pokemon_list)} Pokémon"]
+        footer = [f"Page {self.current_page + 1}/{self.paginator.total_pages}", f"Total: {self.paginator.total} Pokémon"]
         embed.set_footer(text=" • ".join(footer))
         return embed
 
@@ -51,7 +137,7 @@ class InventoryView(discord.ui.View):
         if self.current_page > 0:
             self.current_page -= 1
             self.update_buttons()
-            await interaction.response.edit_message(embed=self.create_embed(), view=self)
+            await interaction.response.edit_message(embed=await self.create_embed(), view=self)
         else:
             await interaction.response.defer()
 
@@ -60,10 +146,10 @@ class InventoryView(discord.ui.View):
         if interaction.user.id != self.ctx.author.id:
             await interaction.response.send_message("❌ This is not your inventory!", ephemeral=True)
             return
-        if self.current_page < len(self.pages) - 1:
+        if self.current_page < self.paginator.total_pages - 1:
             self.current_page += 1
             self.update_buttons()
-            await interaction.response.edit_message(embed=self.create_embed(), view=self)
+            await interaction.response.edit_message(embed=await self.create_embed(), view=self)
         else:
             await interaction.response.defer()
 
@@ -93,6 +179,7 @@ class InventoryView(discord.ui.View):
             await inv_cog._reload_inventory_view(interaction, self.ctx, new_cat, new_name, self.filters_str, self.message)
 
     async def on_timeout(self):
+        self.paginator.close()
         if self.message:
             try:
                 for item in self.children:
@@ -198,11 +285,13 @@ class Inventory(commands.Cog):
             start_time = asyncio.get_event_loop().time()
             last_update = start_time
 
-            while (asyncio.get_event_loop().time() - start_time) < timeout:
+            # Stop waiting for pages once the bot starts shutting down
+            shutdown = self.bot.shutdown_coordinator
+            while (asyncio.get_event_loop().time() - start_time) < timeout and not shutdown.draining:
                 try:
                     remaining = timeout - (asyncio.get_event_loop().time() - start_time)
                     wait_time = min(remaining, 30.0)
-                    before, after = await self.bot.wait_for('message_edit', timeout=wait_time, check=check)
+                    before, after = await shutdown.wait_for('message_edit', timeout=wait_time, check=check)
 
                     embed = after.embeds[0]
                     page_pokemon = []
@@ -519,35 +608,35 @@ class Inventory(commands.Cog):
         if regional_filter:
             db_filters['is_regional'] = True
 
-        pokemon_list, cooldowns = await asyncio.gather(
-            db.get_pokemon(user_id, db_filters, category),
-            db.get_cooldowns(user_id)
-        )
-
-        if name_filters:
-            pokemon_list = [
-                p for p in pokemon_list 
-                if any(name.lower() in p['name'].lower() for name in name_filters)
-            ]
+        paginator, cooldowns = await self._open_paginator(user_id, category, db_filters, name_filters, cooldown_filter)
 
-        if cooldown_filter is not None:
-            if cooldown_filter:
-                pokemon_list = [p for p in pokemon_list if p['pokemon_id'] in cooldowns]
-            else:
-                pokemon_list = [p for p in pokemon_list if p['pokemon_id'] not in cooldowns]
-
-        if not pokemon_list:
+        if paginator is None:
             await ctx.send(f"❌ No Pokemon found in {category_name} inventory", reference=ctx.message, mention_author=False)
             return
 
-        pokemon_list.sort(key=lambda x: x['iv_percent'], reverse=True)
-        per_page = 20
-        pages = [pokemon_list[i:i + per_page] for i in range(0, len(pokemon_list), per_page)]
-
-        view = InventoryView(ctx, category, category_name, filters_str, pokemon_list, cooldowns, pages)
-        message = await ctx.send(embed=view.create_embed(), view=view, reference=ctx.message, mention_author=False)
+        view = InventoryView(ctx, category, category_name, filters_str, paginator, cooldowns)
+        message = await ctx.send(embed=await view.create_embed(), view=view, reference=ctx.message, mention_author=False)
         view.message = message
 
+    async def _open_paginator(self, user_id: int, category: str, db_filters: dict, name_filters: list, cooldown_filter):
+        """
+        Count matching Pokemon and prepare a keyset paginator
+        Returns (None, cooldowns) when nothing matches
+        """
+        cooldowns = await db.get_cooldowns(user_id)
+        query = db.build_inventory_query(
+            user_id, category, db_filters,
+            name_filters=name_filters,
+            cooldown_ids=cooldowns.keys(),
+            on_cooldown=cooldown_filter
+        )
+
+        total = await db.count_inventory(query)
+        if not total:
+            return None, cooldowns
+
+        return InventoryPaginator(query, total), cooldowns
+
     async def _reload_inventory_view(self, interaction, ctx, category: str, category_name: str, filters_str: str, message):
         user_id = ctx.author.id
         args = filters_str.split() if filters_str else []
@@ -588,55 +677,26 @@ class Inventory(commands.Cog):
         if regional_filter:
             db_filters['is_regional'] = True
 
-        pokemon_list, cooldowns = await asyncio.gather(
-            db.get_pokemon(user_id, db_filters, category),
-            db.get_cooldowns(user_id)
-        )
-
-        if name_filters:
-            pokemon_list = [
-                p for p in pokemon_list 
-                if any(name.lower() in p['name'].lower() for name in name_filters)
-            ]
-
-        if cooldown_filter is not None:
-            if cooldown_filter:
-                pokemon_list = [p for p in pokemon_list if p['pokemon_id'] in cooldowns]
-            else:
-                pokemon_list = [p for p in pokemon_list if p['pokemon_id'] not in cooldowns]
+        paginator, cooldowns = await self._open_paginator(user_id, category, db_filters, name_filters, cooldown_filter)
 
-        if not pokemon_list:
+        if paginator is None:
             await interaction.followup.send(f"❌ No Pokemon in {category_name} inventory", ephemeral=True)
             return
 
-        pokemon_list.sort(key=lambda x: x['iv_percent'], reverse=True)
-        pages = [pokemon_list[i:i + 20] for i in range(0, len(pokemon_list), 20)]
-
-        view = InventoryView(ctx, category, category_name, filters_str, pokemon_list, cooldowns, pages)
+        view = InventoryView(ctx, category, category_name, filters_str, paginator, cooldowns)
         view.message = message
-        await message.edit(embed=view.create_embed(), view=view)
+        await message.edit(embed=await view.create_embed(), view=view)
 
     @commands.hybrid_command(name='stats')
     async def inventory_stats(self, ctx):
         user_id = ctx.author.id
-        total_normal, total_tripmax, total_tripzero, total, males, females, unknown, gmax_count, cooldowns = await asyncio.gather(
-            db.count_pokemon(user_id, category=config.NORMAL_CATEGORY),
-            db.count_pokemon(user_id, category=config.TRIPMAX_CATEGORY),
-            db.count_pokemon(user_id, category=config.TRIPZERO_CATEGORY),
-            db.count_pokemon(user_id),
-            db.count_pokemon(user_id, {'gender': 'male'}),
-            db.count_pokemon(user_id, {'gender': 'female'}),
-            db.count_pokemon(user_id, {'gender': 'unknown'}),
-            db.count_pokemon(user_id, {'is_gmax': True}),
-            db.get_cooldowns(user_id)
-        )
+        stats = await db.get_inventory_stats(user_id)
 
-        on_cooldown = len(cooldowns)
         embed = discord.Embed(title="📊 Inventory Statistics", color=config.EMBED_COLOR)
-        embed.add_field(name="📦 Inventories", value=f"**Normal:** {total_normal}\n**TripMax:** {total_tripmax}\n**TripZero:** {total_tripzero}\n**Total Unique:** {total}", inline=True)
-        embed.add_field(name="⏱️ Availability", value=f"**On Cooldown:** {on_cooldown}\n**Available:** {total - on_cooldown}", inline=True)
-        embed.add_field(name="⚥ Genders", value=f"{config.GENDER_MALE} **Males:** {males}\n{config.GENDER_FEMALE} **Females:** {females}\n{config.GENDER_UNKNOWN} **Unknown:** {unknown}", inline=True)
-        embed.add_field(name="<:gigantamax:1420708122267226202> Gigantamax", value=f"**{gmax_count}**", inline=True)
+        embed.add_field(name="📦 Inventories", value=f"**Normal:** {stats.normal}\n**TripMax:** {stats.tripmax}\n**TripZero:** {stats.tripzero}\n**Total Unique:** {stats.total}", inline=True)
+        embed.add_field(name="⏱️ Availability", value=f"**On Cooldown:** {stats.on_cooldown}\n**Available:** {stats.total - stats.on_cooldown}", inline=True)
+        embed.add_field(name="⚥ Genders", value=f"{config.GENDER_MALE} **Males:** {stats.males}\n{config.GENDER_FEMALE} **Females:** {stats.females}\n{config.GENDER_UNKNOWN} **Unknown:** {stats.unknown}", inline=True)
+        embed.add_field(name="<:gigantamax:1420708122267226202> Gigantamax", value=f"**{stats.gmax}**", inline=True)
         await ctx.send(embed=embed, reference=ctx.message, mention_author=False)
 
 async def setup(bot):
@@ -1,9 +1,8 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
 import config
-import unicodedata
+import reference_data
 
 class PokedexView(discord.ui.View):
     """View with shiny toggle, gender toggle, form dropdowns, and navigation buttons"""
@@ -609,17 +608,8 @@ class PokedexView(discord.ui.View):
             # Import db here to avoid circular imports
             from database import db
 
-            # Get all user's shinies
-            all_shinies = await db.get_all_shinies(user_id)
-
-            # Count shinies matching this exact Pokemon name
-            if gender_filter:
-                # For gender difference Pokemon, count only matching gender
-                count = sum(1 for shiny in all_shinies 
-                           if shiny['name'] == pokemon_name and shiny['gender'] == gender_filter)
-            else:
-                # For non-gender difference Pokemon, count all
-                count = sum(1 for shiny in all_shinies if shiny['name'] == pokemon_name)
+            # Indexed count, cached briefly per user while browsing
+            count = await db.count_shinies_by_name(user_id, pokemon_name, gender_filter)
 
             return count
         except Exception as e:
@@ -699,56 +689,32 @@ class Pokedex(commands.Cog):
         self.pokemon_data = {}
         self.name_index = {}  # Maps all possible names to form keys
         self.dex_number_forms = {}  # Maps dex numbers to list of (form_key, form_name)
+        self.name_search = None  # Shared trigram index for "did you mean" suggestions
+        self.load_pokemon_data()
+        reference_data.add_reload_listener(self._on_reference_reload)
+
+    def cog_unload(self):
+        reference_data.remove_reload_listener(self._on_reference_reload)
+
+    def _on_reference_reload(self, generation, data):
+        """Rebind name index and dex mapping to a new reference data generation"""
         self.load_pokemon_data()
 
     def normalize_name(self, name):
         """Remove accents and normalize name for searching"""
-        # Normalize unicode characters (NFD = decompose accents)
-        normalized = unicodedata.normalize('NFD', name)
-        # Remove accent marks (combining characters)
-        without_accents = ''.join(char for char in normalized if unicodedata.category(char) != 'Mn')
-        return without_accents.lower().strip()
+        return reference_data.normalize_name(name)
 
     def load_pokemon_data(self):
-        """Load Pokemon data from JSON file"""
-        try:
-            with open('alldata/pokemon_data.json', 'r', encoding='utf-8') as f:
-                self.pokemon_data = json.load(f)
-
-            # Build name index and dex number mapping
-            for form_key, data in self.pokemon_data.items():
-                dex_num = data.get('dex_number', '0')
-                pokemon_name = data.get('name', '')
-
-                # Add to dex number forms mapping
-                if dex_num not in self.dex_number_forms:
-                    self.dex_number_forms[dex_num] = []
-                self.dex_number_forms[dex_num].append((form_key, pokemon_name))
-
-                # Index primary name (with and without accents)
-                if pokemon_name:
-                    self.name_index[pokemon_name.lower()] = form_key
-                    normalized = self.normalize_name(pokemon_name)
-                    self.name_index[normalized] = form_key
-
-                # Index all alternate names (with and without accents)
-                if 'names' in data:
-                    for lang, names in data['names'].items():
-                        if isinstance(names, list):
-                            for name in names:
-                                self.name_index[name.lower()] = form_key
-                                normalized = self.normalize_name(name)
-                                self.name_index[normalized] = form_key
-                        else:
-                            self.name_index[names.lower()] = form_key
-                            normalized = self.normalize_name(names)
-                            self.name_index[normalized] = form_key
-
-            print(f"✅ Loaded {len(self.pokemon_data)} Pokemon entries")
-            print(f"✅ Indexed {len(self.name_index)} Pokemon names")
-            print(f"✅ Mapped {len(self.dex_number_forms)} unique dex numbers")
-        except Exception as e:
-            print(f"❌ Error loading alldata/pokemon_data.json: {e}")
+        """Load Pokemon data and its prebuilt name/dex indexes from the reference snapshot"""
+        data = reference_data.load_reference_data()
+        self.pokemon_data = reference_data.get_pokedex()  # Lazy, memory-mapped
+        self.name_index = data['name_index']
+        self.dex_number_forms = data['dex_number_forms']
+        self.name_search = data['name_search']
+
+        print(f"✅ Loaded {len(self.pokemon_data)} Pokemon entries")
+        print(f"✅ Indexed {len(self.name_index)} Pokemon names")
+        print(f"✅ Mapped {len(self.dex_number_forms)} unique dex numbers")
 
     @commands.hybrid_command(name='pokedex', aliases=['d', 'dex'])
     @app_commands.describe(pokemon="Name or dex number (e.g., 'bulbasaur' or '#1') of the Pokemon to look up")
@@ -788,7 +754,11 @@ class Pokedex(commands.Cog):
                 form_key = self.name_index.get(normalized)
 
         if not form_key:
-            await ctx.send(f"❌ Pokemon `{pokemon}` not found in Pokedex", reference=ctx.message, mention_author=False)
+            suggestions = self.name_search.fuzzy(pokemon, limit=3)
+            message = f"❌ Pokemon `{pokemon}` not found in Pokedex"
+            if suggestions:
+                message += f"\nDid you mean: {', '.join(f'**{name}**' for name, _ in suggestions)}?"
+            await ctx.send(message, reference=ctx.message, mention_author=False)
             return
 
         if form_key not in self.pokemon_data:
@@ -3,11 +3,11 @@ from discord.ext import commands
 from discord import app_commands
 import asyncio
 import re
-import os
 import io
 from datetime import datetime
 from typing import List
 from config import EMBED_COLOR, POKETWO_BOT_ID
+import reference_data
 
 # Global variables to track active commands
 pokemon_lists = {}
@@ -21,25 +21,28 @@ class PokemonListTools(commands.Cog):
         self.bot = bot
         # Load Pokemon names from file
         self.pokemon_names = self._load_pokemon_names()
+        reference_data.add_reload_listener(self._on_reference_reload)
+        # Only edits of monitored createlist messages reach on_list_message_edit
+        bot.message_dispatch.watch_edits(self.on_list_message_edit, messages=monitored_messages)
 
-    # ==================== Pokemon Name Loading ====================
+    def cog_unload(self):
+        reference_data.remove_reload_listener(self._on_reference_reload)
+        self.bot.message_dispatch.remove_handlers(self)
 
-    def _load_pokemon_names(self):
-        """Load Pokemon names from pokemonnames.txt"""
-        try:
-            pokemon_file = 'data/pokemonnames.txt'
-            if not os.path.exists(pokemon_file):
-                print(f"Warning: {pokemon_file} not found. Pokemon extraction will not work.")
-                return []
+    def _on_reference_reload(self, generation, data):
+        """Pick up the name list of a new reference data generation"""
+        self.pokemon_names = self._load_pokemon_names()
 
-            with open(pokemon_file, 'r', encoding='utf-8') as f:
-                names = [line.strip() for line in f if line.strip()]
+    # ==================== Pokemon Name Loading ====================
 
+    def _load_pokemon_names(self):
+        """Pokemon names (data/pokemonnames.txt order) from the shared species registry"""
+        names = list(reference_data.get_registry().listed_names)
+        if not names:
+            print("Warning: data/pokemonnames.txt not found. Pokemon extraction will not work.")
+        else:
             print(f"Loaded {len(names)} Pokemon names")
-            return names
-        except Exception as e:
-            print(f"Error loading Pokemon names: {e}")
-            return []
+        return names
 
     def _normalize_pokemon_name(self, name):
         """
@@ -160,9 +163,8 @@ class PokemonListTools(commands.Cog):
 
     # ==================== Event Listeners ====================
 
-    @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        """Handle message edits to update Pokemon lists"""
+    async def on_list_message_edit(self, before, after):
+        """Handle message edits to update Pokemon lists (dispatched for monitored messages only)"""
         message_id = after.id
 
         # Handle createlist monitoring
@@ -2,20 +2,16 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import io
-import unicodedata
+import re
 import config
 from config import EMBED_COLOR
 from database import db
-from filters import get_filter, get_all_filter_names
+import filters
+from filter_engine import FilterError, RESERVED_WORDS
 from smartlist_utils import build_smartlist_sections
 from dex_image_generator import DexImageGenerator
 
 
-def normalize_string(s):
-    """Remove accents from string for comparison"""
-    return ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn')
-
-
 class ShinyDexView(discord.ui.View):
     """Pagination view for shiny dex"""
 
@@ -232,41 +228,21 @@ class ShinyDexDisplay(commands.Cog):
 
         return show_caught, show_uncaught, order, region, types, name_searches, page, show_list, show_smartlist, ignore_gender, exclude_names, show_image, ignore_male, ignore_female
 
-    def matches_filters(self, pokemon_name: str, utils, region_filter: str, type_filters: list):
-        """Check if a Pokemon matches region and type filters"""
-        info = utils.get_pokemon_info(pokemon_name)
-
-        if not info:
-            return False
-
-        if region_filter:
-            if info['region'] != region_filter:
-                return False
-
-        if type_filters:
-            pokemon_types = [info['type1']]
-            if info['type2']:
-                pokemon_types.append(info['type2'])
-
-            for type_filter in type_filters:
-                if type_filter not in pokemon_types:
-                    return False
-
-        return True
-
-    def is_excluded(self, pokemon_name: str, exclude_names: list):
-        """Check if a Pokemon should be excluded based on exclude filters"""
-        if not exclude_names:
-            return False
-
-        normalized_pokemon = normalize_string(pokemon_name.lower())
-
-        for exclude_name in exclude_names:
-            normalized_exclude = normalize_string(exclude_name.lower())
-            if normalized_exclude in normalized_pokemon:
-                return True
-
-        return False
+    def select_entries(self, dex_view, utils, region_filter: str, type_filters: list,
+                       name_searches: list = None, exclude_names: list = None, within: int = None):
+        """
+        Entries of a precomputed dex view matching region/type/name/exclude filters
+        Region and type are bitset lookups; names resolve through the shared search index
+        within: optional starting bitset (compiled filter expression)
+        """
+        mask = dex_view.select(
+            region=region_filter,
+            types=type_filters,
+            include=utils.name_search.matching_any(name_searches) if name_searches else None,
+            exclude=utils.name_search.matching_any(exclude_names) if exclude_names else None,
+            within=within
+        )
+        return dex_view.gather(mask)
 
     async def send_pokemon_list_simple(self, ctx, pokemon_names: list):
         """Send simple Pokemon names as --n formatted list (text or file)"""
@@ -375,41 +351,14 @@ class ShinyDexDisplay(commands.Cog):
             await ctx.send("❌ Cannot use --image with --list or --smartlist!", reference=ctx.message, mention_author=False)
             return
 
-        # Get user's shinies
-        user_shinies = await db.get_all_shinies(user_id)
-
-        # Build dex number -> count map (count ALL shinies with that dex number)
-        dex_counts = {}
-        for shiny in user_shinies:
-            dex_num = shiny['dex_number']
-            if dex_num not in dex_counts:
-                dex_counts[dex_num] = 0
-            dex_counts[dex_num] += 1
-
-        # Get all dex entries from CSV (one per dex number - the first/top one)
-        all_dex_entries = utils.get_basic_dex_entries()
-
-        # Build filtered list
-        dex_entries = []
-        for dex_num, pokemon_name in all_dex_entries:
-            # Apply exclude filter first
-            if self.is_excluded(pokemon_name, exclude_names):
-                continue
-
-            # Apply name search filter with accent-insensitive matching
-            if name_searches:
-                normalized_pokemon = normalize_string(pokemon_name.lower())
-                matches_any = any(normalize_string(search.lower()) in normalized_pokemon for search in name_searches)
-                if not matches_any:
-                    continue
+        # Dex number -> count map (ALL shinies with that dex number) from the summary document
+        summary = await db.get_shiny_summary(user_id)
+        dex_counts = summary['by_dex']
 
-            # Apply region/type filters
-            if region_filter or type_filters:
-                if not self.matches_filters(pokemon_name, utils, region_filter, type_filters):
-                    continue
-
-            count = dex_counts.get(dex_num, 0)
-            dex_entries.append((dex_num, pokemon_name, count))
+        # Basic dex entries (one per dex number - the first/top one), filtered by bitsets
+        selected = self.select_entries(utils.dex_views['basic'], utils, region_filter, type_filters,
+                                       name_searches, exclude_names)
+        dex_entries = [(dex_num, pokemon_name, dex_counts.get(dex_num, 0)) for dex_num, pokemon_name in selected]
 
         # Apply caught/uncaught filters
         filtered_entries = []
@@ -517,61 +466,38 @@ class ShinyDexDisplay(commands.Cog):
             await ctx.send("❌ Cannot use --image with --list or --smartlist!", reference=ctx.message, mention_author=False)
             return
 
-        # Get user's shinies
-        user_shinies = await db.get_all_shinies(user_id)
-
-        # Build counts: (dex_num, name, gender_key) -> count
+        # Build counts from the summary document: (name, gender_key) -> count
+        summary = await db.get_shiny_summary(user_id)
         form_counts = {}
-        for shiny in user_shinies:
-            dex_num = shiny['dex_number']
-            name = shiny['name']
-            gender = shiny['gender']
-
+        for (name, gender), count in summary['by_form'].items():
             has_gender_diff = utils.has_gender_difference(name)
 
             if has_gender_diff and gender in ['male', 'female']:
-                key = (dex_num, name, gender)
+                key = (name, gender)
             else:
-                key = (dex_num, name, None)
+                key = (name, None)
 
-            if key not in form_counts:
-                form_counts[key] = 0
-            form_counts[key] += 1
+            form_counts[key] = form_counts.get(key, 0) + count
 
-        # Get all forms from CSV
-        all_forms = utils.get_full_dex_entries()
+        # All forms, filtered by bitsets
+        selected = self.select_entries(utils.dex_views['full'], utils, region_filter, type_filters,
+                                       name_searches, exclude_names)
 
-        # Build filtered list
+        # Build entry list with counts
         form_entries = []
-        for dex_num, pokemon_name, has_gender_diff in all_forms:
-            # Apply exclude filter first
-            if self.is_excluded(pokemon_name, exclude_names):
-                continue
-
-            # Apply name search filter with accent-insensitive matching
-            if name_searches:
-                normalized_pokemon = normalize_string(pokemon_name.lower())
-                matches_any = any(normalize_string(search.lower()) in normalized_pokemon for search in name_searches)
-                if not matches_any:
-                    continue
-
-            # Apply region/type filters
-            if region_filter or type_filters:
-                if not self.matches_filters(pokemon_name, utils, region_filter, type_filters):
-                    continue
-
+        for dex_num, pokemon_name, has_gender_diff in selected:
             if has_gender_diff:
                 # Add male and female entries (unless explicitly ignored)
                 if not ignore_male:
-                    male_count = form_counts.get((dex_num, pokemon_name, 'male'), 0)
+                    male_count = form_counts.get((pokemon_name, 'male'), 0)
                     form_entries.append((dex_num, pokemon_name, 'male', male_count))
                 
                 if not ignore_female:
-                    female_count = form_counts.get((dex_num, pokemon_name, 'female'), 0)
+                    female_count = form_counts.get((pokemon_name, 'female'), 0)
                     form_entries.append((dex_num, pokemon_name, 'female', female_count))
             else:
                 # Add single entry
-                count = form_counts.get((dex_num, pokemon_name, None), 0)
+                count = form_counts.get((pokemon_name, None), 0)
                 form_entries.append((dex_num, pokemon_name, None, count))
 
         # Apply caught/uncaught filters
@@ -673,42 +599,63 @@ class ShinyDexDisplay(commands.Cog):
         message = await ctx.send(embed=view.create_embed(), view=view, reference=ctx.message, mention_author=False)
         view.message = message
 
+    def split_filter_expression(self, filter_name: str, options: str = None):
+        """Split '<expression> --options' into (expression, options)"""
+        text = f"{filter_name} {options or ''}".strip()
+        match = re.search(r'(?:^|\s)--', text)
+        if not match:
+            return text, None
+        return text[:match.start()].strip(), text[match.start():].strip()
+
+    async def send_available_filters(self, ctx, custom_filters: dict, error: str = None):
+        """Show built-in and custom filters (optionally after an error)"""
+        filter_list = ", ".join([f"`{f}`" for f in filters.get_all_filter_names()])
+        description = f"Use `filter <name>` to view a filtered dex.\n" \
+                      f"Combine filters: `filter legendaries + mythical - region:kanto`, " \
+                      f"`filter starters & type:fire`\n\n**Available filters:**\n{filter_list}"
+        if custom_filters:
+            custom_list = ", ".join([f"`{name}`" for name in sorted(custom_filters)])
+            description += f"\n\n**Your filters:**\n{custom_list}"
+        if error:
+            description = f"❌ {error}\n\n{description}"
+
+        embed = discord.Embed(title="📋 Available Filters", description=description, color=EMBED_COLOR)
+        await ctx.send(embed=embed, reference=ctx.message, mention_author=False)
+
     @commands.hybrid_command(name='filter', aliases=['f'])
     @app_commands.describe(
-        filter_name="Filter name (e.g., eevos, starters, legendaries)",
+        filter_name="Filter name or expression (e.g., eevos, starters + ub, legendaries & type:psychic)",
         options="Options: --caught, --uncaught, --orderd, --ordera, --region, --type, --exclude, --nogender, --page, --list, --smartlist, --image, --ignoremale, --ignorefemale"
     )
     async def filter_dex(self, ctx, filter_name: str = None, *, options: str = None):
-        """View your shiny dex with custom filters"""
+        """View your shiny dex with built-in/custom filters or filter expressions"""
         utils = self.bot.get_cog('Utils')
         if not utils:
             await ctx.send("❌ Utils cog not loaded", reference=ctx.message, mention_author=False)
             return
 
+        user_id = ctx.author.id
+
         # If no filter name provided, show available filters
         if not filter_name:
-            available_filters = get_all_filter_names()
-            filter_list = ", ".join([f"`{f}`" for f in available_filters])
-            embed = discord.Embed(
-                title="📋 Available Filters",
-                description=f"Use `filter <name>` to view a filtered dex.\n\n**Available filters:**\n{filter_list}",
-                color=EMBED_COLOR
-            )
-            await ctx.send(embed=embed, reference=ctx.message, mention_author=False)
+            await self.send_available_filters(ctx, await db.get_custom_filters(user_id))
             return
 
-        # Get the filter
-        filter_data = get_filter(filter_name)
-        if not filter_data:
-            available_filters = get_all_filter_names()
-            filter_list = ", ".join([f"`{f}`" for f in available_filters])
-            await ctx.send(
-                f"❌ Filter `{filter_name}` not found!\n\n**Available filters:** {filter_list}",
-                reference=ctx.message, mention_author=False
-            )
+        # Compile the filter expression to a bitset over the filter universe
+        # (custom filters are only fetched when a name isn't built-in)
+        expression, options = self.split_filter_expression(filter_name, options)
+        engine = utils.filter_engine
+        custom_filters = {}
+        if engine.needs_custom_filters(expression):
+            custom_filters = await db.get_custom_filters(user_id)
+        try:
+            filter_mask = engine.compile(expression, custom_filters)
+        except FilterError as e:
+            if not custom_filters:
+                custom_filters = await db.get_custom_filters(user_id)
+            await self.send_available_filters(ctx, custom_filters, str(e))
             return
-
-        user_id = ctx.author.id
+        filter_display_name = engine.display_name(expression, custom_filters)
 
         # Parse options
         show_caught, show_uncaught, order, region_filter, type_filters, _, page, show_list, show_smartlist, ignore_gender, exclude_names, show_image, ignore_male, ignore_female = self.parse_filters(options)
@@ -718,34 +665,22 @@ class ShinyDexDisplay(commands.Cog):
             await ctx.send("❌ Cannot use --image with --list or --smartlist!", reference=ctx.message, mention_author=False)
             return
 
-        # Get user's shinies
-        user_shinies = await db.get_all_shinies(user_id)
-
-        # Get filter Pokemon set and apply region/type/exclude filters
-        filter_pokemon_set = set()
-        for pokemon_name in filter_data['pokemon']:
-            # Apply exclude filter first
-            if self.is_excluded(pokemon_name, exclude_names):
-                continue
+        # Get user's per-form shiny counts
+        summary = await db.get_shiny_summary(user_id)
 
-            # Apply region/type filters
-            if region_filter or type_filters:
-                if not self.matches_filters(pokemon_name, utils, region_filter, type_filters):
-                    continue
-            filter_pokemon_set.add(pokemon_name)
+        # Filter entries (sorted by dex number): compiled expression AND region/type/exclude bitsets
+        selected = self.select_entries(engine.universe, utils, region_filter, type_filters,
+                                       exclude_names=exclude_names, within=filter_mask)
+        filter_pokemon_set = {pokemon_name for _, pokemon_name, _ in selected}
 
         # If no Pokemon match the filters, return early
-        if not filter_pokemon_set:
+        if not selected:
             await ctx.send("❌ No Pokémon in this filter match your region/type filters!", reference=ctx.message, mention_author=False)
             return
 
-        # Build counts
+        # Build counts: (name, gender_key) -> count
         form_counts = {}
-        for shiny in user_shinies:
-            dex_num = shiny['dex_number']
-            name = shiny['name']
-            gender = shiny['gender']
-
+        for (name, gender), count in summary['by_form'].items():
             # Only process if name is in filter
             if name not in filter_pokemon_set:
                 continue
@@ -754,51 +689,40 @@ class ShinyDexDisplay(commands.Cog):
 
             # If ignore_gender is True, combine all genders into one entry
             if ignore_gender or not has_gender_diff:
-                key = (dex_num, name, None)
+                key = (name, None)
             elif has_gender_diff and gender in ['male', 'female']:
-                key = (dex_num, name, gender)
+                key = (name, gender)
             else:
-                key = (dex_num, name, None)
+                key = (name, None)
 
-            if key not in form_counts:
-                form_counts[key] = 0
-            form_counts[key] += 1
+            form_counts[key] = form_counts.get(key, 0) + count
 
-        # Build entries from filter list
+        # Build entries from the precomputed filter view (already sorted by dex number)
         dex_entries = []
-        for pokemon_name in filter_pokemon_set:
-            dex_num = utils.get_dex_number(pokemon_name)
-            if dex_num is None:
-                continue
-
-            has_gender_diff = utils.has_gender_difference(pokemon_name)
-
+        for dex_num, pokemon_name, has_gender_diff in selected:
             # If ignore_gender is True, create single entry with combined count
             if ignore_gender:
                 # Combine male and female counts
-                male_count = form_counts.get((dex_num, pokemon_name, 'male'), 0)
-                female_count = form_counts.get((dex_num, pokemon_name, 'female'), 0)
-                combined_count = form_counts.get((dex_num, pokemon_name, None), 0)
+                male_count = form_counts.get((pokemon_name, 'male'), 0)
+                female_count = form_counts.get((pokemon_name, 'female'), 0)
+                combined_count = form_counts.get((pokemon_name, None), 0)
                 total_count = male_count + female_count + combined_count
 
                 dex_entries.append((dex_num, pokemon_name, None, total_count))
             elif has_gender_diff:
                 # Add male entry (unless ignored)
                 if not ignore_male:
-                    male_count = form_counts.get((dex_num, pokemon_name, 'male'), 0)
+                    male_count = form_counts.get((pokemon_name, 'male'), 0)
                     dex_entries.append((dex_num, pokemon_name, 'male', male_count))
                 
                 # Add female entry (unless ignored)
                 if not ignore_female:
-                    female_count = form_counts.get((dex_num, pokemon_name, 'female'), 0)
+                    female_count = form_counts.get((pokemon_name, 'female'), 0)
                     dex_entries.append((dex_num, pokemon_name, 'female', female_count))
             else:
-                count = form_counts.get((dex_num, pokemon_name, None), 0)
+                count = form_counts.get((pokemon_name, None), 0)
                 dex_entries.append((dex_num, pokemon_name, None, count))
 
-        # Sort by dex number by default
-        dex_entries.sort(key=lambda x: x[0])
-
         # Apply caught/uncaught filters
         filtered_entries = []
         for entry in dex_entries:
@@ -822,7 +746,7 @@ class ShinyDexDisplay(commands.Cog):
         # If --image flag is set, generate image
         if show_image:
             # Build header info
-            header_info = {'filter_name': filter_data['name']}
+            header_info = {'filter_name': filter_display_name}
             if type_filters:
                 header_info['types'] = type_filters
             if region_filter:
@@ -877,7 +801,6 @@ class ShinyDexDisplay(commands.Cog):
             pages.append(page_content)
 
         # Create view with filters in display name
-        filter_display_name = filter_data['name']
         if region_filter:
             filter_display_name += f" - {region_filter}"
         if type_filters:
@@ -897,5 +820,89 @@ class ShinyDexDisplay(commands.Cog):
         message = await ctx.send(embed=view.create_embed(), view=view, reference=ctx.message, mention_author=False)
         view.message = message
 
+    # ===== CUSTOM FILTERS =====
+
+    @commands.hybrid_group(name='customfilter', aliases=['cf'], invoke_without_command=True)
+    async def custom_filter(self, ctx):
+        """Manage your own shiny dex filters (use them with the filter command)"""
+        await self.custom_filter_list(ctx)
+
+    @custom_filter.command(name='add', aliases=['set', 'create'])
+    @app_commands.describe(
+        name="Filter name (letters, numbers, - and _)",
+        expression="Filter expression (e.g., starters + ub - region:kanto, \"Pikachu\" + eevee)"
+    )
+    async def custom_filter_add(self, ctx, name: str, *, expression: str):
+        """Create or replace a custom filter"""
+        utils = self.bot.get_cog('Utils')
+        if not utils:
+            await ctx.send("❌ Utils cog not loaded", reference=ctx.message, mention_author=False)
+            return
+
+        name = name.lower()
+        if not re.fullmatch(r'[a-z0-9][a-z0-9_-]{0,23}', name):
+            await ctx.send("❌ Filter names must be 1-24 letters, numbers, `-` or `_`!", reference=ctx.message, mention_author=False)
+            return
+
+        if name in RESERVED_WORDS:
+            await ctx.send(f"❌ `{name}` is a filter operator and can't be used as a name!", reference=ctx.message, mention_author=False)
+            return
+
+        engine = utils.filter_engine
+        if engine.is_builtin(name):
+            await ctx.send(f"❌ `{name}` is already a built-in filter!", reference=ctx.message, mention_author=False)
+            return
+
+        if len(expression) > config.MAX_CUSTOM_FILTER_LENGTH:
+            await ctx.send(f"❌ Filter expressions are limited to {config.MAX_CUSTOM_FILTER_LENGTH} characters!", reference=ctx.message, mention_author=False)
+            return
+
+        user_id = ctx.author.id
+        custom_filters = await db.get_custom_filters(user_id)
+        if name not in custom_filters and len(custom_filters) >= config.MAX_CUSTOM_FILTERS:
+            await ctx.send(f"❌ You can only have {config.MAX_CUSTOM_FILTERS} custom filters!", reference=ctx.message, mention_author=False)
+            return
+
+        # Compile with the new definition in place (catches typos and self-references)
+        custom_filters = {**custom_filters, name: expression}
+        try:
+            mask = engine.compile(name, custom_filters)
+        except FilterError as e:
+            await ctx.send(f"❌ {e}", reference=ctx.message, mention_author=False)
+            return
+
+        await db.set_custom_filter(user_id, name, expression)
+        await ctx.send(
+            f"✅ Saved filter `{name}` ({engine.universe.count(mask)} Pokémon). View it with `filter {name}`",
+            reference=ctx.message, mention_author=False
+        )
+
+    @custom_filter.command(name='remove', aliases=['delete', 'del'])
+    @app_commands.describe(name="Filter name")
+    async def custom_filter_remove(self, ctx, name: str):
+        """Delete a custom filter"""
+        if await db.delete_custom_filter(ctx.author.id, name.lower()):
+            await ctx.send(f"✅ Deleted filter `{name.lower()}`", reference=ctx.message, mention_author=False)
+        else:
+            await ctx.send(f"❌ You don't have a filter named `{name.lower()}`!", reference=ctx.message, mention_author=False)
+
+    @custom_filter.command(name='list', aliases=['ls'])
+    async def custom_filter_list(self, ctx):
+        """List your custom filters"""
+        custom_filters = await db.get_custom_filters(ctx.author.id)
+        if not custom_filters:
+            await ctx.send("❌ You don't have any custom filters yet!\nCreate one with `customfilter add <name> <expression>`",
+                           reference=ctx.message, mention_author=False)
+            return
+
+        lines = [f"**{name}** - `{expression}`" for name, expression in sorted(custom_filters.items())]
+        embed = discord.Embed(
+            title="📋 Your Custom Filters",
+            description="\n".join(lines),
+            color=EMBED_COLOR
+        )
+        embed.set_footer(text=f"{len(custom_filters)}/{config.MAX_CUSTOM_FILTERS} filters")
+        await ctx.send(embed=embed, reference=ctx.message, mention_author=False)
+
 async def setup(bot):
     await bot.add_cog(ShinyDexDisplay(bot))
@@ -237,11 +237,13 @@ class ShinyDexManagement(commands.Cog):
             start_time = asyncio.get_event_loop().time()
             last_update = start_time
 
-            while (asyncio.get_event_loop().time() - start_time) < timeout:
+            # Sessions end early (keeping every page already saved) once shutdown starts
+            shutdown = self.bot.shutdown_coordinator
+            while (asyncio.get_event_loop().time() - start_time) < timeout and not shutdown.draining:
                 try:
                     remaining = timeout - (asyncio.get_event_loop().time() - start_time)
                     wait_time = min(remaining, 30.0)
-                    before, after = await self.bot.wait_for('message_edit', timeout=wait_time, check=check)
+                    before, after = await shutdown.wait_for('message_edit', timeout=wait_time, check=check)
 
                     embed = after.embeds[0]
                     page_shinies = []
@@ -361,7 +363,7 @@ class ShinyDexManagement(commands.Cog):
 
                 # FIXED: Check if Pokemon name exists in the regular dex CSV first
                 # This prevents event Pokemon from being added with wrong dex numbers
-                if pokemon_name not in utils.dex_data:
+                if not utils.is_in_shiny_dex(pokemon_name):
                     # Pokemon not in regular dex CSV - skip it (event Pokemon, etc.)
                     continue
 
@@ -454,53 +456,48 @@ class ShinyDexManagement(commands.Cog):
         user_id = ctx.author.id
         utils = self.bot.get_cog('Utils')
 
-        # Get all shinies
-        all_shinies = await db.get_all_shinies(user_id)
+        # Get the summary document and IV stats (both computed without loading every shiny)
+        summary, iv_stats = await asyncio.gather(
+            db.get_shiny_summary(user_id),
+            db.get_shiny_iv_stats(user_id)
+        )
 
-        if not all_shinies:
+        if not summary['total']:
             await ctx.send("❌ You haven't tracked any shinies yet!\nUse `?trackshiny` to get started.", 
                           reference=ctx.message, mention_author=False)
             return
 
         # Calculate stats
-        total_tracked = len(all_shinies)
+        total_tracked = summary['total']
 
         # Basic Dex: unique dex numbers (count all Pokemon with same dex number)
-        unique_dex = len(set(s['dex_number'] for s in all_shinies))
+        unique_dex = len(summary['by_dex'])
 
-        # Full Dex: Count unique (dex_number, name, gender) combinations based on CSV
+        # Full Dex: Count unique (name, gender) combinations based on CSV
         unique_forms_set = set()
-        for shiny in all_shinies:
-            dex_num = shiny['dex_number']
-            name = shiny['name']
-            gender = shiny['gender']
-
+        for name, gender in summary['by_form']:
             # Check if this specific name has gender difference in CSV
             has_gender_diff = utils.has_gender_difference(name)
 
             if has_gender_diff and gender in ['male', 'female']:
                 # Track with gender
-                unique_forms_set.add((dex_num, name, gender))
+                unique_forms_set.add((name, gender))
             else:
                 # Track without gender
-                unique_forms_set.add((dex_num, name, None))
+                unique_forms_set.add((name, None))
 
         unique_forms = len(unique_forms_set)
 
         # Gender breakdown
-        males = sum(1 for s in all_shinies if s['gender'] == 'male')
-        females = sum(1 for s in all_shinies if s['gender'] == 'female')
-        unknown = sum(1 for s in all_shinies if s['gender'] == 'unknown')
+        males = summary['by_gender'].get('male', 0)
+        females = summary['by_gender'].get('female', 0)
+        unknown = summary['by_gender'].get('unknown', 0)
 
         # IV stats
-        ivs = [s['iv_percent'] for s in all_shinies]
-        avg_iv = sum(ivs) / len(ivs) if ivs else 0
-        max_iv = max(ivs) if ivs else 0
-        min_iv = min(ivs) if ivs else 0
-
-        # Non-zero lowest IV
-        non_zero_ivs = [iv for iv in ivs if iv > 0]
-        min_non_zero_iv = min(non_zero_ivs) if non_zero_ivs else 0
+        avg_iv = iv_stats['avg']
+        max_iv = iv_stats['max']
+        min_iv = iv_stats['min']
+        min_non_zero_iv = iv_stats['min_non_zero']
 
         # Get total counts from CSV
         total_unique_dex = utils.get_total_unique_dex()
@@ -548,7 +545,9 @@ class ShinyDexManagement(commands.Cog):
 
         # Find most common shinies
         from collections import Counter
-        name_counts = Counter(s['name'] for s in all_shinies)
+        name_counts = Counter()
+        for (name, _), count in summary['by_form'].items():
+            name_counts[name] += count
         most_common = name_counts.most_common(5)
 
         if most_common:
@@ -199,10 +199,10 @@ class ShinyDexStats(commands.Cog):
 
         user_id = ctx.author.id
 
-        # Get user's shinies
-        user_shinies = await db.get_all_shinies(user_id)
+        # Get user's per-form shiny counts (summary document)
+        summary = await db.get_shiny_summary(user_id)
 
-        if not user_shinies:
+        if not summary['total']:
             await ctx.send("❌ You haven't tracked any shinies yet!\nUse `?trackshiny` to get started.", 
                           reference=ctx.message, mention_author=False)
             return
@@ -210,10 +210,7 @@ class ShinyDexStats(commands.Cog):
         # Build user's caught forms by type
         user_forms_by_type = {}
 
-        for shiny in user_shinies:
-            name = shiny['name']
-            dex_num = shiny['dex_number']
-            gender = shiny['gender']
+        for name, gender in summary['by_form']:
 
             # Get Pokemon info
             info = utils.get_pokemon_info(name)
@@ -230,9 +227,9 @@ class ShinyDexStats(commands.Cog):
 
             # Create form key
             if has_gender_diff and gender in ['male', 'female']:
-                form_key = (dex_num, name, gender)
+                form_key = (name, gender)
             else:
-                form_key = (dex_num, name, None)
+                form_key = (name, None)
 
             # Add to each type
             for ptype in types:
@@ -240,29 +237,11 @@ class ShinyDexStats(commands.Cog):
                     user_forms_by_type[ptype] = set()
                 user_forms_by_type[ptype].add(form_key)
 
-        # Calculate total forms per type from CSV
-        all_forms = utils.get_full_dex_entries()
-        total_forms_by_type = {}
-
-        for dex_num, pokemon_name, has_gender_diff in all_forms:
-            info = utils.get_pokemon_info(pokemon_name)
-            if not info:
-                continue
-
-            types = [info['type1']]
-            if info['type2']:
-                types.append(info['type2'])
-
-            # Count forms
-            if has_gender_diff:
-                form_count = 2  # Male and female
-            else:
-                form_count = 1
-
-            for ptype in types:
-                if ptype not in total_forms_by_type:
-                    total_forms_by_type[ptype] = 0
-                total_forms_by_type[ptype] += form_count
+        # Total forms per type from the precomputed full dex bitsets (gender differences count twice)
+        dex_view = utils.dex_views['full']
+        total_forms_by_type = {
+            ptype: dex_view.form_count(mask) for ptype, mask in dex_view.by_type.items()
+        }
 
         # Build stats for each type
         type_stats = []
@@ -316,10 +295,10 @@ class ShinyDexStats(commands.Cog):
 
         user_id = ctx.author.id
 
-        # Get user's shinies
-        user_shinies = await db.get_all_shinies(user_id)
+        # Get user's per-form shiny counts (summary document)
+        summary = await db.get_shiny_summary(user_id)
 
-        if not user_shinies:
+        if not summary['total']:
             await ctx.send("❌ You haven't tracked any shinies yet!\nUse `?trackshiny` to get started.", 
                           reference=ctx.message, mention_author=False)
             return
@@ -327,10 +306,7 @@ class ShinyDexStats(commands.Cog):
         # Build user's caught forms by region
         user_forms_by_region = {}
 
-        for shiny in user_shinies:
-            name = shiny['name']
-            dex_num = shiny['dex_number']
-            gender = shiny['gender']
+        for name, gender in summary['by_form']:
 
             # Get Pokemon info
             info = utils.get_pokemon_info(name)
@@ -344,35 +320,20 @@ class ShinyDexStats(commands.Cog):
 
             # Create form key
             if has_gender_diff and gender in ['male', 'female']:
-                form_key = (dex_num, name, gender)
+                form_key = (name, gender)
             else:
-                form_key = (dex_num, name, None)
+                form_key = (name, None)
 
             # Add to region
             if region not in user_forms_by_region:
                 user_forms_by_region[region] = set()
             user_forms_by_region[region].add(form_key)
 
-        # Calculate total forms per region from CSV
-        all_forms = utils.get_full_dex_entries()
-        total_forms_by_region = {}
-
-        for dex_num, pokemon_name, has_gender_diff in all_forms:
-            info = utils.get_pokemon_info(pokemon_name)
-            if not info:
-                continue
-
-            region = info['region']
-
-            # Count forms
-            if has_gender_diff:
-                form_count = 2  # Male and female
-            else:
-                form_count = 1
-
-            if region not in total_forms_by_region:
-                total_forms_by_region[region] = 0
-            total_forms_by_region[region] += form_count
+        # Total forms per region from the precomputed full dex bitsets (gender differences count twice)
+        dex_view = utils.dex_views['full']
+        total_forms_by_region = {
+            region: dex_view.form_count(mask) for region, mask in dex_view.by_region.items()
+        }
 
         # Build stats for each region
         region_stats = []
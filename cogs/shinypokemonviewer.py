@@ -219,14 +219,11 @@ class ShinyPokemonViewer(commands.Cog):
 
         return True
 
-    def matches_filters(self, pokemon: dict, utils, names: list, iv_filter, types: list, region: str):
-        """Check if a Pokemon matches all filters"""
-        # Name filter (partial match - search for substring)
-        if names:
-            pokemon_name_lower = pokemon['name'].lower()
-            matches_any = any(name.lower() in pokemon_name_lower for name in names)
-            if not matches_any:
-                return False
+    def matches_filters(self, pokemon: dict, utils, name_match, iv_filter, types: list, region: str):
+        """Check if a Pokemon matches all filters (name_match: predicate from the name search index)"""
+        # Name filter (accent-insensitive substring, precomputed by the index)
+        if name_match and not name_match(pokemon['name']):
+            return False
 
         # IV filter
         if not self.matches_iv_filter(pokemon['iv_percent'], iv_filter):
@@ -325,9 +322,10 @@ class ShinyPokemonViewer(commands.Cog):
             return
 
         # Apply filters
+        name_match = utils.name_search.matcher(names) if names else None
         filtered_pokemon = []
         for pokemon in all_shinies:
-            if self.matches_filters(pokemon, utils, names, iv_filter, types, region):
+            if self.matches_filters(pokemon, utils, name_match, iv_filter, types, region):
                 filtered_pokemon.append(pokemon)
 
         if not filtered_pokemon:
@@ -5,6 +5,7 @@ import asyncio
 from io import BytesIO
 from PIL import Image, ImageDraw, ImageFont, ImageColor
 import aiohttp
+import metrics
 import os
 import csv
 import config
@@ -85,7 +86,7 @@ class ShinyStatsImage(commands.Cog):
         }
 
         # Initialize resource download on cog load
-        self.bot.loop.create_task(self.initialize_resources())
+        bot.shutdown_coordinator.track(self.bot.loop.create_task(self.initialize_resources()))
 
     async def initialize_resources(self):
         """Download fonts and backgrounds from GitHub on startup"""
@@ -229,6 +230,7 @@ class ShinyStatsImage(commands.Cog):
         # Fallback to gray (default)
         return Image.new('RGBA', (width, height), ImageColor.getrgb(self.solid_colors['gray.png']))
 
+    @metrics.timed(metrics.HTTP_LATENCY, 'poketwo_cdn')
     async def fetch_pokemon_image(self, pokemon_name: str):
         """Fetch Pokemon image from Poketwo CDN using Pokemon name"""
         utils = self.bot.get_cog('Utils')
@@ -248,6 +250,7 @@ class ShinyStatsImage(commands.Cog):
                 print(f"Error fetching image for {pokemon_name} (CDN: {cdn_number}): {e}")
         return None
 
+    @metrics.timed(metrics.HTTP_LATENCY, 'discord_avatar')
     async def fetch_user_avatar(self, user: discord.User):
         """Fetch user's avatar"""
         async with aiohttp.ClientSession() as session:
@@ -261,6 +264,7 @@ class ShinyStatsImage(commands.Cog):
                 pass
         return None
 
+    @metrics.timed(metrics.RENDER_LATENCY, 'shiny_profile')
     async def create_stats_image(self, user: discord.User, stats_data: dict, background_name: str, user_title: str):
         """Create the shiny stats image"""
         # Image dimensions: 1024x576
@@ -641,10 +645,10 @@ class ShinyStatsImage(commands.Cog):
         user_id = ctx.author.id
         utils = self.bot.get_cog('Utils')
 
-        # Get all shinies
-        all_shinies = await db.get_all_shinies(user_id)
+        # Get the summary document (counters maintained on every shiny write)
+        summary = await db.get_shiny_summary(user_id)
 
-        if not all_shinies:
+        if not summary['total']:
             if ctx.interaction:
                 await ctx.send("❌ You haven't tracked any shinies yet!\nUse `m!trackshiny` to get started.")
             else:
@@ -670,22 +674,18 @@ class ShinyStatsImage(commands.Cog):
         event_shinies_count = await db.count_event_shinies(user_id)
 
         # Calculate stats using utils
-        total_tracked = len(all_shinies)
-        unique_dex = len(set(s['dex_number'] for s in all_shinies))
+        total_tracked = summary['total']
+        unique_dex = len(summary['by_dex'])
 
         # Full Dex calculation
         unique_forms_set = set()
-        for shiny in all_shinies:
-            dex_num = shiny['dex_number']
-            name = shiny['name']
-            gender = shiny['gender']
-
+        for name, gender in summary['by_form']:
             has_gender_diff = utils.has_gender_difference(name)
 
             if has_gender_diff and gender in ['male', 'female']:
-                unique_forms_set.add((dex_num, name, gender))
+                unique_forms_set.add((name, gender))
             else:
-                unique_forms_set.add((dex_num, name, None))
+                unique_forms_set.add((name, None))
 
         unique_forms = len(unique_forms_set)
 
@@ -693,14 +693,16 @@ class ShinyStatsImage(commands.Cog):
         total_unique_dex = utils.get_total_unique_dex()
         total_forms_count = utils.get_total_forms_count()
 
-        # Calculate special counts using utils
-        rare_count = utils.count_rare_shinies(all_shinies)
-        regional_count = utils.count_regional_shinies(all_shinies)
-        mint_count = utils.count_mint_shinies(all_shinies)
+        # Special counts come straight from the summary
+        rare_count = summary['rare']
+        regional_count = summary['regional']
+        mint_count = summary['mint']
 
         # Most common Pokemon and Top 5
         from collections import Counter
-        name_counts = Counter(s['name'] for s in all_shinies)
+        name_counts = Counter()
+        for (name, _), count in summary['by_form'].items():
+            name_counts[name] += count
 
         # Get top 5 most collected - NOW ONLY PASSING NAME AND COUNT
         top_5_pokemon = []
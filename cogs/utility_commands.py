@@ -23,15 +23,17 @@ class UtilityCommands(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        # Only Pokétwo messages / edits in channels with an active track session reach these
+        bot.message_dispatch.watch_poketwo_messages(self.on_track_response, channels=active_track_commands)
+        bot.message_dispatch.watch_edits(self.on_track_message_edit, channels=active_track_commands)
 
-    # ==================== Event Listeners ====================
+    def cog_unload(self):
+        self.bot.message_dispatch.remove_handlers(self)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Handle responses from Pokétwo for track command"""
-        if message.author.id != 716390085896962058:  # Pokétwo bot ID
-            return
+    # ==================== Event Listeners ====================
 
+    async def on_track_response(self, message):
+        """Handle responses from Pokétwo for track command (dispatched for tracked channels only)"""
         channel_id = message.channel.id
 
         if channel_id not in active_track_commands:
@@ -88,9 +90,8 @@ class UtilityCommands(commands.Cog):
 
         await self._start_track_sending(reaction.message.channel, command_data)
 
-    @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        """Handle message edits to update tracked Pokemon IDs"""
+    async def on_track_message_edit(self, before, after):
+        """Handle message edits to update tracked Pokemon IDs (dispatched for tracked channels only)"""
         await self._handle_track_update(after)
 
     # ==================== Track Command ====================
@@ -1,9 +1,10 @@
 import discord
 from discord.ext import commands
 import re
-import csv
 import config
-import os
+import reference_data
+import species_registry
+import metrics
 
 class Utils(commands.Cog):
     """Utility functions for Pokemon parsing, breeding compatibility, and Shiny Dex"""
@@ -19,253 +20,55 @@ class Utils(commands.Cog):
         # Use shared class-level data instead of instance data
         if not Utils._data_loaded:
             print("📦 Loading Utils data for the first time...")
-            Utils._shared_data = self._initialize_data_structures()
             self._load_all_data()
             Utils._data_loaded = True
             print(f"✅ Utils data loaded and cached")
         else:
             print("✅ Utils using cached data (no reload needed)")
 
-        # Create instance references to shared data (for backward compatibility)
-        self.egg_groups = Utils._shared_data['egg_groups']
-        self.male_only_dex = Utils._shared_data['male_only_dex']
-        self.female_only_dex = Utils._shared_data['female_only_dex']
-        self.base_species_cache = Utils._shared_data['base_species_cache']
-        self.dex_numbers = Utils._shared_data['dex_numbers']
-        self.dex_forms = Utils._shared_data['dex_forms']
-        self.dex_data = Utils._shared_data['dex_data']
-        self.dex_by_number = Utils._shared_data['dex_by_number']
-        self.pokemon_info = Utils._shared_data['pokemon_info']
-        self.event_data = Utils._shared_data['event_data']
-        self.event_pokemon_list = Utils._shared_data['event_pokemon_list']
-        self.pokemon_cdn_mapping = Utils._shared_data['pokemon_cdn_mapping']  # ADD THIS LINE
+        self._bind_shared_data()
+        reference_data.add_reload_listener(self._on_reference_reload)
+
+        # Memo hit rates of the current reference data generation (read at scrape time)
+        metrics.register_cache('name_search', lambda: Utils._shared_data['name_search'].matching_names.cache_info())
+        metrics.register_cache('filter_compile', lambda: Utils._shared_data['filter_engine']._compile_shared.cache_info())
+        metrics.register_cache('species_resolve', lambda: Utils._shared_data['registry']._resolve_unknown.cache_info())
 
         # Precompile regex patterns (instance-specific is fine)
         self.id_pattern = re.compile(r'`(\s*\d+\s*)`')
         self.name_pattern = re.compile(r'> ([^<]+)<:(?:male|female|unknown):')
         self.iv_pattern = re.compile(r'•\s*([\d.]+)%')
 
-    def _initialize_data_structures(self):
-        """Initialize all data structures (called once)"""
-        return {
-            'egg_groups': {},
-            'male_only_dex': set(),
-            'female_only_dex': set(),
-            'base_species_cache': {},
-            'dex_numbers': {},
-            'dex_forms': {},
-            'dex_data': {},
-            'dex_by_number': {},
-            'pokemon_info': {},
-            'event_data': {},
-            'event_pokemon_list': [],
-            'pokemon_cdn_mapping': {}  # ADD THIS LINE
-        }
-
-    def _load_all_data(self):
-        """Load all CSV data into shared cache"""
-        self.load_dex_numbers()
-        self.load_egg_groups()
-        self.load_gender_only_species()
-        self.load_pokemon_data()
-        self.load_event_pokemon()
-        self.load_pokemon_cdn_mapping()  # ADD THIS LINE
-
-    def load_dex_numbers(self):
-        """Load both dex_number.csv (breeding) and dex_number_updated.csv (shiny dex)"""
-        dex_numbers = Utils._shared_data['dex_numbers']
-        dex_forms = Utils._shared_data['dex_forms']
-        dex_data = Utils._shared_data['dex_data']
-        dex_by_number = Utils._shared_data['dex_by_number']
-
-        # Load breeding bot dex numbers from dex_number.csv
-        try:
-            with open('data/dex_number.csv', 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    try:
-                        dex_num = int(row['Number']) if row['Number'] else 0
-                        name = row['Name'].strip()
-                        form = row['Form'].strip() if row['Form'] else ""
-
-                        # Store full name with form if it exists
-                        full_name = f"{form} {name}".strip() if form else name
-
-                        # Map full name to dex number (for breeding bot)
-                        dex_numbers[full_name] = dex_num
-
-                        # Also map base name to dex number (for lookups)
-                        if not form:
-                            dex_numbers[name] = dex_num
-
-                        # Store in forms dict for reverse lookup (for breeding bot)
-                        dex_forms[(dex_num, form)] = full_name
-
-                    except (ValueError, KeyError) as e:
-                        continue
-
-            print(f"✅ Loaded {len(dex_numbers)} breeding dex number entries from data/dex_number.csv")
-        except Exception as e:
-            print(f"❌ Error loading data/dex_number.csv: {e}")
-
-        # Load shiny dex numbers from dex_number_updated.csv
-        try:
-            with open('data/dex_number_updated.csv', 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    try:
-                        dex_num = int(row['Number']) if row['Number'] else 0
-                        name = row['Name'].strip()
-                        has_gender_diff = row.get('HasGenderDifference', '').strip().lower() == 'yes'
-
-                        # Store in dex_data (for shiny dex)
-                        dex_data[name] = {
-                            'dex_number': dex_num,
-                            'has_gender_diff': has_gender_diff
-                        }
-
-                        # Store in dex_by_number (for shiny dex)
-                        if dex_num not in dex_by_number:
-                            dex_by_number[dex_num] = []
-                        dex_by_number[dex_num].append((name, has_gender_diff))
-
-                    except (ValueError, KeyError) as e:
-                        continue
-
-            print(f"✅ Loaded {len(dex_data)} shiny dex number entries from data/dex_number_updated.csv")
-        except Exception as e:
-            print(f"❌ Error loading data/dex_number_updated.csv: {e}")
-
-    def load_egg_groups(self):
-        """Load egg groups for breeding bot"""
-        egg_groups = Utils._shared_data['egg_groups']
-        try:
-            with open('data/egg_groups.csv', 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    name = row['Name'].strip()
-                    groups = row['Egg Groups'].strip()
-                    if groups:
-                        egg_groups[name] = [g.strip() for g in groups.split(',')]
-            print(f"✅ Loaded {len(egg_groups)} egg group entries")
-        except Exception as e:
-            print(f"❌ Error loading data/egg_groups.csv: {e}")
-
-    def load_gender_only_species(self):
-        """Load male-only and female-only species by dex number"""
-        male_only_dex = Utils._shared_data['male_only_dex']
-        female_only_dex = Utils._shared_data['female_only_dex']
-
-        # Load male-only species
-        try:
-            with open('data/male.csv', 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if 'dex' in row:
-                        try:
-                            dex_num = int(row['dex'])
-                            male_only_dex.add(dex_num)
-                        except ValueError:
-                            continue
-            print(f"✅ Loaded {len(male_only_dex)} male-only dex numbers")
-        except Exception as e:
-            print(f"❌ Error loading data/male.csv: {e}")
-
-        # Load female-only species
-        try:
-            with open('data/female.csv', 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if 'dex' in row:
-                        try:
-                            dex_num = int(row['dex'])
-                            female_only_dex.add(dex_num)
-                        except ValueError:
-                            continue
-            print(f"✅ Loaded {len(female_only_dex)} female-only dex numbers")
-        except Exception as e:
-            print(f"❌ Error loading data/female.csv: {e}")
-
-    def load_pokemon_data(self):
-        """Load pokemon_data.csv for region/type filtering (shiny dex)"""
-        pokemon_info = Utils._shared_data['pokemon_info']
-        try:
-            with open('data/pokemon_data.csv', 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    name = row['name'].strip()
-                    region = row['region'].strip() if row['region'] else ""
-                    type1 = row['type1'].strip() if row['type1'] else ""
-                    type2 = row['type2'].strip() if row['type2'] else ""
-
-                    pokemon_info[name] = {
-                        'region': region,
-                        'type1': type1,
-                        'type2': type2
-                    }
-
-            print(f"✅ Loaded {len(pokemon_info)} pokemon data entries")
-        except Exception as e:
-            print(f"❌ Error loading data/pokemon_data.csv: {e}")
-
-    def load_event_pokemon(self):
-        """Load event_pokemon.csv (shiny dex)"""
-        event_data = Utils._shared_data['event_data']
-        event_pokemon_list = Utils._shared_data['event_pokemon_list']
-
-        try:
-            with open('data/event_pokemon.csv', 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    try:
-                        name = row['Name'].strip()
-                        has_gender_diff = row['HasGenderDifference'].strip().lower() == 'yes'
-
-                        # Store in event_data
-                        event_data[name] = {
-                            'has_gender_diff': has_gender_diff
-                        }
-
-                        # Store in list
-                        event_pokemon_list.append((name, has_gender_diff))
-
-                    except (ValueError, KeyError) as e:
-                        continue
-
-            print(f"✅ Loaded {len(event_data)} event pokemon entries")
-        except Exception as e:
-            print(f"❌ Error loading data/event_pokemon.csv: {e}")
-
-    def load_pokemon_cdn_mapping(self):
-        """Load Pokemon name to CDN number mapping from CSV file"""
-        pokemon_cdn_mapping = Utils._shared_data['pokemon_cdn_mapping']
-        mapping_file = 'data/pokemon_cdn_mapping.csv'
-
-        if not os.path.exists(mapping_file):
-            print(f"⚠️ Warning: Pokemon CDN mapping file not found at {mapping_file}")
-            return
+    def _bind_shared_data(self):
+        """Create instance references to shared data (rebound on every reload)"""
+        self.registry = Utils._shared_data['registry']  # Shared species registry (integer IDs, columnar)
+        self.male_only_dex = Utils._shared_data['male_only_dex']
+        self.female_only_dex = Utils._shared_data['female_only_dex']
+        self.event_pokemon_list = Utils._shared_data['event_pokemon_list']
+        self.name_search = Utils._shared_data['name_search']  # Shared trigram name search index
+        self.dex_views = Utils._shared_data['dex_views']  # Precomputed entry arrays + filter bitsets
+        self.filter_engine = Utils._shared_data['filter_engine']  # Compiled filter expressions
+        self.smartlist = Utils._shared_data['smartlist']  # Precomputed smartlist categories/fragments
 
-        try:
-            with open(mapping_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    pokemon_name = row.get('name', '').strip()
-                    cdn_number = row.get('cdn_number', '').strip()
+    def _on_reference_reload(self, generation: int, data: dict):
+        """Swap in a new reference data generation (derived caches live in the new registry)"""
+        Utils._shared_data = dict(data)  # Single assignment: readers see old or new, never a mix
+        self._bind_shared_data()
 
-                    if pokemon_name and cdn_number:
-                        # Store both lowercase and original case for flexible matching
-                        pokemon_cdn_mapping[pokemon_name.lower()] = int(cdn_number)
+    def cog_unload(self):
+        reference_data.remove_reload_listener(self._on_reference_reload)
 
-            print(f"✅ Loaded {len(pokemon_cdn_mapping)} Pokemon CDN mappings")
-        except Exception as e:
-            print(f"❌ Error loading Pokemon CDN mapping: {e}")
+    def _load_all_data(self):
+        """Load all reference data from the precompiled snapshot into shared cache"""
+        Utils._shared_data = dict(reference_data.load_reference_data())
+        print(f"✅ {len(Utils._shared_data['registry'])} species, "
+              f"{len(Utils._shared_data['full_dex_entries'])} shiny dex forms, "
+              f"{len(Utils._shared_data['event_pokemon_list'])} event pokemon")
 
     def get_cdn_number(self, pokemon_name: str) -> int:
         """Get CDN number for a Pokemon name"""
-        pokemon_cdn_mapping = Utils._shared_data['pokemon_cdn_mapping']
-
         # Try exact match (case-insensitive)
-        cdn_number = pokemon_cdn_mapping.get(pokemon_name.lower())
+        cdn_number = self.registry.cdn_number(pokemon_name)
 
         if cdn_number is None:
             print(f"⚠️ Warning: No CDN mapping found for '{pokemon_name}'")
@@ -276,67 +79,27 @@ class Utils(commands.Cog):
     # ===== SHARED METHODS =====
 
     def get_dex_number(self, pokemon_name: str):
-        """Get dex number for a pokemon name"""
-        # Try exact match first (for breeding bot compatibility)
-        if pokemon_name in self.dex_numbers:
-            return self.dex_numbers[pokemon_name]
-
-        # Try dex_data (for shiny dex)
-        if pokemon_name in self.dex_data:
-            return self.dex_data[pokemon_name]['dex_number']
-
-        # Try base species
-        base = self.get_base_species(pokemon_name)
-        if base in self.dex_numbers:
-            return self.dex_numbers[base]
-        if base in self.dex_data:
-            return self.dex_data[base]['dex_number']
-
-        # Return 0 for unknown (breeding bot) or None (shiny dex)
-        return 0
+        """Get dex number for a pokemon name (exact, then base species, else 0 - precomputed)"""
+        return self.registry.resolve(pokemon_name).dex_number
 
     # ===== BREEDING BOT METHODS =====
 
     def get_egg_groups(self, species_name: str):
-        """Get egg groups for a species (with caching)"""
-        # Use cached base species lookup
-        base_name = self.get_base_species(species_name)
-        return self.egg_groups.get(base_name, ['Undiscovered'])
+        """Get egg groups for a species (via its precomputed base species)"""
+        groups = self.registry.egg_groups(self.registry.resolve(species_name).base_species)
+        return list(groups) if groups else ['Undiscovered']
 
     def get_base_species(self, name: str):
-        """Remove regional/form prefixes to get base species (cached)"""
-        # Check cache first
-        if name in self.base_species_cache:
-            return self.base_species_cache[name]
-
-        original_name = name
-        prefixes = [
-            'Alolan ', 'Galarian ', 'Hisuian ', 'Paldean ',
-            'Gigantamax ', 'Mega ', 'Primal ',
-            'Aqua Breed ', 'Combat Breed ', 'Blaze Breed '
-        ]
-
-        for prefix in prefixes:
-            if name.startswith(prefix):
-                name = name.replace(prefix, '', 1)
-                break  # Only remove first matching prefix
-
-        result = name.strip()
-
-        # Cache the result
-        self.base_species_cache[original_name] = result
-        return result
+        """Remove regional/form prefixes to get base species (precomputed, bounded LRU for unknown names)"""
+        return self.registry.resolve(name).base_species
 
     def is_regional(self, name: str):
         """Check if Pokemon is a regional form"""
-        return name.startswith((
-            'Alolan ', 'Galarian ', 'Hisuian ', 'Paldean ',
-            'Aqua Breed ', 'Combat Breed ', 'Blaze Breed '
-        ))
+        return self.registry.resolve(name).is_regional
 
     def is_gigantamax(self, name: str):
         """Check if Pokemon is Gigantamax"""
-        return 'Gigantamax' in name
+        return self.registry.resolve(name).is_gigantamax
 
     def is_male_only(self, species: str):
         """Check if species is male-only by dex number"""
@@ -369,14 +132,16 @@ class Utils(commands.Cog):
         # Check for shared egg group
         return any(group in groups2 for group in groups1)
 
-    def categorize_id(self, pokemon_id: int, overrides: dict = None):
+    def categorize_id(self, pokemon_id: int, overrides=None):
         """
         Categorize Pokemon ID as old, new, or unknown
-        overrides: dict of {pokemon_id: 'old'/'new'} from database
+        overrides: IntervalOverrides (or dict of {pokemon_id: 'old'/'new'}) from database
         """
         # Check override first
-        if overrides and pokemon_id in overrides:
-            return overrides[pokemon_id]
+        if overrides:
+            override = overrides.get(pokemon_id)
+            if override is not None:
+                return override
 
         # Use default logic
         if pokemon_id <= config.OLD_ID_MAX:
@@ -386,10 +151,10 @@ class Utils(commands.Cog):
         else:
             return 'unknown'
 
-    def can_pair_ids(self, id1: int, id2: int, overrides: dict = None):
+    def can_pair_ids(self, id1: int, id2: int, overrides=None):
         """
         Check if two IDs can be paired (one old, one new)
-        overrides: dict of {pokemon_id: 'old'/'new'} from database
+        overrides: IntervalOverrides from database
         """
         cat1 = self.categorize_id(id1, overrides)
         cat2 = self.categorize_id(id2, overrides)
@@ -399,7 +164,7 @@ class Utils(commands.Cog):
 
         return (cat1 == 'old' and cat2 == 'new') or (cat1 == 'new' and cat2 == 'old')
 
-    def get_compatibility(self, pokemon1: dict, pokemon2: dict, selective_mode: bool, overrides: dict = None):
+    def get_compatibility(self, pokemon1: dict, pokemon2: dict, selective_mode: bool, overrides=None):
         """Calculate expected compatibility (High/Medium/Low) with ID overrides"""
         # Use pre-computed fields
         is_ditto1 = pokemon1.get('is_ditto', False)
@@ -476,14 +241,15 @@ class Utils(commands.Cog):
                 iv_match = self.iv_pattern.search(line)
                 iv_percent = float(iv_match.group(1)) if iv_match else 0.0
 
-                # Get dex number
-                dex_number = self.get_dex_number(pokemon_name)
+                # Resolve the form once (base species, dex number, regional/gmax flags)
+                form = self.registry.resolve(pokemon_name)
+                dex_number = form.dex_number
 
                 # Pre-compute all derived fields
                 egg_groups = self.get_egg_groups(pokemon_name)
-                base_species = self.get_base_species(pokemon_name)
-                is_gmax = self.is_gigantamax(pokemon_name)
-                is_regional = self.is_regional(pokemon_name)
+                base_species = form.base_species
+                is_gmax = form.is_gigantamax
+                is_regional = form.is_regional
                 is_ditto = 'Ditto' in egg_groups
 
                 pokemon_data.append({
@@ -518,73 +284,53 @@ class Utils(commands.Cog):
 
     def has_gender_difference(self, pokemon_name: str) -> bool:
         """Check if a specific Pokemon name has gender differences"""
-        if pokemon_name in self.dex_data:
-            return self.dex_data[pokemon_name]['has_gender_diff']
-        return False
+        return self.registry.has_flag(pokemon_name, species_registry.GENDER_DIFF)
+
+    def is_in_shiny_dex(self, pokemon_name: str) -> bool:
+        """Check if a Pokemon name is part of the shiny dex"""
+        return self.registry.has_flag(pokemon_name, species_registry.IN_SHINY_DEX)
 
     def is_event_pokemon(self, pokemon_name: str) -> bool:
         """Check if a Pokemon is an event Pokemon"""
-        return pokemon_name in self.event_data
+        return self.registry.has_flag(pokemon_name, species_registry.EVENT)
 
     def has_gender_difference_event(self, pokemon_name: str) -> bool:
         """Check if an event Pokemon has gender differences"""
-        if pokemon_name in self.event_data:
-            return self.event_data[pokemon_name]['has_gender_diff']
-        return False
+        return self.registry.has_flag(pokemon_name, species_registry.EVENT_GENDER_DIFF)
 
     def get_pokemon_info(self, pokemon_name: str):
         """Get region and type info for a Pokemon"""
-        return self.pokemon_info.get(pokemon_name)
+        return self.registry.info(pokemon_name)
 
     def get_basic_dex_entries(self):
-        """Get list of (dex_number, pokemon_name) for basic dex - one per dex number (the first/top one)"""
-        entries = []
-        for dex_num in sorted(self.dex_by_number.keys()):
-            # Get the first Pokemon for this dex number
-            if self.dex_by_number[dex_num]:
-                first_pokemon = self.dex_by_number[dex_num][0][0]  # (name, has_gender_diff)[0] = name
-                entries.append((dex_num, first_pokemon))
-        return entries
+        """Immutable (dex_number, pokemon_name) entries for basic dex - one per dex number (the first/top one)"""
+        return Utils._shared_data['basic_dex_entries']
 
     def get_full_dex_entries(self):
-        """Get list of (dex_number, pokemon_name, has_gender_diff) for full dex - all forms"""
-        entries = []
-        for dex_num in sorted(self.dex_by_number.keys()):
-            for name, has_gender_diff in self.dex_by_number[dex_num]:
-                entries.append((dex_num, name, has_gender_diff))
-        return entries
+        """Immutable (dex_number, pokemon_name, has_gender_diff) entries for full dex - all forms"""
+        return Utils._shared_data['full_dex_entries']
 
     def get_event_entries(self):
-        """Get list of (pokemon_name, has_gender_diff) for event Pokemon"""
-        return self.event_pokemon_list.copy()
+        """Immutable (pokemon_name, has_gender_diff) entries for event Pokemon"""
+        return self.event_pokemon_list
 
     def get_total_unique_dex(self) -> int:
         """Get total number of unique dex numbers"""
-        return len(self.dex_by_number)
+        return Utils._shared_data['total_unique_dex']
 
     def get_total_forms_count(self) -> int:
         """Get total count of all forms including gender variants"""
-        count = 0
-        for dex_num in self.dex_by_number:
-            for name, has_gender_diff in self.dex_by_number[dex_num]:
-                if has_gender_diff:
-                    count += 2  # Male and female
-                else:
-                    count += 1
-        return count
+        return Utils._shared_data['total_forms_count']
 
     def get_total_event_count(self) -> int:
         """Get total count of event Pokemon including gender variants"""
-        count = 0
-        for name, has_gender_diff in self.event_pokemon_list:
-            if has_gender_diff:
-                count += 2  # Male and female
-            else:
-                count += 1
-        return count
+        return Utils._shared_data['total_event_count']
 
     def is_rare_pokemon(self, pokemon_name: str) -> bool:
         """Check if a Pokemon is rare"""
+        sid = self.registry.id_of(pokemon_name)
+        if sid is not None:
+            return bool(self.registry.flags[sid] & species_registry.RARE)
         return pokemon_name in config.RARE
 
     def count_rare_shinies(self, shinies_list: list) -> int:
@@ -0,0 +1,284 @@
+"""
+Batched asynchronous command-usage logger
+
+Command handlers only snapshot a few fields into a bounded queue (no awaits, no API
+calls). A background worker sends the events to the log channel as multi-embed messages
+(up to 10 embeds per message). When Discord is slow or the backlog grows, events are
+appended to a local JSON-lines file and the channel gets one digest embed instead.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+import discord
+import config
+
+# Discord allows at most 10 embeds per message
+EMBEDS_PER_MESSAGE = 10
+
+# Defaults
+QUEUE_SIZE = 2000           # Pending events kept in memory
+FLUSH_INTERVAL = 5.0        # Max seconds an event waits before its batch is sent
+SEND_TIMEOUT = 10.0         # Seconds before a send counts as slow and the batch is spilled
+DIGEST_THRESHOLD = 50       # Backlog size that switches from per-event embeds to a digest
+SPILL_PATH = os.path.join('logs', 'command_usage.jsonl')
+
+
+class CommandLogger:
+    """Bounded queue + batch worker for command usage logs"""
+
+    def __init__(self, bot, channel_id: int, queue_size: int = QUEUE_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL, spill_path: str = SPILL_PATH):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.queue = None
+        self.queue_size = queue_size
+        self.worker = None
+
+        # Batch the worker is still collecting; kept here so stop() can flush it after cancelling.
+        # It is swapped out before any send/spill, so stop() never repeats a handed-off event.
+        self.batch = []
+        self.spill_task = None  # Spill write in progress (shielded; stop() waits for it)
+
+        # Events that did not fit the queue; written to the spill file by the worker
+        self.overflow = deque(maxlen=queue_size)
+
+        # Stats
+        self.sent = 0
+        self.spilled = 0
+        self.dropped = 0
+
+    # ===== PRODUCER (called from command handlers) =====
+
+    def log(self, interaction_or_ctx, command_name: str, command_type: str):
+        """Record a command use without waiting on anything"""
+        if not self.channel_id:
+            return  # Logging disabled if no channel set
+
+        # Determine if it's an interaction or context
+        if isinstance(interaction_or_ctx, discord.Interaction):
+            user = interaction_or_ctx.user
+        else:  # commands.Context
+            user = interaction_or_ctx.author
+        guild = interaction_or_ctx.guild
+        channel = interaction_or_ctx.channel
+
+        event = {
+            "ts": time.time(),
+            "user_id": user.id,
+            "user_name": user.name,
+            "command": command_name,
+            "type": command_type,
+            "guild_id": guild.id if guild else None,
+            "guild_name": guild.name if guild else None,
+            "channel_name": getattr(channel, 'name', None),
+        }
+
+        if self.queue is None:
+            self.overflow.append(event)
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            if len(self.overflow) == self.overflow.maxlen:
+                self.dropped += 1
+            self.overflow.append(event)
+
+    # ===== LIFECYCLE =====
+
+    def start(self):
+        """Start the background worker (call from setup_hook)"""
+        if self.worker is None:
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the worker and flush what is still pending (nothing is lost on shutdown):
+        one last batch is posted while the gateway is still up, anything else is spilled to file
+        """
+        if self.worker:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+        if self.spill_task:
+            try:
+                await self.spill_task
+            except Exception as e:
+                print(f"❌ Command log spill failed: {e}")
+            self.spill_task = None
+
+        pending = self.batch + self._drain()
+        self.batch = []
+        pending.extend(self.overflow)
+        self.overflow.clear()
+        if pending and len(pending) <= EMBEDS_PER_MESSAGE and self.bot.is_ready() and not self.bot.is_closed():
+            if await self._send_events(pending):
+                print(f"📝 Flushed {len(pending)} pending command logs")
+                return
+        if pending:
+            await asyncio.to_thread(self._spill, pending)
+            print(f"📝 Spilled {len(pending)} pending command logs to {self.spill_path}")
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize() if self.queue else 0,
+            "sent": self.sent,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+        }
+
+    # ===== WORKER =====
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                batch = await self._next_batch()
+                self.batch = []  # Handed off from here on
+                if self.overflow:
+                    overflow = list(self.overflow)
+                    self.overflow.clear()
+                    await self._spill_shielded(overflow)
+                    await self._send_digest(overflow)
+
+                if not batch:
+                    continue
+
+                backlog = self.queue.qsize()
+                if backlog >= DIGEST_THRESHOLD:
+                    # Falling behind: persist everything locally and post one summary
+                    batch.extend(self._drain())
+                    await self._spill_shielded(batch)
+                    await self._send_digest(batch)
+                elif not await self._send_events(batch):
+                    await self._spill_shielded(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Command logger error: {e}")
+                await asyncio.sleep(self.flush_interval)
+
+    async def _next_batch(self):
+        """Wait for one event, then collect more until the batch is full or the interval ends"""
+        try:
+            first = await asyncio.wait_for(self.queue.get(), timeout=self.flush_interval)
+        except asyncio.TimeoutError:
+            return []
+
+        self.batch = batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < EMBEDS_PER_MESSAGE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _drain(self):
+        events = []
+        while self.queue is not None and not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return events
+
+    async def _send(self, **kwargs) -> bool:
+        """Send to the log channel; False when unavailable, failed or slow"""
+        channel = self.bot.get_channel(self.channel_id)
+        if not channel:
+            return False
+        try:
+            await asyncio.wait_for(channel.send(**kwargs), timeout=SEND_TIMEOUT)
+            return True
+        except asyncio.TimeoutError:
+            print("⚠️ Command log send timed out, spilling to file")
+        except Exception as e:
+            print(f"❌ Error sending command log: {e}")
+        return False
+
+    async def _send_events(self, events) -> bool:
+        for start in range(0, len(events), EMBEDS_PER_MESSAGE):
+            chunk = events[start:start + EMBEDS_PER_MESSAGE]
+            if not await self._send(embeds=[self._event_embed(event) for event in chunk]):
+                return False
+            self.sent += len(chunk)
+        return True
+
+    async def _send_digest(self, events):
+        if await self._send(embed=self._digest_embed(events)):
+            self.sent += len(events)
+
+    # ===== FORMATTING =====
+
+    @staticmethod
+    def _event_embed(event: dict) -> discord.Embed:
+        embed = discord.Embed(
+            title="📝 Command Used",
+            color=config.EMBED_COLOR,
+            timestamp=datetime.fromtimestamp(event["ts"], tz=timezone.utc)
+        )
+
+        # Determine location
+        if event["guild_id"] is None:
+            location = "DM"
+            location_detail = "Direct Message"
+        else:
+            location = f"Server: {event['guild_name']}"
+            location_detail = f"{event['guild_name']} (ID: {event['guild_id']}) in #{event['channel_name']}"
+
+        embed.add_field(name="User", value=f"<@{event['user_id']}> ({event['user_name']})", inline=True)
+        embed.add_field(name="User ID", value=f"`{event['user_id']}`", inline=True)
+        embed.add_field(name="Command Type", value=f"`{event['type']}`", inline=True)
+        embed.add_field(name="Command", value=f"`{event['command']}`", inline=True)
+        embed.add_field(name="Location", value=location, inline=True)
+        embed.add_field(name="Details", value=location_detail, inline=False)
+
+        embed.set_footer(text="Command Logger")
+        return embed
+
+    def _digest_embed(self, events) -> discord.Embed:
+        commands_used = Counter(event["command"] for event in events)
+        users = {event["user_id"] for event in events}
+        first = datetime.fromtimestamp(min(event["ts"] for event in events), tz=timezone.utc)
+
+        embed = discord.Embed(
+            title="📊 Command Usage Digest",
+            description=f"**{len(events)}** commands from **{len(users)}** users since <t:{int(first.timestamp())}:T>",
+            color=config.EMBED_COLOR,
+            timestamp=discord.utils.utcnow()
+        )
+        top = "\n".join(f"`{name}` × {count}" for name, count in commands_used.most_common(15))
+        embed.add_field(name="Top Commands", value=top or "-", inline=False)
+        embed.set_footer(text=f"Command Logger • full events in {self.spill_path}")
+        return embed
+
+    # ===== SPILL FILE =====
+
+    async def _spill_shielded(self, events):
+        """Spill in a worker thread; a cancelled worker leaves the write running for stop() to await"""
+        self.spill_task = asyncio.ensure_future(asyncio.to_thread(self._spill, events))
+        await asyncio.shield(self.spill_task)
+        self.spill_task = None
+
+    def _spill(self, events):
+        """Append events to the JSON-lines spill file (runs in a worker thread)"""
+        try:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                for event in events:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self.spilled += len(events)
+        except OSError as e:
+            self.dropped += len(events)
+            print(f"❌ Could not spill command logs: {e}")
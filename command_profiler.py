@@ -0,0 +1,211 @@
+"""
+On-demand command profiling
+
+The owner arms a command for its next N invocations (owner command: profilecmd). The
+bot's before/after invoke hooks start and stop a profiler around each armed run:
+- 'cprofile': deterministic cProfile, written as profiles/<command>-<time>.pstats
+- 'sample':   a thread samples the loop thread's stack every SAMPLE_INTERVAL, written as
+              collapsed stacks (profiles/<command>-<time>.folded, flamegraph.pl format)
+A top-functions summary is posted to the channel the profiling was armed from.
+
+Both profilers see everything the loop thread runs while the command is in flight,
+including other tasks interleaved at its awaits.
+"""
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import datetime
+import discord
+import config
+
+PROFILE_DIR = 'profiles'
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+TOP_FUNCTIONS = 10
+MODES = ('cprofile', 'sample')
+
+# Armed profiling for one command: remaining runs, mode and where to report
+Session = namedtuple('Session', ['mode', 'remaining', 'channel', 'armed_by'])
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class _StackSampler:
+    """Samples one thread's stack into collapsed-stack counts"""
+
+    def __init__(self, thread_id: int):
+        self.thread_id = thread_id
+        self.counts = Counter()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='command-profiler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopping.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+
+class _Run:
+    """One profiled invocation"""
+
+    def __init__(self, command: str, mode: str):
+        self.command = command
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.profile = None
+        self.sampler = None
+        if mode == 'cprofile':
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.sampler = _StackSampler(threading.get_ident())
+            self.sampler.start()
+
+    def stop(self) -> float:
+        if self.profile:
+            self.profile.disable()
+        else:
+            self.sampler.stop()
+        return time.perf_counter() - self.started
+
+
+class CommandProfiler:
+    """Arms commands for profiling and runs the profilers from the invoke hooks"""
+
+    def __init__(self, output_dir: str = PROFILE_DIR):
+        self.output_dir = output_dir
+        self.sessions = {}          # qualified command name -> Session
+        self.deterministic_active = False  # cProfile cannot be nested
+
+    # ===== ARMING =====
+
+    def arm(self, command: str, count: int, mode: str, channel, armed_by):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of: {', '.join(MODES)}")
+        self.sessions[command] = Session(mode, count, channel, armed_by)
+
+    def disarm(self, command: str = None) -> int:
+        """Disarm one command (or all); returns how many were disarmed"""
+        if command is None:
+            count = len(self.sessions)
+            self.sessions.clear()
+            return count
+        return 1 if self.sessions.pop(command, None) else 0
+
+    # ===== INVOKE HOOKS =====
+
+    def before(self, ctx):
+        """Start profiling if this command is armed (before_invoke)"""
+        if ctx.command is None:
+            return
+        name = ctx.command.qualified_name
+        session = self.sessions.get(name)
+        if session is None:
+            return
+        if session.mode == 'cprofile':
+            if self.deterministic_active:
+                return  # Another cProfile run is in flight; this invocation runs unprofiled
+            self.deterministic_active = True
+
+        remaining = session.remaining - 1
+        if remaining > 0:
+            self.sessions[name] = session._replace(remaining=remaining)
+        else:
+            del self.sessions[name]
+
+        ctx.profile_run = (_Run(name, session.mode), session.channel, remaining)
+
+    async def after(self, ctx):
+        """Stop profiling, write the output and post a summary (after_invoke)"""
+        state = getattr(ctx, 'profile_run', None)
+        if state is None:
+            return
+        ctx.profile_run = None
+        run, channel, remaining = state
+
+        elapsed = run.stop()
+        if run.mode == 'cprofile':
+            self.deterministic_active = False
+
+        try:
+            path, summary = await asyncio.to_thread(self._write, run)
+        except Exception as e:
+            print(f"❌ Could not write profile for {run.command}: {e}")
+            return
+
+        print(f"🔬 Profiled {run.command} ({run.mode}, {elapsed * 1000:.0f}ms) -> {path}")
+        embed = discord.Embed(
+            title=f"🔬 Profile: {run.command}",
+            description=f"Mode **{run.mode}** • {elapsed * 1000:.0f}ms • "
+                        f"{remaining} run(s) left\nSaved to `{path}`",
+            color=config.EMBED_COLOR
+        )
+        embed.add_field(name="Top functions", value=f"```\n{summary[:1000]}\n```", inline=False)
+        try:
+            await channel.send(embed=embed)
+        except Exception as e:
+            print(f"❌ Could not send profile summary: {e}")
+
+    # ===== OUTPUT =====
+
+    def _output_path(self, run, extension: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        safe_name = run.command.replace(' ', '_')
+        return os.path.join(self.output_dir, f"{safe_name}-{stamp}.{extension}")
+
+    def _write(self, run):
+        """Write the profile (runs in a worker thread); returns (path, summary text)"""
+        if run.mode == 'cprofile':
+            path = self._output_path(run, 'pstats')
+            run.profile.dump_stats(path)
+            return path, self._pstats_summary(run.profile)
+
+        path = self._output_path(run, 'folded')
+        counts = run.sampler.counts
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return path, self._sample_summary(counts)
+
+    @staticmethod
+    def _pstats_summary(profile) -> str:
+        """Top functions by own time: tottime / cumtime / calls"""
+        stats = pstats.Stats(profile, stream=io.StringIO())
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:TOP_FUNCTIONS]
+        lines = []
+        for (filename, line, function), (_, calls, tottime, cumtime, _) in rows:
+            label = f"{os.path.basename(filename)}:{line}:{function}" if line else function
+            lines.append(f"{tottime * 1000:7.1f} {cumtime * 1000:7.1f} {calls:6} {label[:40]}")
+        return "own ms   cum ms  calls function\n" + "\n".join(lines)
+
+    @staticmethod
+    def _sample_summary(counts) -> str:
+        """Top leaf functions by share of samples"""
+        total = sum(counts.values())
+        if not total:
+            return "No samples (command finished within one sample interval)"
+        leaves = Counter()
+        for stack, count in counts.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        lines = [f"{count / total:6.1%} {count:6} {label[:45]}" for label, count in leaves.most_common(TOP_FUNCTIONS)]
+        return f"{total} samples\n share  count function\n" + "\n".join(lines)
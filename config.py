@@ -31,6 +31,44 @@ COOLDOWN_HOURS = 0.5
 OLD_ID_MAX = 271800
 NEW_ID_MIN = 271900
 
+# Regional form prefixes (shared by Utils and the shiny summary counters)
+REGIONAL_PREFIXES = (
+    'Alolan ', 'Galarian ', 'Hisuian ', 'Paldean ',
+    'Aqua Breed ', 'Combat Breed ', 'Blaze Breed '
+)
+
+# Form prefixes stripped to get the base species (only the first match is removed)
+BASE_SPECIES_PREFIXES = (
+    'Alolan ', 'Galarian ', 'Hisuian ', 'Paldean ',
+    'Gigantamax ', 'Mega ', 'Primal ',
+    'Aqua Breed ', 'Combat Breed ', 'Blaze Breed '
+)
+
+# Custom shiny dex filters (per user)
+MAX_CUSTOM_FILTERS = 25
+MAX_CUSTOM_FILTER_LENGTH = 300  # Characters per filter expression
+
+# Selective mode ID overrides (stored as intervals)
+MAX_ID_OVERRIDE_RANGES = 1000  # Intervals per user
+
+# Metrics exporter (Prometheus text format on http://METRICS_HOST:METRICS_PORT/metrics, 0 = disabled)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# Event loop stall watchdog (a stall = loop blocked longer than this)
+STALL_THRESHOLD_MS = int(os.getenv("STALL_THRESHOLD_MS", "250"))
+
+# Slow query log (MongoDB commands slower than this are logged with an explain plan)
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", "100"))
+
+# Cluster mode (python cluster.py): total shards (0 = Discord's recommendation)
+# and worker processes (0 = one per CPU core, never more than the shard count)
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+CLUSTER_WORKERS = int(os.getenv("CLUSTER_WORKERS", "0"))
+
+# Graceful shutdown: seconds in-flight commands/sessions get to finish before they are cancelled
+SHUTDOWN_DRAIN_SECONDS = int(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
+
 # Pairing Constants
 MAX_BREED_PAIRS = 2  # Maximum pairs per breed command
 
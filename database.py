@@ -1,7 +1,63 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, OperationFailure, DuplicateKeyError
 from datetime import datetime, timedelta
+from collections import namedtuple
+import asyncio
+import hashlib
 import re
+import time
 import config
+from id_intervals import IntervalOverrides, merge_ranges
+import migrations
+import metrics
+import slow_query
+
+# Bump when the shape of shiny summary documents changes (forces a rebuild)
+SHINY_SUMMARY_VERSION = 1
+
+# Result of Database.get_inventory_stats
+InventoryStats = namedtuple('InventoryStats', [
+    'total', 'normal', 'tripmax', 'tripzero',
+    'males', 'females', 'unknown', 'gmax', 'on_cooldown'
+])
+
+# How long per-name shiny counts (Pokedex view footer) stay cached, in seconds
+SHINY_COUNT_CACHE_TTL = 30
+
+# Attempts for a conflicting ID override read-modify-write
+ID_OVERRIDE_WRITE_RETRIES = 5
+
+
+_summary_rules_cache = (None, None)
+
+
+def _summary_rules() -> str:
+    """
+    Fingerprint of the classification rules baked into summary counters (config.RARE and
+    config.REGIONAL_PREFIXES); summaries built under other rules are rebuilt on read
+    """
+    global _summary_rules_cache
+    key = (id(config.RARE), id(config.REGIONAL_PREFIXES))
+    if _summary_rules_cache[0] != key:
+        digest = hashlib.sha1()
+        for name in sorted(config.RARE):
+            digest.update(name.encode() + b'\0')
+        digest.update(b'|')
+        for prefix in config.REGIONAL_PREFIXES:
+            digest.update(prefix.encode() + b'\0')
+        _summary_rules_cache = (key, digest.hexdigest()[:16])
+    return _summary_rules_cache[1]
+
+
+def _encode_summary_key(name: str) -> str:
+    """Escape characters MongoDB does not allow in field names ('.' and '$')"""
+    return name.replace('%', '%25').replace('.', '%2E').replace('$', '%24')
+
+
+def _decode_summary_key(key: str) -> str:
+    """Reverse of _encode_summary_key"""
+    return key.replace('%24', '$').replace('%2E', '.').replace('%25', '%')
+
 
 class Database:
     def __init__(self):
@@ -12,6 +68,13 @@ class Database:
         self.user_data = None  # NEW: Consolidated user data (settings + cooldowns + id_overrides)
         self.shinies = None
         self.event_shinies = None
+        self.shiny_summaries = None  # Materialized per-user shiny counters
+        self.meta = None  # Bot-wide key/value state (e.g. last synced command tree hash)
+        self._transactions_supported = True
+        # user_id -> (expires_at, {(name, gender): count}) for Pokedex browsing
+        self._shiny_count_cache = {}
+        # Commands slower than config.SLOW_QUERY_MS, with explain plans
+        self.slow_queries = slow_query.SlowQueryLog(config.SLOW_QUERY_MS)
 
     @staticmethod
     def clean_pokemon_name(name: str) -> str:
@@ -27,137 +90,59 @@ class Database:
         return name.strip()
 
     async def connect(self):
-        """Connect to MongoDB with optimized indexes"""
-        self.client = AsyncIOMotorClient(config.MONGODB_URI)
+        """Connect to MongoDB and apply pending schema migrations"""
+        # Command monitoring feeds per-command Mongo latency into metrics and the slow query log
+        self.client = AsyncIOMotorClient(
+            config.MONGODB_URI,
+            event_listeners=[metrics.MongoCommandListener(), self.slow_queries]
+        )
         self.db = self.client[config.DATABASE_NAME]
+        self.slow_queries.attach(asyncio.get_running_loop(), self.db)
 
         # Collections
         self.pokemon = self.db['pokemon']
         self.user_data = self.db['user_data']
         self.shinies = self.db['shinies']
         self.event_shinies = self.db['event_shinies']
+        self.shiny_summaries = self.db['shiny_summaries']
+        self.meta = self.db['bot_meta']
 
-        # ===== CREATE OPTIMIZED INDEXES =====
+        # ===== SCHEMA / INDEXES =====
+        # Versioned migrations (migrations.py): indexes are only touched when the schema version changes
+        await migrations.run_migrations(self)
 
-        # Pokemon collection - compound indexes for common queries
-        await self._create_index_safe(
-            self.pokemon,
-            [("user_id", 1), ("categories", 1), ("gender", 1)],
-            name="user_category_gender"
-        )
-
-        await self._create_index_safe(
-            self.pokemon,
-            [("user_id", 1), ("categories", 1), ("iv_percent", -1)],
-            name="user_category_iv"
-        )
-
-        await self._create_index_safe(
-            self.pokemon,
-            [("user_id", 1), ("pokemon_id", 1)],
-            unique=True,
-            name="user_pokemon_unique"
-        )
-
-        # Additional indexes for filtering
-        await self._create_index_safe(
-            self.pokemon,
-            "user_id",
-            name="user_id_idx"
-        )
-
-        await self._create_index_safe(
-            self.pokemon,
-            "categories",
-            name="categories_idx"
-        )
-
-        await self._create_index_safe(
-            self.pokemon,
-            "dex_number",
-            name="dex_number_idx"
-        )
-
-        # Partial indexes for special types
-        await self._create_index_safe(
-            self.pokemon,
-            [("user_id", 1), ("is_gmax", 1)],
-            partialFilterExpression={"is_gmax": True},
-            name="user_gmax_partial"
-        )
-
-        await self._create_index_safe(
-            self.pokemon,
-            [("user_id", 1), ("is_regional", 1)],
-            partialFilterExpression={"is_regional": True},
-            name="user_regional_partial"
-        )
-
-        # User data collection
-        await self._create_index_safe(
-            self.user_data,
-            "user_id",
-            unique=True,
-            name="user_data_user_id"
-        )
-
-        # Shiny dex indexes
-        await self._create_index_safe(
-            self.shinies,
-            [("user_id", 1), ("pokemon_id", 1)],
-            unique=True,
-            name="shiny_user_pokemon"
-        )
-        await self._create_index_safe(
-            self.shinies,
-            "user_id",
-            name="shiny_user_id"
-        )
-        await self._create_index_safe(
-            self.shinies,
-            "dex_number",
-            name="shiny_dex_number"
-        )
-        await self._create_index_safe(
-            self.shinies,
-            [("user_id", 1), ("name", 1)],
-            name="shiny_user_name"
-        )
-        await self._create_index_safe(
-            self.shinies,
-            [("user_id", 1), ("dex_number", 1)],
-            name="shiny_user_dex"
-        )
+        print("✅ Connected to MongoDB")
 
-        # Event shinies indexes
-        await self._create_index_safe(
-            self.event_shinies,
-            [("user_id", 1), ("pokemon_id", 1)],
-            unique=True,
-            name="event_shiny_user_pokemon"
-        )
-        await self._create_index_safe(
-            self.event_shinies,
-            "user_id",
-            name="event_shiny_user_id"
-        )
-        await self._create_index_safe(
-            self.event_shinies,
-            [("user_id", 1), ("name", 1)],
-            name="event_shiny_user_name"
-        )
+    async def close(self):
+        """Close the MongoDB client (call after every pending write has been awaited)"""
+        if self.client is None:
+            return
+        self.slow_queries.attach(None, None)  # No explains against a closed client
+        self.client.close()
+        self.client = None
+        print("✅ MongoDB connection closed")
 
-        print("✅ Connected to MongoDB with optimized indexes")
+    async def _run_transaction(self, callback):
+        """
+        Run callback(session) inside a multi-document transaction.
+        with_transaction retries the whole callback on TransientTransactionError (e.g. a write
+        conflict with a concurrent run) and retries the commit on UnknownTransactionCommitResult,
+        so callbacks must not depend on state left behind by an aborted attempt.
+        Falls back to running without a session on standalone servers,
+        which do not support transactions.
+        """
+        if self._transactions_supported:
+            try:
+                async with await self.client.start_session() as session:
+                    return await session.with_transaction(callback)
+            except OperationFailure as e:
+                # 20 = IllegalOperation ("Transaction numbers are only allowed on a replica set")
+                if e.code != 20:
+                    raise
+                self._transactions_supported = False
+                print("⚠️  MongoDB transactions unavailable, shiny summary updates are not atomic")
 
-    async def _create_index_safe(self, collection, keys, **kwargs):
-        """Helper method to create indexes with error handling"""
-        try:
-            await collection.create_index(keys, **kwargs)
-            index_name = kwargs.get('name', 'unnamed')
-            print(f"✅ Index ready: {index_name}")
-        except Exception as e:
-            if "already exists" not in str(e).lower():
-                print(f"⚠️  Index creation warning: {e}")
+        return await callback(None)
 
     # ========================================
     # POKEMON OPERATIONS (BREEDING BOT)
@@ -385,6 +370,61 @@ class Database:
         cursor = self.pokemon.find(query)
         return await cursor.to_list(length=None)
 
+    @staticmethod
+    def build_inventory_query(user_id: int, category: str = None, filters: dict = None,
+                              name_filters: list = None, cooldown_ids=None, on_cooldown: bool = None):
+        """
+        Build the inventory browsing query with every filter pushed into MongoDB
+        name_filters: case-insensitive substrings (any may match)
+        on_cooldown: True = only cooldown_ids, False = exclude cooldown_ids, None = ignore
+        """
+        query = {"user_id": user_id}
+
+        if category:
+            query["categories"] = category
+
+        if filters:
+            query.update(filters)
+
+        if name_filters:
+            query["$or"] = [
+                {"name": {"$regex": re.escape(name), "$options": "i"}}
+                for name in name_filters
+            ]
+
+        if on_cooldown is not None:
+            ids = list(cooldown_ids or [])
+            query["pokemon_id"] = {"$in": ids} if on_cooldown else {"$nin": ids}
+
+        return query
+
+    async def get_pokemon_page(self, query: dict, after: tuple = None, limit: int = 20):
+        """
+        OPTIMIZED: Fetch one inventory page with keyset pagination
+        Sorted by (iv_percent desc, pokemon_id desc) via the user_category_iv_id index
+        after: (iv_percent, pokemon_id) of the last row of the previous page
+        """
+        if after is not None:
+            last_iv, last_id = after
+            query = {"$and": [
+                query,
+                {"$or": [
+                    {"iv_percent": {"$lt": last_iv}},
+                    {"iv_percent": last_iv, "pokemon_id": {"$lt": last_id}}
+                ]}
+            ]}
+
+        cursor = self.pokemon.find(
+            query,
+            {"_id": 0, "pokemon_id": 1, "name": 1, "gender": 1, "iv_percent": 1}
+        ).sort([("iv_percent", -1), ("pokemon_id", -1)]).limit(limit)
+
+        return await cursor.to_list(length=limit)
+
+    async def count_inventory(self, query: dict):
+        """Count Pokemon matching a query from build_inventory_query"""
+        return await self.pokemon.count_documents(query)
+
     async def get_pokemon_by_id(self, user_id: int, pokemon_id: int):
         """Get single Pokemon by ID"""
         return await self.pokemon.find_one({
@@ -404,6 +444,70 @@ class Database:
 
         return await self.pokemon.count_documents(query)
 
+    async def get_inventory_stats(self, user_id: int):
+        """
+        OPTIMIZED: All inventory statistics in ONE aggregation
+        $facet computes category/gender/gmax/total counts from a single pass over the
+        user's Pokemon, and a $lookup counts active cooldowns from user_data
+        Returns: InventoryStats
+        """
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$facet": {
+                "by_category": [
+                    {"$unwind": "$categories"},
+                    {"$group": {"_id": "$categories", "count": {"$sum": 1}}}
+                ],
+                "by_gender": [
+                    {"$group": {"_id": "$gender", "count": {"$sum": 1}}}
+                ],
+                "gmax": [
+                    {"$match": {"is_gmax": True}},
+                    {"$count": "count"}
+                ],
+                "total": [
+                    {"$count": "count"}
+                ]
+            }},
+            {"$lookup": {
+                "from": self.user_data.name,
+                "pipeline": [
+                    {"$match": {"user_id": user_id}},
+                    {"$project": {
+                        "_id": 0,
+                        "count": {"$size": {"$filter": {
+                            "input": {"$objectToArray": {"$ifNull": ["$cooldowns", {}]}},
+                            "as": "cd",
+                            "cond": {"$gt": ["$$cd.v", "$$NOW"]}
+                        }}}
+                    }}
+                ],
+                "as": "cooldowns"
+            }}
+        ]
+
+        results = await self.pokemon.aggregate(pipeline).to_list(length=1)
+        facets = results[0] if results else {}
+
+        by_category = {group['_id']: group['count'] for group in facets.get('by_category', [])}
+        by_gender = {group['_id']: group['count'] for group in facets.get('by_gender', [])}
+
+        def single_count(facet):
+            values = facets.get(facet, [])
+            return values[0]['count'] if values else 0
+
+        return InventoryStats(
+            total=single_count('total'),
+            normal=by_category.get(config.NORMAL_CATEGORY, 0),
+            tripmax=by_category.get(config.TRIPMAX_CATEGORY, 0),
+            tripzero=by_category.get(config.TRIPZERO_CATEGORY, 0),
+            males=by_gender.get('male', 0),
+            females=by_gender.get('female', 0),
+            unknown=by_gender.get('unknown', 0),
+            gmax=single_count('gmax'),
+            on_cooldown=single_count('cooldowns')
+        )
+
     # ========================================
     # USER DATA (SETTINGS + COOLDOWNS + ID_OVERRIDES)
     # ========================================
@@ -427,7 +531,8 @@ class Database:
                     "show_info": "detailed"
                 },
                 "cooldowns": {},
-                "id_overrides": {}
+                "id_overrides": {},
+                "id_override_ranges": []
             }
 
         # Ensure all fields exist
@@ -440,6 +545,7 @@ class Database:
         })
         doc.setdefault("cooldowns", {})
         doc.setdefault("id_overrides", {})
+        doc.setdefault("id_override_ranges", [])
 
         return doc
 
@@ -611,216 +717,600 @@ class Database:
     # ID OVERRIDE OPERATIONS
     # ========================================
 
+    @staticmethod
+    def id_overrides_from_doc(doc: dict):
+        """
+        Build IntervalOverrides from a user_data document
+        Reads id_override_ranges plus any not-yet-migrated per-ID id_overrides map
+        """
+        if not doc:
+            return IntervalOverrides()
+        return IntervalOverrides.from_storage(doc.get("id_override_ranges"), doc.get("id_overrides"))
+
+    async def _update_id_overrides(self, user_id: int, mutate):
+        """
+        Read-modify-write a user's override intervals
+        mutate(overrides) changes the IntervalOverrides in place and returns a result (None aborts).
+        The write only applies if the stored ranges are unchanged since the read (retried otherwise);
+        legacy per-ID overrides are migrated into ranges on the first write.
+        """
+        for attempt in range(ID_OVERRIDE_WRITE_RETRIES):
+            doc = await self.user_data.find_one(
+                {"user_id": user_id},
+                {"id_override_ranges": 1, "id_overrides": 1}
+            )
+            overrides = self.id_overrides_from_doc(doc)
+            result = mutate(overrides)
+            if result is None:
+                return None
+
+            stored = doc.get("id_override_ranges") if doc else None
+            query = {"user_id": user_id}
+            query["id_override_ranges"] = stored if stored is not None else {"$exists": False}
+
+            try:
+                update = await self.user_data.update_one(
+                    query,
+                    {
+                        "$set": {"id_override_ranges": overrides.to_storage()},
+                        "$unset": {"id_overrides": ""}
+                    },
+                    upsert=doc is None
+                )
+            except DuplicateKeyError:
+                continue  # Another command created the document first
+
+            if update.matched_count or update.upserted_id is not None:
+                return result
+
+        print(f"⚠️ ID override update for user {user_id} kept conflicting, giving up")
+        return None
+
     async def get_id_overrides(self, user_id: int):
         """
         Get all ID overrides for a user
-        Returns: dict of {pokemon_id: 'old'/'new'}
+        Returns: IntervalOverrides (dict-like: .get(pokemon_id), `in`, iteration over intervals)
         """
-        user_data = await self.get_user_data(user_id)
-        overrides = user_data.get("id_overrides", {})
-        # Convert string keys to int
-        return {int(k): v for k, v in overrides.items()}
+        doc = await self.user_data.find_one(
+            {"user_id": user_id},
+            {"id_override_ranges": 1, "id_overrides": 1}
+        )
+        return self.id_overrides_from_doc(doc)
 
     async def get_id_override(self, user_id: int, pokemon_id: int):
         """
         Get override for a specific ID
         Returns: 'old', 'new', or None if no override
         """
-        doc = await self.user_data.find_one(
-            {"user_id": user_id},
-            {"id_overrides": 1}
-        )
-        if not doc:
-            return None
-
-        overrides = doc.get("id_overrides", {})
-        return overrides.get(str(pokemon_id))
+        overrides = await self.get_id_overrides(user_id)
+        return overrides.get(pokemon_id)
 
     async def set_id_override(self, user_id: int, pokemon_id: int, category: str):
         """
         Set an ID override for selective mode
         category: 'old' or 'new'
         """
-        if category not in ['old', 'new']:
-            return False
-
-        await self.user_data.update_one(
-            {"user_id": user_id},
-            {"$set": {f"id_overrides.{pokemon_id}": category}},
-            upsert=True
-        )
-        return True
-
-    # Add this new method to your Database class:
+        return await self.set_id_override_ranges(user_id, [(pokemon_id, pokemon_id)], category)
 
     async def set_id_overrides_bulk(self, user_id: int, pokemon_ids: list, category: str):
         """
-        OPTIMIZED: Set multiple ID overrides in a single operation
+        Set multiple ID overrides (consecutive IDs are stored as one interval)
         category: 'old' or 'new'
         """
-        if not pokemon_ids or category not in ['old', 'new']:
+        if not pokemon_ids:
             return False
+        return await self.set_id_override_ranges(
+            user_id, merge_ranges((pid, pid) for pid in pokemon_ids), category
+        )
 
-        # Build update dict for all IDs at once
-        update_dict = {f"id_overrides.{pid}": category for pid in pokemon_ids}
+    async def set_id_override_ranges(self, user_id: int, ranges: list, category: str):
+        """
+        OPTIMIZED: Override inclusive (start, end) ID ranges in a single write
+        Returns False for an invalid category or when the interval limit would be exceeded
+        """
+        if not ranges or category not in ['old', 'new']:
+            return False
 
-        await self.user_data.update_one(
-            {"user_id": user_id},
-            {"$set": update_dict},
-            upsert=True
-        )
-        return True
+        def apply(overrides):
+            for start, end in ranges:
+                overrides.set_range(start, end, category)
+            return len(overrides) <= config.MAX_ID_OVERRIDE_RANGES or None
+
+        return bool(await self._update_id_overrides(user_id, apply))
 
     async def remove_id_override(self, user_id: int, pokemon_id: int):
         """Remove an ID override"""
-        await self.user_data.update_one(
-            {"user_id": user_id},
-            {"$unset": {f"id_overrides.{pokemon_id}": ""}}
-        )
+        await self.remove_id_override_ranges(user_id, [(pokemon_id, pokemon_id)])
+
+    async def remove_id_override_ranges(self, user_id: int, ranges: list):
+        """
+        Remove overrides for inclusive (start, end) ID ranges
+        Returns: list of removed (start, end, category) pieces
+        """
+        def apply(overrides):
+            removed = []
+            for start, end in ranges:
+                removed.extend(overrides.remove_range(start, end))
+            return removed or None  # Nothing to write when nothing was overridden
+
+        return await self._update_id_overrides(user_id, apply) or []
 
     async def clear_all_id_overrides(self, user_id: int):
-        """Clear all ID overrides for a user"""
+        """Clear all ID overrides for a user, returns the number of IDs cleared"""
         doc = await self.user_data.find_one(
             {"user_id": user_id},
-            {"id_overrides": 1}
+            {"id_override_ranges": 1, "id_overrides": 1}
         )
         if not doc:
             return 0
 
-        count = len(doc.get("id_overrides", {}))
+        count = self.id_overrides_from_doc(doc).id_count()
 
         await self.user_data.update_one(
             {"user_id": user_id},
-            {"$set": {"id_overrides": {}}}
+            {"$set": {"id_override_ranges": []}, "$unset": {"id_overrides": ""}}
         )
         return count
 
+    async def count_pokemon_in_id_ranges(self, user_id: int, ranges: list):
+        """Count a user's Pokemon whose IDs fall in any inclusive (start, end) range"""
+        if not ranges:
+            return 0
+        return await self.pokemon.count_documents({
+            "user_id": user_id,
+            "$or": [{"pokemon_id": {"$gte": start, "$lte": end}} for start, end in ranges]
+        })
+
+    # ========================================
+    # CUSTOM FILTER OPERATIONS
+    # ========================================
+
+    async def get_custom_filters(self, user_id: int):
+        """
+        Get a user's custom shiny dex filters
+        Returns: dict of {name: expression}
+        """
+        doc = await self.user_data.find_one(
+            {"user_id": user_id},
+            {"custom_filters": 1}
+        )
+        if not doc:
+            return {}
+        return doc.get("custom_filters", {})
+
+    async def set_custom_filter(self, user_id: int, name: str, expression: str):
+        """Create or replace a custom filter (name must be validated by the caller)"""
+        await self.user_data.update_one(
+            {"user_id": user_id},
+            {"$set": {f"custom_filters.{name}": expression}},
+            upsert=True
+        )
+
+    async def delete_custom_filter(self, user_id: int, name: str):
+        """Delete a custom filter, returns True if it existed"""
+        result = await self.user_data.update_one(
+            {"user_id": user_id, f"custom_filters.{name}": {"$exists": True}},
+            {"$unset": {f"custom_filters.{name}": ""}}
+        )
+        return result.modified_count > 0
+
     # ========================================
     # SHINY DEX OPERATIONS
     # ========================================
 
+    @staticmethod
+    def _shiny_summary_inc(shiny: dict, sign: int, inc: dict = None):
+        """
+        Build (or extend) the $inc document that adds (sign=1) or removes (sign=-1)
+        one shiny from a user's summary counters
+        """
+        if inc is None:
+            inc = {}
+
+        name = shiny.get('name', '')
+        gender = shiny.get('gender', 'unknown')
+
+        paths = [
+            'total',
+            f"by_dex.{shiny.get('dex_number', 0)}",
+            f"by_form.{_encode_summary_key(name)}|{gender}",
+            f"by_gender.{gender}"
+        ]
+        if name in config.RARE:
+            paths.append('rare')
+        if name.startswith(config.REGIONAL_PREFIXES):
+            paths.append('regional')
+        if shiny.get('level', 0) == 1:
+            paths.append('mint')
+
+        for path in paths:
+            inc[path] = inc.get(path, 0) + sign
+
+        return inc
+
+    @staticmethod
+    def _empty_shiny_summary(user_id: int):
+        """Summary document for a user with no shinies"""
+        return {
+            "user_id": user_id,
+            "version": SHINY_SUMMARY_VERSION,
+            "rules": _summary_rules(),
+            "total": 0,
+            "rare": 0,
+            "regional": 0,
+            "mint": 0,
+            "by_dex": {},
+            "by_form": {},
+            "by_gender": {}
+        }
+
+    async def _rebuild_shiny_summary(self, user_id: int, session=None):
+        """Recount a user's shiny summary from the shinies collection (server-side aggregation)"""
+        summary = self._empty_shiny_summary(user_id)
+
+        by_dex = await self.get_shiny_dex_counts(user_id, session=session)
+        by_form = await self.get_shiny_form_counts(user_id, session=session)
+        mint = await self.count_level_one_shinies(user_id, session=session)
+
+        for dex_num, count in by_dex.items():
+            summary['by_dex'][str(dex_num)] = count
+
+        for (name, gender), count in by_form.items():
+            summary['by_form'][f"{_encode_summary_key(name)}|{gender}"] = count
+            summary['by_gender'][gender] = summary['by_gender'].get(gender, 0) + count
+            summary['total'] += count
+            if name in config.RARE:
+                summary['rare'] += count
+            if name.startswith(config.REGIONAL_PREFIXES):
+                summary['regional'] += count
+
+        summary['mint'] = mint
+
+        await self.shiny_summaries.replace_one(
+            {"user_id": user_id}, summary, upsert=True, session=session
+        )
+        return summary
+
+    async def _ensure_shiny_summary(self, user_id: int, session=None):
+        """
+        Make sure a current summary exists before applying incremental updates
+        Writers call this once before their transaction (where a rebuild is cheap to run) and
+        again inside it, where it is normally a single find_one
+        """
+        doc = await self.shiny_summaries.find_one(
+            {"user_id": user_id}, {"version": 1, "rules": 1}, session=session
+        )
+        if not doc or doc.get("version") != SHINY_SUMMARY_VERSION or doc.get("rules") != _summary_rules():
+            await self._rebuild_shiny_summary(user_id, session)
+
+    async def _apply_shiny_summary_inc(self, user_id: int, inc: dict, session=None):
+        """Apply a counter delta to the user's summary document"""
+        inc = {path: n for path, n in inc.items() if n}
+        if not inc:
+            return
+
+        await self.shiny_summaries.update_one(
+            {"user_id": user_id},
+            {"$inc": inc},
+            session=session
+        )
+
+    async def get_shiny_summary(self, user_id: int):
+        """
+        OPTIMIZED: Read the materialized shiny counters for a user (one small document)
+        Returns: dict with total/rare/regional/mint and
+                 by_dex {dex_number: count}, by_form {(name, gender): count}, by_gender {gender: count}
+        """
+        doc = await self.shiny_summaries.find_one({"user_id": user_id})
+
+        if not doc or doc.get("version") != SHINY_SUMMARY_VERSION or doc.get("rules") != _summary_rules():
+            doc = await self._rebuild_shiny_summary(user_id)
+
+        by_form = {}
+        for key, count in doc.get("by_form", {}).items():
+            if count <= 0:
+                continue
+            name, _, gender = key.rpartition('|')
+            by_form[(_decode_summary_key(name), gender)] = count
+
+        return {
+            "total": doc.get("total", 0),
+            "rare": doc.get("rare", 0),
+            "regional": doc.get("regional", 0),
+            "mint": doc.get("mint", 0),
+            "by_dex": {int(k): v for k, v in doc.get("by_dex", {}).items() if v > 0},
+            "by_form": by_form,
+            "by_gender": {k: v for k, v in doc.get("by_gender", {}).items() if v > 0}
+        }
+
+    # ===== SHINY AGGREGATIONS =====
+
+    async def _aggregate_shiny_counts(self, collection, user_id: int, group_id, session=None):
+        """Run a $match/$group count pipeline for one user and return the raw groups"""
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$group": {"_id": group_id, "count": {"$sum": 1}}}
+        ]
+        cursor = collection.aggregate(pipeline, session=session)
+        return await cursor.to_list(length=None)
+
+    async def get_shiny_dex_counts(self, user_id: int, event: bool = False, session=None):
+        """
+        OPTIMIZED: Count shinies per dex number inside MongoDB
+        Returns: {dex_number: count}
+        """
+        collection = self.event_shinies if event else self.shinies
+        groups = await self._aggregate_shiny_counts(collection, user_id, "$dex_number", session)
+        return {group['_id']: group['count'] for group in groups if group['_id'] is not None}
+
+    async def get_shiny_form_counts(self, user_id: int, event: bool = False, session=None):
+        """
+        OPTIMIZED: Count shinies per (name, gender) inside MongoDB
+        Returns: {(name, gender): count}
+        """
+        collection = self.event_shinies if event else self.shinies
+        groups = await self._aggregate_shiny_counts(
+            collection, user_id,
+            {"name": "$name", "gender": {"$ifNull": ["$gender", "unknown"]}},
+            session
+        )
+        return {(group['_id'].get('name', ''), group['_id']['gender']): group['count'] for group in groups}
+
+    async def count_level_one_shinies(self, user_id: int, event: bool = False, session=None):
+        """Count level 1 (mint) shinies inside MongoDB"""
+        collection = self.event_shinies if event else self.shinies
+        return await collection.count_documents({"user_id": user_id, "level": 1}, session=session)
+
+    def _invalidate_shiny_counts(self, user_id: int):
+        """Drop cached per-name shiny counts after a user's shinies change"""
+        self._shiny_count_cache.pop(user_id, None)
+
+    async def count_shinies_by_name(self, user_id: int, name: str, gender: str = None):
+        """
+        OPTIMIZED: Count a user's shinies of one Pokemon (optionally one gender)
+        Uses the (user_id, name, gender) index and a short per-user cache,
+        so flipping through the Pokedex view does not re-count the same form
+        """
+        now = time.monotonic()
+        cached = self._shiny_count_cache.get(user_id)
+        if cached is None or cached[0] <= now:
+            # Drop other users' expired entries so the cache cannot grow unbounded
+            if len(self._shiny_count_cache) > 1000:
+                self._shiny_count_cache = {
+                    uid: entry for uid, entry in self._shiny_count_cache.items() if entry[0] > now
+                }
+            cached = (now + SHINY_COUNT_CACHE_TTL, {})
+            self._shiny_count_cache[user_id] = cached
+
+        counts = cached[1]
+        key = (name, gender)
+        if key in counts:
+            metrics.CACHE_HITS.inc('shiny_counts')
+        else:
+            metrics.CACHE_MISSES.inc('shiny_counts')
+            query = {"user_id": user_id, "name": name}
+            if gender:
+                query["gender"] = gender
+            counts[key] = await self.shinies.count_documents(query)
+
+        return counts[key]
+
+    async def get_shiny_iv_stats(self, user_id: int):
+        """
+        Get IV statistics for a user's shinies, computed inside MongoDB
+        Returns: dict with avg, max, min, min_non_zero (all 0 when no shinies)
+        """
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$group": {
+                "_id": None,
+                "avg": {"$avg": "$iv_percent"},
+                "max": {"$max": "$iv_percent"},
+                "min": {"$min": "$iv_percent"},
+                # $min ignores null, so zero IVs are mapped to null here
+                "min_non_zero": {"$min": {
+                    "$cond": [{"$gt": ["$iv_percent", 0]}, "$iv_percent", None]
+                }}
+            }}
+        ]
+
+        results = await self.shinies.aggregate(pipeline).to_list(length=1)
+        if not results:
+            return {"avg": 0, "max": 0, "min": 0, "min_non_zero": 0}
+
+        stats = results[0]
+        return {
+            "avg": stats.get("avg") or 0,
+            "max": stats.get("max") or 0,
+            "min": stats.get("min") or 0,
+            "min_non_zero": stats.get("min_non_zero") or 0
+        }
+
     async def add_shiny(self, user_id: int, shiny_data: dict):
-        """Add or update a single shiny"""
+        """Add or update a single shiny (summary counters updated in the same transaction)"""
         try:
             # Clean the name before storing
             if 'name' in shiny_data:
                 shiny_data['name'] = self.clean_pokemon_name(shiny_data['name'])
 
-            # Check if exists
-            existing = await self.shinies.find_one({
-                "user_id": user_id,
-                "pokemon_id": shiny_data['pokemon_id']
-            })
-
-            if existing:
-                # Update existing
-                await self.shinies.update_one(
-                    {
-                        "user_id": user_id,
-                        "pokemon_id": shiny_data['pokemon_id']
-                    },
-                    {
-                        "$set": {
-                            "name": shiny_data['name'],
-                            "gender": shiny_data['gender'],
-                            "level": shiny_data['level'],
-                            "iv_percent": shiny_data['iv_percent'],
-                            "dex_number": shiny_data['dex_number']
-                        }
+            async def write(session):
+                await self._ensure_shiny_summary(user_id, session)
+
+                # Check if exists
+                existing = await self.shinies.find_one({
+                    "user_id": user_id,
+                    "pokemon_id": shiny_data['pokemon_id']
+                }, session=session)
+
+                if existing:
+                    # Update existing
+                    updated_fields = {
+                        "name": shiny_data['name'],
+                        "gender": shiny_data['gender'],
+                        "level": shiny_data['level'],
+                        "iv_percent": shiny_data['iv_percent'],
+                        "dex_number": shiny_data['dex_number']
                     }
-                )
-                return False
-            else:
-                # Insert new
-                shiny_data['user_id'] = user_id
-                await self.shinies.insert_one(shiny_data)
-                return True
+                    await self.shinies.update_one(
+                        {
+                            "user_id": user_id,
+                            "pokemon_id": shiny_data['pokemon_id']
+                        },
+                        {"$set": updated_fields},
+                        session=session
+                    )
+                    inc = self._shiny_summary_inc(existing, -1)
+                    self._shiny_summary_inc(updated_fields, 1, inc)
+                    await self._apply_shiny_summary_inc(user_id, inc, session)
+                    return False
+                else:
+                    # Insert new
+                    shiny_data['user_id'] = user_id
+                    await self.shinies.insert_one(shiny_data, session=session)
+                    await self._apply_shiny_summary_inc(
+                        user_id, self._shiny_summary_inc(shiny_data, 1), session
+                    )
+                    return True
+
+            # Rebuild a stale summary before the transaction, not inside it
+            await self._ensure_shiny_summary(user_id)
+            result = await self._run_transaction(write)
+            self._invalidate_shiny_counts(user_id)
+            return result
 
         except Exception as e:
             print(f"Error adding/updating shiny: {e}")
             return False
 
     async def add_shinies_bulk(self, user_id: int, shinies_list: list):
-        """Add multiple shinies using bulk operations"""
+        """Add multiple shinies using bulk operations (summary counters updated in the same transaction)"""
         if not shinies_list:
             return 0
 
-        # Clean all names first
+        from pymongo import UpdateOne
+
+        # Clean all names first, keeping the last entry per pokemon_id
+        unique_shinies = {}
         for shiny in shinies_list:
             if 'name' in shiny:
                 shiny['name'] = self.clean_pokemon_name(shiny['name'])
+            unique_shinies[shiny['pokemon_id']] = shiny
+        shinies_list = list(unique_shinies.values())
 
-        shiny_ids = [s['pokemon_id'] for s in shinies_list]
+        shiny_ids = list(unique_shinies.keys())
 
-        # Find existing shinies
-        existing_docs = await self.shinies.find(
-            {"user_id": user_id, "pokemon_id": {"$in": shiny_ids}},
-            {"pokemon_id": 1}
-        ).to_list(length=None)
+        async def write(session):
+            await self._ensure_shiny_summary(user_id, session)
 
-        existing_ids = {doc['pokemon_id'] for doc in existing_docs}
+            # Find existing shinies (with the fields the summary counts on)
+            existing_docs = await self.shinies.find(
+                {"user_id": user_id, "pokemon_id": {"$in": shiny_ids}},
+                {"pokemon_id": 1, "name": 1, "gender": 1, "level": 1, "dex_number": 1},
+                session=session
+            ).to_list(length=None)
 
-        new_shinies = []
-        update_operations = []
+            existing_by_id = {doc['pokemon_id']: doc for doc in existing_docs}
 
-        for shiny in shinies_list:
-            pid = shiny['pokemon_id']
+            new_shinies = []
+            bulk_ops = []
+            inc = {}
 
-            if pid not in existing_ids:
-                # New shiny
-                shiny['user_id'] = user_id
-                new_shinies.append(shiny)
-            else:
-                # Existing - update
-                update_operations.append({
-                    'filter': {'user_id': user_id, 'pokemon_id': pid},
-                    'update': {
-                        '$set': {
-                            'name': shiny['name'],
-                            'gender': shiny['gender'],
-                            'level': shiny['level'],
-                            'iv_percent': shiny['iv_percent'],
-                            'dex_number': shiny['dex_number']
-                        }
-                    }
-                })
+            for shiny in shinies_list:
+                pid = shiny['pokemon_id']
 
-        new_count = 0
-
-        # Bulk insert new shinies
-        if new_shinies:
-            try:
-                result = await self.shinies.insert_many(new_shinies, ordered=False)
-                new_count = len(result.inserted_ids)
-            except Exception as e:
-                if "duplicate key" in str(e).lower():
-                    new_count = len(new_shinies)
+                if pid not in existing_by_id:
+                    # New shiny
+                    shiny['user_id'] = user_id
+                    new_shinies.append(shiny)
+                    self._shiny_summary_inc(shiny, 1, inc)
                 else:
-                    print(f"Bulk insert shiny error: {e}")
-
-        # Bulk update existing shinies
-        if update_operations:
-            from pymongo import UpdateOne
-            bulk_ops = [UpdateOne(op['filter'], op['update']) for op in update_operations]
-            try:
-                await self.shinies.bulk_write(bulk_ops, ordered=False)
-            except Exception as e:
-                print(f"Bulk update shiny error: {e}")
+                    # Existing - update
+                    updated_fields = {
+                        'name': shiny['name'],
+                        'gender': shiny['gender'],
+                        'level': shiny['level'],
+                        'iv_percent': shiny['iv_percent'],
+                        'dex_number': shiny['dex_number']
+                    }
+                    bulk_ops.append(UpdateOne(
+                        {'user_id': user_id, 'pokemon_id': pid},
+                        {'$set': updated_fields}
+                    ))
+                    self._shiny_summary_inc(existing_by_id[pid], -1, inc)
+                    self._shiny_summary_inc(updated_fields, 1, inc)
+
+            new_count = 0
+
+            # Bulk insert new shinies
+            if new_shinies:
+                try:
+                    result = await self.shinies.insert_many(new_shinies, ordered=False, session=session)
+                    new_count = len(result.inserted_ids)
+                except BulkWriteError as e:
+                    # Without transactions a concurrent run may have inserted some of these first:
+                    # keep our partial inserts and only count those. (In a transaction the same race
+                    # is a write conflict, which with_transaction retries.)
+                    errors = e.details.get('writeErrors', [])
+                    if session is not None or any(error.get('code') != 11000 for error in errors):
+                        raise
+                    new_count = e.details.get('nInserted', 0)
+                    for error in errors:
+                        self._shiny_summary_inc(new_shinies[error['index']], -1, inc)
+
+            # Bulk update existing shinies
+            if bulk_ops:
+                await self.shinies.bulk_write(bulk_ops, ordered=False, session=session)
+
+            await self._apply_shiny_summary_inc(user_id, inc, session)
+            return new_count
 
-        return new_count
+        try:
+            await self._ensure_shiny_summary(user_id)
+            result = await self._run_transaction(write)
+            self._invalidate_shiny_counts(user_id)
+            return result
+        except Exception as e:
+            print(f"Bulk shiny write error: {e}")
+            return 0
 
     async def remove_shinies(self, user_id: int, pokemon_ids: list):
-        """Remove shinies by IDs"""
-        result = await self.shinies.delete_many({
-            "user_id": user_id,
-            "pokemon_id": {"$in": pokemon_ids}
-        })
-        return result.deleted_count
+        """Remove shinies by IDs (summary counters updated in the same transaction)"""
+        async def write(session):
+            await self._ensure_shiny_summary(user_id, session)
+
+            query = {"user_id": user_id, "pokemon_id": {"$in": pokemon_ids}}
+            inc = {}
+            async for shiny in self.shinies.find(
+                query,
+                {"name": 1, "gender": 1, "level": 1, "dex_number": 1},
+                session=session
+            ):
+                self._shiny_summary_inc(shiny, -1, inc)
+
+            result = await self.shinies.delete_many(query, session=session)
+            await self._apply_shiny_summary_inc(user_id, inc, session)
+            return result.deleted_count
+
+        await self._ensure_shiny_summary(user_id)
+        result = await self._run_transaction(write)
+        self._invalidate_shiny_counts(user_id)
+        return result
 
     async def clear_all_shinies(self, user_id: int):
-        """Clear all shinies for a user"""
-        result = await self.shinies.delete_many({"user_id": user_id})
-        return result.deleted_count
+        """Clear all shinies for a user (and reset the summary in the same transaction)"""
+        async def write(session):
+            result = await self.shinies.delete_many({"user_id": user_id}, session=session)
+            await self.shiny_summaries.replace_one(
+                {"user_id": user_id},
+                self._empty_shiny_summary(user_id),
+                upsert=True,
+                session=session
+            )
+            return result.deleted_count
+
+        result = await self._run_transaction(write)
+        self._invalidate_shiny_counts(user_id)
+        return result
 
     async def get_all_shinies(self, user_id: int):
         """Get all shinies for a user"""
@@ -1026,5 +1516,27 @@ class Database:
             await self.update_settings(user_id, updates)
 
 
+    # ========================================
+    # BOT META (key/value state shared by all instances)
+    # ========================================
+
+    async def get_meta(self, key: str, default=None):
+        """Get a bot-wide meta value"""
+        doc = await self.meta.find_one({"_id": key})
+        return doc["value"] if doc else default
+
+    async def set_meta(self, key: str, value):
+        """Set a bot-wide meta value"""
+        await self.meta.update_one(
+            {"_id": key},
+            {"$set": {"value": value, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+
+# Per-method latency for every public coroutine (connect is timed by the startup pipeline);
+# the method name is also what the slow query log attributes commands to
+metrics.instrument_class(Database, metrics.DB_METHOD_LATENCY, skip=('connect', 'close'), context=slow_query.current_method)
+
     # Global database instance
 db = Database()
@@ -1,5 +1,6 @@
 from PIL import Image, ImageDraw, ImageFont, ImageColor
 import aiohttp
+import metrics
 from io import BytesIO
 import os
 
@@ -48,9 +49,9 @@ class DexImageGenerator:
         # Gender symbol size
         self.gender_symbol_size = 24
 
-        # Initialize font and emoji download on cog load
-        self.bot.loop.create_task(self.download_fonts())
-        self.bot.loop.create_task(self.download_gender_symbols())
+        # Initialize font and emoji download on cog load (shutdown waits for unfinished downloads)
+        bot.shutdown_coordinator.track(self.bot.loop.create_task(self.download_fonts()))
+        bot.shutdown_coordinator.track(self.bot.loop.create_task(self.download_gender_symbols()))
 
     async def download_file_from_github(self, file_path: str, save_path: str):
         """Download a single file from GitHub repository"""
@@ -177,6 +178,7 @@ class DexImageGenerator:
             print(f"❌ Error loading gender symbol for {gender}: {e}")
         return None
 
+    @metrics.timed(metrics.HTTP_LATENCY, 'poketwo_cdn')
     async def fetch_pokemon_image(self, cdn_number: int, gender_key: str = None, has_gender_diff: bool = False):
         """Fetch Pokemon image from Poketwo CDN"""
         # Add 'F' suffix for female gender difference Pokemon
@@ -305,6 +307,7 @@ class DexImageGenerator:
         # Draw main title (will be drawn after overlay composite)
         return main_text, filter_text, title_x, title_y, title_font, filter_font, header_x, header_w, page_text, page_font
 
+    @metrics.timed(metrics.RENDER_LATENCY, 'dex')
     async def create_dex_image(self, pokemon_entries: list, utils, header_info: dict = None, page_info: dict = None):
         """
         Create dex image with Pokemon sprites
@@ -0,0 +1,149 @@
+"""
+Precomputed dex entry views with filter bitsets
+
+Each view is an immutable tuple of dex entries plus integer bitsets over entry
+positions (bit i = entry i) for every region, type, named filter and species flag.
+A filtered dex is a few bitset ANDs followed by a gather of the selected entries.
+Built with the reference data snapshot and shared (read-only) by the display cogs.
+"""
+import species_registry
+
+
+def iter_bits(mask: int):
+    """Positions of the set bits in a mask, ascending"""
+    bits = bin(mask)[:1:-1]  # Least significant bit first
+    position = bits.find('1')
+    while position != -1:
+        yield position
+        position = bits.find('1', position + 1)
+
+
+class DexView:
+    """Immutable dex entry array with region/type/filter/flag bitsets"""
+
+    def __init__(self, entries, names, registry, named_filters=None,
+                 gender_flag=species_registry.GENDER_DIFF):
+        """
+        entries: tuple of dex entries (any shape), in display order
+        names: Pokemon name for each entry
+        named_filters: {filter_key: iterable of names} from filters.py
+        gender_flag: registry flag used for the gender_diff bitset
+        """
+        self.entries = tuple(entries)
+        self.names = tuple(names)
+        self.all = (1 << len(self.entries)) - 1
+
+        self.positions = {}            # name -> bitset of its entries
+        self.by_region = {}            # region -> bitset
+        self.by_type = {}              # type -> bitset
+        self.rare = 0
+        self.regional = 0
+        self.gender_diff = 0
+
+        for position, name in enumerate(self.names):
+            bit = 1 << position
+            self.positions[name] = self.positions.get(name, 0) | bit
+
+            sid = registry.id_of(name)
+            if sid is None:
+                continue
+
+            flags = registry.flags[sid]
+            if flags & species_registry.HAS_INFO:
+                region = registry.regions[registry.region[sid]]
+                self.by_region[region] = self.by_region.get(region, 0) | bit
+                for type_index in (registry.type1[sid], registry.type2[sid]):
+                    if type_index:
+                        pokemon_type = registry.types[type_index]
+                        self.by_type[pokemon_type] = self.by_type.get(pokemon_type, 0) | bit
+
+            if flags & species_registry.RARE:
+                self.rare |= bit
+            if flags & species_registry.REGIONAL:
+                self.regional |= bit
+            if flags & gender_flag:
+                self.gender_diff |= bit
+
+        self.by_filter = {
+            key: self.mask_of(filter_names)
+            for key, filter_names in (named_filters or {}).items()
+        }
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ===== SELECTION =====
+
+    def mask_of(self, names) -> int:
+        """Bitset of the entries for a collection of names (unknown names ignored)"""
+        positions = self.positions
+        mask = 0
+        for name in names:
+            mask |= positions.get(name, 0)
+        return mask
+
+    def select(self, region: str = None, types=(), named_filter: str = None,
+               include=None, exclude=None, within: int = None) -> int:
+        """
+        Bitset of entries matching every given criterion
+        region/types: exact region and type names (entries without info never match)
+        include/exclude: collections of names (e.g. from the name search index)
+        within: starting bitset (e.g. a compiled filter expression), defaults to all entries
+        """
+        mask = self.all if within is None else within
+        if region:
+            mask &= self.by_region.get(region, 0)
+        for pokemon_type in types:
+            mask &= self.by_type.get(pokemon_type, 0)
+        if named_filter:
+            mask &= self.by_filter.get(named_filter, 0)
+        if include is not None:
+            mask &= self.mask_of(include)
+        if exclude:
+            mask &= ~self.mask_of(exclude)
+        return mask
+
+    def gather(self, mask: int):
+        """Selected entries in display order"""
+        if mask == self.all:
+            return list(self.entries)
+        entries = self.entries
+        return [entries[position] for position in iter_bits(mask)]
+
+    @staticmethod
+    def count(mask: int) -> int:
+        """Number of selected entries"""
+        return bin(mask).count('1')
+
+    def form_count(self, mask: int) -> int:
+        """Number of selected dex slots (gender-difference entries count twice)"""
+        return self.count(mask) + self.count(mask & self.gender_diff)
+
+
+def build_dex_views(registry, basic_entries, full_entries, event_entries, named_filters, dex_number):
+    """
+    Build the shared views
+    dex_number: name -> dex number (same resolution as Utils.get_dex_number)
+    Returns: {'basic', 'full', 'event', 'universe': DexView}
+    The universe view holds every shiny dex form plus every form a named filter lists
+    (filters may include forms outside the shiny dex) as (dex_num, name, has_gender_diff),
+    sorted by dex number. Filter expressions are compiled against it.
+    """
+    universe_entries = list(full_entries)
+    seen = {name for _, name, _ in full_entries}
+    for filter_names in named_filters.values():
+        for name in filter_names:
+            if name not in seen:
+                seen.add(name)
+                universe_entries.append(
+                    (dex_number(name), name, registry.has_flag(name, species_registry.GENDER_DIFF))
+                )
+    universe_entries.sort(key=lambda entry: entry[0])  # Stable: shiny dex order within a number
+
+    return {
+        'basic': DexView(basic_entries, (name for _, name in basic_entries), registry, named_filters),
+        'full': DexView(full_entries, (name for _, name, _ in full_entries), registry, named_filters),
+        'event': DexView(event_entries, (name for name, _ in event_entries), registry, named_filters,
+                         gender_flag=species_registry.EVENT_GENDER_DIFF),
+        'universe': DexView(universe_entries, (name for _, name, _ in universe_entries), registry, named_filters)
+    }
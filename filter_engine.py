@@ -0,0 +1,248 @@
+"""
+Compiled filter expressions for the shiny dex
+
+Named filters (filters.py) and per-user custom filters are compiled into bitsets over
+one shared "universe" dex view (every shiny dex form plus every form any named filter
+lists). Expressions combine them with set operators, so any filtered dex view is a
+handful of integer ANDs/ORs no matter how complex the expression is.
+
+Expression syntax (operators must be separated by spaces):
+    eevee + starters            union           (also: |, or)
+    legendaries & type:psychic  intersection    (also: and)
+    mega - region:kalos         exclusion       (also: not, without)
+    (starters + ub) & rare      grouping
+Atoms:
+    <filter>        built-in filter name or alias, or one of your custom filters
+    region:<name>   type:<name>
+    name:<text>     accent-insensitive name search
+    "Exact Name"    a single form
+    is:rare  is:regional  is:genderdiff
+"""
+import re
+from functools import lru_cache
+
+# Nesting limit for custom filters referencing other custom filters
+MAX_FILTER_DEPTH = 8
+
+_TOKEN = re.compile(r'\(|\)|"[^"]*"|[^\s()"]+')
+
+UNION = ('+', '|', 'or')
+INTERSECT = ('&', 'and')
+EXCLUDE = ('-', 'not', 'without')
+
+# Operator words the parser treats specially (cannot be used as custom filter names)
+RESERVED_WORDS = frozenset(word for word in UNION + INTERSECT + EXCLUDE if word.isalpha())
+
+
+class FilterError(ValueError):
+    """Invalid filter expression (the message is shown to the user)"""
+
+
+# ===== PARSING =====
+
+def parse_expression(expression: str):
+    """
+    Parse an expression into a tree of tuples:
+        ('all',) | ('atom', text) | ('exact', name) | (op, left, right) for op in or/and/not
+    Intersection binds tighter than union/exclusion; operators are left-associative.
+    """
+    tokens = _TOKEN.findall(expression or '')
+    if not tokens:
+        raise FilterError("Empty filter expression")
+    position = 0
+
+    def peek():
+        return tokens[position].lower() if position < len(tokens) else None
+
+    def take():
+        nonlocal position
+        position += 1
+        return tokens[position - 1]
+
+    def parse_union():
+        node = parse_intersection()
+        while peek() in UNION or peek() in EXCLUDE:
+            op = 'or' if take().lower() in UNION else 'not'
+            node = (op, node, parse_intersection())
+        return node
+
+    def parse_intersection():
+        node = parse_factor()
+        while peek() in INTERSECT:
+            take()
+            node = ('and', node, parse_factor())
+        return node
+
+    def parse_factor():
+        token = peek()
+        if token is None:
+            raise FilterError("Filter expression ends with an operator")
+        if token == '(':
+            take()
+            node = parse_union()
+            if peek() != ')':
+                raise FilterError("Missing `)` in filter expression")
+            take()
+            return node
+        if token in EXCLUDE:
+            # Leading exclusion: everything except ...
+            take()
+            return ('not', ('all',), parse_factor())
+        if token == ')' or token in UNION or token in INTERSECT:
+            raise FilterError(f"Unexpected `{tokens[position]}` in filter expression")
+
+        text = take()
+        if text.startswith('"'):
+            return ('exact', text[1:-1].strip())
+        return ('atom', text)
+
+    node = parse_union()
+    if position < len(tokens):
+        raise FilterError(
+            f"Unexpected `{tokens[position]}` - combine filters with `+`, `&` or `-`"
+        )
+    return node
+
+
+# ===== ENGINE =====
+
+class FilterEngine:
+    """Compiles filter expressions to bitsets over the universe dex view"""
+
+    def __init__(self, universe, alias_map: dict, filter_names: dict, name_search):
+        """
+        universe: DexView with by_filter bitsets for every named filter
+        alias_map: lowercase alias -> filter key (filters.ALIAS_MAP)
+        filter_names: filter key -> display name
+        name_search: NameSearchIndex for name: atoms
+        """
+        self.universe = universe
+        self.alias_map = dict(alias_map)
+        self.filter_names = dict(filter_names)
+        self.name_search = name_search
+        self.lower_positions = {}  # lowercase form name -> bitset (for "Exact Name" atoms)
+        for name, mask in universe.positions.items():
+            self.lower_positions.setdefault(name.lower(), mask)
+        self._reset_caches()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_compile_shared', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_caches()
+
+    def _reset_caches(self):
+        """Memo for expressions that do not reference custom filters"""
+        self._compile_shared = lru_cache(maxsize=512)(self._compile_uncached)
+
+    def _compile_uncached(self, expression: str) -> int:
+        return self._evaluate(parse_expression(expression), {}, ())
+
+    # ===== PUBLIC API =====
+
+    def is_builtin(self, name: str) -> bool:
+        """Check if a name is a built-in filter key or alias"""
+        return name.lower() in self.alias_map
+
+    def needs_custom_filters(self, expression: str) -> bool:
+        """Check if an expression has atoms that only a user's custom filters could resolve"""
+        try:
+            node = parse_expression(expression.strip())
+        except FilterError:
+            return True  # Let compile report the error (with the user's filters listed)
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node[0] in ('or', 'and', 'not'):
+                stack.extend(node[1:])
+            elif node[0] == 'atom' and not self._is_shared_atom(node[1].lower()):
+                return True
+        return False
+
+    def compile(self, expression: str, custom_filters: dict = None) -> int:
+        """
+        Compile an expression to a universe bitset
+        custom_filters: {name: expression} for the requesting user
+        Raises FilterError for invalid expressions
+        """
+        expression = expression.strip()
+        if not custom_filters:
+            return self._compile_shared(expression)
+        return self._evaluate(parse_expression(expression), custom_filters, ())
+
+    def display_name(self, expression: str, custom_filters: dict = None) -> str:
+        """Title for a filtered dex: the filter's own name for single filters, else the expression"""
+        expression = expression.strip()
+        key = self.alias_map.get(expression.lower())
+        if key:
+            return self.filter_names[key]
+        if custom_filters and expression.lower() in custom_filters:
+            return expression.lower()
+        return expression
+
+    # ===== EVALUATION =====
+
+    def _is_shared_atom(self, lower: str) -> bool:
+        """Atoms that resolve the same for every user (prefixed atoms and built-in filters)"""
+        if ':' in lower and lower.split(':', 1)[0] in ('region', 'r', 'type', 't', 'name', 'n', 'is'):
+            return True
+        return lower in self.alias_map
+
+    def _evaluate(self, node, custom_filters: dict, stack: tuple) -> int:
+        kind = node[0]
+        if kind == 'all':
+            return self.universe.all
+        if kind == 'or':
+            return self._evaluate(node[1], custom_filters, stack) | self._evaluate(node[2], custom_filters, stack)
+        if kind == 'and':
+            return self._evaluate(node[1], custom_filters, stack) & self._evaluate(node[2], custom_filters, stack)
+        if kind == 'not':
+            return self._evaluate(node[1], custom_filters, stack) & ~self._evaluate(node[2], custom_filters, stack)
+        if kind == 'exact':
+            return self._exact_mask(node[1])
+        return self._atom_mask(node[1], custom_filters, stack)
+
+    def _exact_mask(self, name: str) -> int:
+        """Bitset for a single form by exact (case-insensitive) name"""
+        mask = self.universe.positions.get(name) or self.lower_positions.get(name.lower())
+        if not mask:
+            raise FilterError(f"Unknown Pokemon `{name}`")
+        return mask
+
+    def _atom_mask(self, text: str, custom_filters: dict, stack: tuple) -> int:
+        universe = self.universe
+        lower = text.lower()
+
+        if ':' in lower:
+            prefix, value = lower.split(':', 1)
+            if prefix in ('region', 'r'):
+                return universe.by_region.get(value.title(), 0)
+            if prefix in ('type', 't'):
+                return universe.by_type.get(value.title(), 0)
+            if prefix in ('name', 'n'):
+                return universe.mask_of(self.name_search.matching_names(value))
+            if prefix == 'is':
+                if value in ('rare', 'rares'):
+                    return universe.rare
+                if value in ('regional', 'regionals'):
+                    return universe.regional
+                if value in ('genderdiff', 'gd', 'gender'):
+                    return universe.gender_diff
+                raise FilterError(f"Unknown flag `{text}` (use is:rare, is:regional or is:genderdiff)")
+
+        # Built-in filters win over custom filters of the same name
+        key = self.alias_map.get(lower)
+        if key:
+            return universe.by_filter[key]
+
+        if lower in custom_filters:
+            if lower in stack:
+                raise FilterError(f"Custom filter `{lower}` refers to itself")
+            if len(stack) >= MAX_FILTER_DEPTH:
+                raise FilterError("Custom filters are nested too deeply")
+            return self._evaluate(parse_expression(custom_filters[lower]), custom_filters, stack + (lower,))
+
+        raise FilterError(f"Unknown filter `{text}`")
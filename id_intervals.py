@@ -0,0 +1,193 @@
+"""
+Interval-indexed ID overrides
+
+Selective-mode overrides are kept as sorted, non-overlapping, inclusive ID intervals
+with a category ('old'/'new') each. Lookups are a bisect over interval starts; setting or
+removing a range splits and merges intervals, so a 100,000-ID range costs one entry.
+
+Stored in user_data.id_override_ranges as [[start, end, category], ...].
+"""
+from bisect import bisect_left, bisect_right
+
+
+def parse_id_ranges(id_string: str):
+    """
+    Parse ID input supporting multiple formats:
+    - Single ID: "444"
+    - Multiple IDs: "444 555 666"
+    - Range: "1-10"
+    - Mixed: "1-5 10 15-20"
+
+    Returns: sorted list of merged inclusive (start, end) tuples
+    """
+    ranges = []
+    for part in id_string.split():
+        part = part.strip()
+        if not part:
+            continue
+
+        try:
+            if '-' in part:
+                start, end = part.split('-', 1)
+                start, end = int(start.strip()), int(end.strip())
+                if start > end:
+                    start, end = end, start  # Swap if reversed
+            else:
+                start = end = int(part)
+        except (ValueError, AttributeError):
+            continue
+
+        if start < 0:
+            continue
+        ranges.append((start, end))
+
+    return merge_ranges(ranges)
+
+
+def merge_ranges(ranges):
+    """Sort and merge overlapping/adjacent (start, end) ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def count_ids(ranges) -> int:
+    """Number of IDs covered by (start, end, ...) ranges"""
+    return sum(r[1] - r[0] + 1 for r in ranges)
+
+
+class IntervalOverrides:
+    """Sorted, non-overlapping ID intervals -> category, with dict-like lookups"""
+
+    __slots__ = ('starts', 'ends', 'categories')
+
+    def __init__(self, intervals=()):
+        """intervals: iterable of (start, end, category), applied in order (later wins)"""
+        self.starts = []
+        self.ends = []
+        self.categories = []
+        for start, end, category in intervals:
+            self.set_range(int(start), int(end), category)
+
+    @classmethod
+    def from_storage(cls, ranges=None, legacy=None):
+        """
+        Build from stored [[start, end, category], ...] ranges
+        legacy: old per-ID {"pokemon_id": category} map, applied first (ranges win)
+        """
+        overrides = cls()
+        if legacy:
+            ids = sorted((int(pid), category) for pid, category in legacy.items())
+            run_start = run_end = run_category = None
+            for pid, category in ids:
+                if run_category == category and pid == run_end + 1:
+                    run_end = pid
+                    continue
+                if run_category is not None:
+                    overrides.set_range(run_start, run_end, run_category)
+                run_start = run_end = pid
+                run_category = category
+            if run_category is not None:
+                overrides.set_range(run_start, run_end, run_category)
+        for start, end, category in ranges or ():
+            overrides.set_range(int(start), int(end), category)
+        return overrides
+
+    def to_storage(self):
+        """[[start, end, category], ...] for the database"""
+        return [[s, e, c] for s, e, c in zip(self.starts, self.ends, self.categories)]
+
+    def copy(self):
+        clone = IntervalOverrides()
+        clone.starts = list(self.starts)
+        clone.ends = list(self.ends)
+        clone.categories = list(self.categories)
+        return clone
+
+    # ===== LOOKUPS =====
+
+    def get(self, pokemon_id: int, default=None):
+        """Category for an ID, or default"""
+        index = bisect_right(self.starts, pokemon_id) - 1
+        if index >= 0 and pokemon_id <= self.ends[index]:
+            return self.categories[index]
+        return default
+
+    def __getitem__(self, pokemon_id: int):
+        category = self.get(pokemon_id)
+        if category is None:
+            raise KeyError(pokemon_id)
+        return category
+
+    def __contains__(self, pokemon_id):
+        return self.get(pokemon_id) is not None
+
+    def __len__(self):
+        """Number of intervals"""
+        return len(self.starts)
+
+    def __iter__(self):
+        """(start, end, category) intervals in ID order"""
+        return zip(self.starts, self.ends, self.categories)
+
+    def id_count(self) -> int:
+        """Number of overridden IDs"""
+        return sum(end - start + 1 for start, end in zip(self.starts, self.ends))
+
+    # ===== UPDATES =====
+
+    def remove_range(self, start: int, end: int):
+        """
+        Remove overrides for IDs start..end (inclusive), splitting boundary intervals
+        Returns: list of removed (start, end, category) pieces
+        """
+        first = bisect_right(self.ends, start - 1)   # First interval ending at/after start
+        last = bisect_left(self.starts, end + 1)     # One past the last interval starting at/before end
+        if first >= last:
+            return []
+
+        removed = []
+        replacement_starts = []
+        replacement_ends = []
+        replacement_categories = []
+        for index in range(first, last):
+            s, e, c = self.starts[index], self.ends[index], self.categories[index]
+            removed.append((max(s, start), min(e, end), c))
+            if s < start:
+                replacement_starts.append(s)
+                replacement_ends.append(start - 1)
+                replacement_categories.append(c)
+            if e > end:
+                replacement_starts.append(end + 1)
+                replacement_ends.append(e)
+                replacement_categories.append(c)
+
+        self.starts[first:last] = replacement_starts
+        self.ends[first:last] = replacement_ends
+        self.categories[first:last] = replacement_categories
+        return removed
+
+    def set_range(self, start: int, end: int, category: str):
+        """Override IDs start..end (inclusive), merging with touching same-category intervals"""
+        self.remove_range(start, end)
+        index = bisect_left(self.starts, start)
+
+        # Merge with the previous interval if it ends right before and matches
+        if index > 0 and self.ends[index - 1] == start - 1 and self.categories[index - 1] == category:
+            index -= 1
+            start = self.starts[index]
+            del self.starts[index], self.ends[index], self.categories[index]
+
+        # Merge with the next interval if it starts right after and matches
+        if index < len(self.starts) and self.starts[index] == end + 1 and self.categories[index] == category:
+            end = self.ends[index]
+            del self.starts[index], self.ends[index], self.categories[index]
+
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+        self.categories.insert(index, category)
@@ -1,13 +1,20 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 import os
 from dotenv import load_dotenv
 import asyncio
-import signal
 import sys
 import config
-from database import db
-import re
+import startup
+from command_logger import CommandLogger
+from message_dispatch import MessageDispatcher
+import metrics
+import time
+from stall_watchdog import StallWatchdog
+from command_profiler import CommandProfiler
+import cluster
+from shutdown import ShutdownCoordinator
 
 load_dotenv()
 
@@ -44,211 +51,193 @@ def get_prefix(bot, message):
     # If no prefix matched, return the list for discord.py to handle
     return prefixes
 
-# Bot setup
-bot = commands.Bot(
-    command_prefix=get_prefix,
-    intents=intents,
-    help_command=None,  
-    case_insensitive=True
-)
+# Cogs loaded by the startup pipeline (in order)
+COGS = [
+    'cogs.utils',
+    'cogs.pokedex',
+    'cogs.id_overrides',
+    'cogs.shinypokemonviewer',
+    'cogs.shinydexstats',
+    'cogs.shinydex_display',
+    'cogs.shinydex_management',
+    'cogs.event_display',
+    'cogs.event_management',
+    'cogs.breeding',
+    'cogs.cooldown',
+    'cogs.pokemonlisttools',
+    'cogs.help',
+    'cogs.utility_commands',
+    'cogs.inventory',
+    'cogs.settings',
+    'cogs.shinyprofile',
+    'cogs.admin'
+]
+
 
 # Command Logger Configuration
 LOG_CHANNEL_ID = 1367051039181901885  # Set this to your log channel ID (e.g., 1234567890123456789)
 
-async def log_command_usage(interaction_or_ctx, command_name: str, command_type: str):
-    """Log command usage to the designated log channel"""
-    if not LOG_CHANNEL_ID:
-        return  # Logging disabled if no channel set
 
-    log_channel = bot.get_channel(LOG_CHANNEL_ID)
-    if not log_channel:
-        return
+class MiniMeowthTree(app_commands.CommandTree):
+    """Command tree that refuses new slash commands during shutdown and tracks the rest"""
 
-    # Determine if it's an interaction or context
-    if isinstance(interaction_or_ctx, discord.Interaction):
-        user = interaction_or_ctx.user
-        guild = interaction_or_ctx.guild
-        channel = interaction_or_ctx.channel
-    else:  # commands.Context
-        user = interaction_or_ctx.author
-        guild = interaction_or_ctx.guild
-        channel = interaction_or_ctx.channel
-
-    # Determine location
-    if guild is None:
-        location = "DM"
-        location_detail = f"Direct Message"
-    else:
-        location = f"Server: {guild.name}"
-        location_detail = f"{guild.name} (ID: {guild.id}) in #{channel.name}"
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        coordinator = self.client.shutdown_coordinator
+        if coordinator.draining:
+            await interaction.response.send_message("🔄 Restarting, try again in a moment!", ephemeral=True)
+            return False
+        coordinator.track()
+        return True
 
-    # Create embed
-    embed = discord.Embed(
-        title="📝 Command Used",
-        color=config.EMBED_COLOR,
-        timestamp=discord.utils.utcnow()
-    )
 
-    embed.add_field(name="User", value=f"{user.mention} ({user.name})", inline=True)
-    embed.add_field(name="User ID", value=f"`{user.id}`", inline=True)
-    embed.add_field(name="Command Type", value=f"`{command_type}`", inline=True)
-    embed.add_field(name="Command", value=f"`{command_name}`", inline=True)
-    embed.add_field(name="Location", value=location, inline=True)
-    embed.add_field(name="Details", value=location_detail, inline=False)
+class MiniMeowth(commands.AutoShardedBot):
+    """
+    Auto-sharded bot with a one-time startup pipeline (setup_hook runs once per process, not per reconnect)
+    Runs every shard by default; cluster.py workers pass shard_ids/shard_count for their slice
+    """
 
-    embed.set_footer(text="Command Logger")
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, tree_cls=MiniMeowthTree, **kwargs)
+        # Set by cluster.py in worker processes (None = single process)
+        self.cluster = None
+        # Message pre-filter; cogs register session handlers on it instead of raw listeners
+        self.message_dispatch = MessageDispatcher(config.PREFIX, config.POKETWO_BOT_ID)
+        # Event loop stall detector (owner command: stalls)
+        self.stall_watchdog = StallWatchdog(config.STALL_THRESHOLD_MS)
+        # On-demand per-command profiling (owner command: profilecmd)
+        self.command_profiler = CommandProfiler()
+        # Batched, non-blocking logger (events are queued; a background worker sends them)
+        self.command_logger = CommandLogger(self, LOG_CHANNEL_ID)
+        # Ordered shutdown on SIGINT/SIGTERM (drains in-flight commands first)
+        self.shutdown_coordinator = ShutdownCoordinator(self, config.SHUTDOWN_DRAIN_SECONDS)
+
+    async def setup_hook(self):
+        self.message_dispatch.set_bot_user(self.user.id)
+        self.command_logger.start()
+        self.stall_watchdog.start()
+        self.loop_monitor = metrics.start_loop_monitor()
+
+        # One exporter per worker process: METRICS_PORT + cluster id
+        metrics_port = config.METRICS_PORT
+        if self.cluster and metrics_port:
+            metrics_port += self.cluster.cluster_id
+        try:
+            self.metrics_runner = await metrics.start_exporter(config.METRICS_HOST, metrics_port)
+        except OSError as e:
+            print(f"⚠️ Metrics exporter disabled: {e}")
+
+        if self.cluster:
+            self.cluster.start(self)
+        self.startup_timer = await startup.run_startup(
+            self, COGS, extensions=('jishaku',),
+            # Slash commands are global: one sync per cluster is enough
+            sync_commands=self.cluster is None or self.cluster.cluster_id == 0
+        )
 
-    try:
-        await log_channel.send(embed=embed)
-    except Exception as e:
-        print(f"❌ Error sending command log: {e}")
+
+# Bot setup (cluster workers get their shard slice from the environment)
+shard_ids, shard_count = cluster.shard_env()
+bot = MiniMeowth(
+    command_prefix=get_prefix,
+    intents=intents,
+    help_command=None,  
+    case_insensitive=True,
+    # Sent with IDENTIFY, so the activity survives reconnects without a change_presence call
+    activity=discord.Streaming(
+        name="Team Rocket's Adventures",
+        url="https://www.twitch.tv/discord"
+    ),
+    status=discord.Status.online,
+    shard_ids=shard_ids,
+    shard_count=shard_count
+)
+
+command_logger = bot.command_logger
+
+def log_command_usage(interaction_or_ctx, command_name: str, command_type: str):
+    """Queue a command usage event for the log channel (never waits)"""
+    command_logger.log(interaction_or_ctx, command_name, command_type)
 
 @bot.event
 async def on_ready():
+    """Fires after every (re)connect - heavy startup work lives in setup_hook"""
+    if getattr(bot, 'ready_once', False):
+        print(f'✅ Gateway ready again as {bot.user.name} (no startup work repeated)')
+        return
+    bot.ready_once = True
+
     print(f'✅ Logged in as {bot.user.name} ({bot.user.id})')
     print(f'📝 Prefix: {config.PREFIX} + <@{bot.user.id}>')
     print(f'🎨 Embed Color: #{config.EMBED_COLOR:06x}')
 
+    print(f'🧩 Shards: {", ".join(map(str, sorted(bot.shards)))} of {bot.shard_count}')
+
     if LOG_CHANNEL_ID:
         print(f'📊 Command logging enabled (Channel ID: {LOG_CHANNEL_ID})')
     else:
         print(f'⚠️ Command logging disabled (set LOG_CHANNEL_ID to enable)')
 
-    # Connect to database
-    await db.connect()
-
-    # Load cogs
-    cogs = [
-        'cogs.utils',
-        'cogs.pokedex',
-        'cogs.id_overrides',
-        'cogs.shinypokemonviewer',
-        'cogs.shinydexstats',
-        'cogs.shinydex_display',
-        'cogs.shinydex_management',
-        'cogs.event_display',
-        'cogs.event_management',
-        'cogs.breeding',
-        'cogs.cooldown',
-        'cogs.pokemonlisttools',
-        'cogs.help',
-        'cogs.utility_commands',
-        'cogs.inventory',
-        'cogs.settings',
-        'cogs.shinyprofile'
-    ]
-
-    for cog in cogs:
-        try:
-            await bot.load_extension(cog)
-            print(f'✅ Loaded cog: {cog}')
-        except Exception as e:
-            print(f'❌ Failed to load cog {cog}: {e}')
-
-    # Load Jishaku
-    try:
-        await bot.load_extension('jishaku')
-        print(f'✅ Loaded extension: jishaku')
-    except Exception as e:
-        print(f'❌ Failed to load jishaku: {e}')
-
-    # Sync slash commands
-    try:
-        synced = await bot.tree.sync()
-        print(f'✅ Synced {len(synced)} slash commands')
-    except Exception as e:
-        print(f'❌ Failed to sync commands: {e}')
-
-    # Set streaming activity
-    try:
-        activity = discord.Streaming(
-            name="Team Rocket's Adventures",
-            url="https://www.twitch.tv/discord"
-        )
-        await bot.change_presence(activity=activity, status=discord.Status.online)
-        print(f'✅ Activity set: {activity.name}')
-    except Exception as e:
-        print(f'❌ Failed to set activity: {e}')
-
-    print('🚀 Bot is ready!')
+    timer = getattr(bot, 'startup_timer', None)
+    if timer:
+        print(f'🚀 Bot is ready! ({timer.elapsed_ms():.0f}ms since startup began)')
+    else:
+        print('🚀 Bot is ready!')
 
 @bot.event
 async def on_message(message):
-    """Process commands from messages with space handling"""
-    if message.author.bot:
-        return
-
-    # Custom processing to handle spaces after prefix
-    content = message.content
-
-    # Check for bot mention prefix
-    mention_patterns = [f'<@{bot.user.id}>', f'<@!{bot.user.id}>']
-    for pattern in mention_patterns:
-        if content.startswith(pattern):
-            # Remove mention and strip spaces
-            remaining = content[len(pattern):].lstrip()
-            if remaining:
-                # Reconstruct message content with single space after mention
-                message.content = f'{pattern} {remaining}'
-            break
-    else:
-        # Check for regular prefixes
-        for prefix in config.PREFIX:
-            if content.startswith(prefix):
-                # Remove prefix and strip spaces
-                remaining = content[len(prefix):].lstrip()
-                if remaining:
-                    # Reconstruct message content with no space after prefix
-                    message.content = f'{prefix}{remaining}'
-                break
-
-    await bot.process_commands(message)
+    """Classify once (prefix trie / Pokétwo author / watched channels) and run only relevant handlers"""
+    await bot.message_dispatch.dispatch_message(bot, message)
 
 @bot.event
 async def on_message_edit(before, after):
-    """Process commands from edited messages"""
-    if after.author.bot:
+    """Re-run edited commands and route edits of watched messages"""
+    await bot.message_dispatch.dispatch_edit(bot, before, after)
+
+# Command latency metrics
+@bot.before_invoke
+async def start_command_timer(ctx):
+    """Mark when a prefix/hybrid command starts running (and start profiling if armed)"""
+    bot.shutdown_coordinator.track()  # Shutdown waits for this command
+    bot.command_profiler.before(ctx)
+    ctx.metrics_start = time.perf_counter()
+
+@bot.after_invoke
+async def finish_command_profile(ctx):
+    """Stop an armed profiler run (after_invoke runs even when the command raised)"""
+    await bot.command_profiler.after(ctx)
+
+def record_command_latency(ctx, failed: bool = False):
+    """Observe a prefix/hybrid command's latency (and count failures)"""
+    start = getattr(ctx, 'metrics_start', None)
+    if start is None or ctx.command is None:
         return
-
-    # Only process if the content actually changed
-    if before.content != after.content:
-        # Apply same space handling as on_message
-        content = after.content
-
-        mention_patterns = [f'<@{bot.user.id}>', f'<@!{bot.user.id}>']
-        for pattern in mention_patterns:
-            if content.startswith(pattern):
-                remaining = content[len(pattern):].lstrip()
-                if remaining:
-                    after.content = f'{pattern} {remaining}'
-                break
-        else:
-            for prefix in config.PREFIX:
-                if content.startswith(prefix):
-                    remaining = content[len(prefix):].lstrip()
-                    if remaining:
-                        after.content = f'{prefix}{remaining}'
-                    break
-
-        await bot.process_commands(after)
+    name = ctx.command.qualified_name
+    metrics.COMMAND_LATENCY.observe(time.perf_counter() - start, name, "slash" if ctx.interaction else "prefix")
+    if failed:
+        metrics.COMMAND_ERRORS.inc(name)
 
 # Command logging listeners
 @bot.event
 async def on_command_completion(ctx):
     """Log prefix/hybrid commands"""
-    await log_command_usage(ctx, ctx.command.name, "Prefix Command")
+    record_command_latency(ctx)
+    log_command_usage(ctx, ctx.command.name, "Prefix Command")
 
 @bot.event
 async def on_app_command_completion(interaction: discord.Interaction, command):
     """Log slash commands"""
-    await log_command_usage(interaction, command.name, "Slash Command")
+    if getattr(command, 'wrapped', None) is None:
+        # App-only commands (hybrid ones are timed by the command hooks)
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        metrics.COMMAND_LATENCY.observe(elapsed, command.qualified_name, "app")
+    log_command_usage(interaction, command.name, "Slash Command")
 
 @bot.tree.error
 async def on_app_command_error(interaction: discord.Interaction, error):
     """Handle slash command errors (still log the attempt)"""
     # Log the command even if it errored
     if interaction.command:
-        await log_command_usage(interaction, interaction.command.name, "Slash Command (Error)")
+        log_command_usage(interaction, interaction.command.name, "Slash Command (Error)")
 
 @bot.event
 async def on_disconnect():
@@ -266,7 +255,10 @@ async def on_command_error(ctx, error):
     """Handle command errors"""
     if isinstance(error, commands.CommandNotFound):
         return
-    elif isinstance(error, commands.MissingRequiredArgument):
+
+    record_command_latency(ctx, failed=True)
+
+    if isinstance(error, commands.MissingRequiredArgument):
         await ctx.send(f"❌ Missing required argument: `{error.param.name}`")
     elif isinstance(error, commands.BadArgument):
         await ctx.send(f"❌ Invalid argument provided")
@@ -283,59 +275,39 @@ async def on_command_error(ctx, error):
         import traceback
         traceback.print_exception(type(error), error, error.__traceback__)
 
-async def shutdown():
-    """Properly shutdown bot and database"""
-    print("\n🛑 Shutting down bot...")
+async def start_bot(token: str):
+    """Run the bot until a signal (or the bot itself) stops it, then shut down in order"""
+    bot.shutdown_coordinator.install_signal_handlers()
     try:
-        await db.close()
-        await bot.close()
-        print("✅ Shutdown complete")
-    except Exception as e:
-        print(f"❌ Error during shutdown: {e}")
-
-def signal_handler(signum, frame):
-    """Handle shutdown signals (Ctrl+C, kill, etc.)"""
-    print(f"\n⚠️ Received signal {signum}")
-    # Create a task to shutdown gracefully
-    asyncio.create_task(shutdown())
-    sys.exit(0)
+        await bot.start(token)
+    finally:
+        await bot.shutdown_coordinator.shutdown("bot stopped")
 
-# Run bot
-if __name__ == "__main__":
+def run():
+    """Run the bot in this process (python main.py, or a cluster.py worker)"""
     TOKEN = os.getenv("DISCORD_TOKEN")
 
     if not TOKEN:
         print("❌ DISCORD_TOKEN not found in environment variables")
         sys.exit(1)
 
-    # Register signal handlers for graceful shutdown
-    signal.signal(signal.SIGINT, signal_handler)   # Ctrl+C
-    signal.signal(signal.SIGTERM, signal_handler)  # Kill command
-
     # Set Jishaku environment variables (optional customization)
     os.environ["JISHAKU_NO_UNDERSCORE"] = "True"  # Disables underscore prefix requirement
     os.environ["JISHAKU_HIDE"] = "True"  # Hides jishaku from help command
 
     try:
         print("🚀 Starting bot...")
-        bot.run(TOKEN)
+        # Signal handlers and the shutdown sequence run inside this loop (no second loop for cleanup)
+        asyncio.run(start_bot(TOKEN))
     except KeyboardInterrupt:
         print("\n⚠️ KeyboardInterrupt detected")
     except Exception as e:
         print(f"❌ Fatal error: {e}")
         import traceback
         traceback.print_exc()
-    finally:
-        # Ensure database is closed on exit
-        print("🧹 Cleaning up...")
-        if db.client:
-            try:
-                # Run the async close in a new event loop since bot.run() has closed its loop
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(db.close())
-                loop.close()
-            except Exception as e:
-                print(f"⚠️ Error closing database: {e}")
-
-        print("👋 Bot stopped")
+
+    print("👋 Bot stopped")
+
+# Run bot
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,182 @@
+"""
+Central message pre-filter
+
+Every gateway message/edit is classified once, in O(1) per message:
+- a character trie over the command prefixes (config.PREFIX + bot mentions)
+- an author check against POKETWO_BOT_ID
+- membership in the channel/message sets of active sessions (track, createlist, ...)
+Only the handlers a message is relevant to run; everything else is dropped before any
+cog code sees it. Cogs register handlers here instead of using raw on_message/on_message_edit
+listeners, and remove them in cog_unload.
+
+While the bot shuts down (accepting_commands = False) command messages are dropped; session
+handlers keep running so in-flight sessions can finish.
+"""
+import traceback
+
+# Message classes
+IGNORE = 0
+COMMAND = 1
+POKETWO = 2
+
+
+class PrefixTrie:
+    """Character trie of command prefixes; match() walks at most len(longest prefix) chars"""
+
+    _END = object()
+
+    def __init__(self, prefixes=()):
+        self.root = {}
+        self.prefixes = []
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def add(self, prefix: str):
+        if prefix in self.prefixes:
+            return
+        self.prefixes.append(prefix)
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[self._END] = prefix
+
+    def match(self, content: str):
+        """Longest prefix content starts with, or None"""
+        node = self.root
+        found = None
+        for char in content:
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(self._END, found)
+        return found
+
+
+class _Watch:
+    """A handler plus the container whose membership selects its messages"""
+
+    __slots__ = ('handler', 'container', 'by_message', 'poketwo_only')
+
+    def __init__(self, handler, container, by_message: bool, poketwo_only: bool):
+        self.handler = handler
+        self.container = container
+        self.by_message = by_message
+        self.poketwo_only = poketwo_only
+
+    def wants(self, message, is_poketwo: bool) -> bool:
+        if self.poketwo_only and not is_poketwo:
+            return False
+        key = message.id if self.by_message else message.channel.id
+        return key in self.container
+
+
+class MessageDispatcher:
+    """Classifies messages once and routes them to the handlers that care"""
+
+    def __init__(self, prefixes, poketwo_id: int):
+        self.trie = PrefixTrie(prefixes)
+        self.poketwo_id = poketwo_id
+        self.mention_prefixes = ()
+        self.accepting_commands = True  # False once shutdown starts
+        self.message_watches = []  # New Pokétwo messages in watched channels
+        self.edit_watches = []     # Edits of watched messages / in watched channels
+
+    def set_bot_user(self, user_id: int):
+        """Register the bot mention prefixes (call once the bot user is known)"""
+        self.mention_prefixes = (f'<@{user_id}>', f'<@!{user_id}>')
+        for mention in self.mention_prefixes:
+            self.trie.add(mention)
+
+    # ===== REGISTRATION =====
+
+    def watch_poketwo_messages(self, handler, channels):
+        """
+        Call handler(message) for new Pokétwo messages in channels
+        channels: live container of channel IDs (e.g. a cog's active-session dict)
+        """
+        self.message_watches.append(_Watch(handler, channels, by_message=False, poketwo_only=True))
+
+    def watch_edits(self, handler, messages=None, channels=None, poketwo_only: bool = False):
+        """
+        Call handler(before, after) for edits of messages whose ID is in messages, or that
+        were sent in a channel in channels (live containers, checked with `in`)
+        """
+        if messages is not None:
+            self.edit_watches.append(_Watch(handler, messages, by_message=True, poketwo_only=poketwo_only))
+        if channels is not None:
+            self.edit_watches.append(_Watch(handler, channels, by_message=False, poketwo_only=poketwo_only))
+
+    def remove_handlers(self, owner):
+        """Drop every handler bound to owner (call from cog_unload)"""
+        def keep(watch):
+            return getattr(watch.handler, '__self__', None) is not owner
+        self.message_watches = [w for w in self.message_watches if keep(w)]
+        self.edit_watches = [w for w in self.edit_watches if keep(w)]
+
+    # ===== CLASSIFICATION =====
+
+    def match_prefix(self, content: str):
+        return self.trie.match(content)
+
+    def classify(self, message) -> int:
+        author = message.author
+        if author.id == self.poketwo_id:
+            return POKETWO
+        if author.bot:
+            return IGNORE
+        if self.trie.match(message.content):
+            return COMMAND
+        return IGNORE
+
+    def normalize_command(self, message):
+        """
+        Strip whitespace between the prefix and the command
+        (a single space is kept after a mention). Returns the matched prefix or None.
+        """
+        content = message.content
+        prefix = self.trie.match(content)
+        if prefix is None:
+            return None
+
+        remaining = content[len(prefix):].lstrip()
+        if remaining:
+            if prefix in self.mention_prefixes:
+                message.content = f'{prefix} {remaining}'
+            else:
+                message.content = f'{prefix}{remaining}'
+        return prefix
+
+    # ===== DISPATCH =====
+
+    async def _run(self, handler, *args):
+        try:
+            await handler(*args)
+        except Exception as e:
+            print(f"❌ Message handler {getattr(handler, '__qualname__', handler)} failed: {e}")
+            traceback.print_exception(type(e), e, e.__traceback__)
+
+    async def dispatch_message(self, bot, message):
+        kind = self.classify(message)
+        if kind == COMMAND:
+            if not self.accepting_commands:
+                return
+            self.normalize_command(message)
+            await bot.process_commands(message)
+        elif kind == POKETWO:
+            for watch in self.message_watches:
+                if watch.wants(message, True):
+                    await self._run(watch.handler, message)
+
+    async def dispatch_edit(self, bot, before, after):
+        kind = self.classify(after)
+        if kind == COMMAND and before.content != after.content and self.accepting_commands:
+            # Only re-run commands when the content actually changed
+            self.normalize_command(after)
+            await bot.process_commands(after)
+
+        if not self.edit_watches:
+            return
+        is_poketwo = kind == POKETWO
+        for watch in self.edit_watches:
+            if watch.wants(after, is_poketwo):
+                await self._run(watch.handler, before, after)
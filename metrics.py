@@ -0,0 +1,336 @@
+"""
+In-process metrics (counters + histograms) with a Prometheus text exporter
+
+Histograms keep Prometheus buckets for scraping plus a bounded reservoir sample per
+label set for the owner-only p50/p95/p99 summary. Everything is thread-safe: pymongo
+command events arrive on Motor's executor threads.
+
+Instrumented here / by callers:
+- command latency per command          (main.py command hooks)
+- Database method latency               (instrument_class on Database)
+- Mongo wire command latency            (MongoCommandListener, pymongo command monitoring)
+- image render and HTTP fetch time      (@timed on the render/fetch coroutines)
+- cache hits/misses                     (CACHE_HITS/CACHE_MISSES + register_cache for lru_caches)
+- event loop lag                        (start_loop_monitor)
+"""
+import asyncio
+import functools
+import inspect
+import random
+import threading
+import time
+from pymongo import monitoring
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Samples kept per label set for quantiles
+RESERVOIR_SIZE = 1024
+
+# How often the event loop lag probe wakes up (seconds)
+LOOP_LAG_INTERVAL = 0.5
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values) -> float:
+        return self.values.get(label_values, 0)
+
+    def render(self):
+        yield f"# HELP {self.name}_total {self.help}"
+        yield f"# TYPE {self.name}_total counter"
+        with self.lock:
+            items = sorted(self.values.items())
+        for label_values, value in items:
+            yield f"{self.name}_total{_label_text(self.labels, label_values)} {value}"
+
+
+class _Series:
+    __slots__ = ('buckets', 'count', 'sum', 'reservoir')
+
+    def __init__(self, bucket_count: int):
+        self.buckets = [0] * bucket_count
+        self.count = 0
+        self.sum = 0.0
+        self.reservoir = []
+
+
+class Histogram:
+    """Bucketed histogram per label set, plus a reservoir sample for quantiles"""
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.bounds = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = _Series(len(self.bounds))
+            for index, bound in enumerate(self.bounds):
+                if value <= bound:
+                    series.buckets[index] += 1
+                    break
+            series.count += 1
+            series.sum += value
+
+            # Reservoir sampling (Algorithm R): a uniform sample of every observation
+            if len(series.reservoir) < RESERVOIR_SIZE:
+                series.reservoir.append(value)
+            else:
+                slot = random.randrange(series.count)
+                if slot < RESERVOIR_SIZE:
+                    series.reservoir[slot] = value
+
+    def time(self, *label_values):
+        """Context manager observing the elapsed time of its block"""
+        return _Timer(self, label_values)
+
+    def summary(self):
+        """[(label_values, count, p50, p95, p99, mean)] sorted by count, descending"""
+        rows = []
+        with self.lock:
+            items = [(labels, s.count, s.sum, sorted(s.reservoir)) for labels, s in self.series.items()]
+        for label_values, count, total, sample in items:
+            if not count:
+                continue
+            rows.append((
+                label_values, count,
+                _quantile(sample, 0.50), _quantile(sample, 0.95), _quantile(sample, 0.99),
+                total / count
+            ))
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self.lock:
+            items = sorted((labels, list(s.buckets), s.count, s.sum) for labels, s in self.series.items())
+        for label_values, buckets, count, total in items:
+            cumulative = 0
+            for bound, bucket in zip(self.bounds, buckets):
+                cumulative += bucket
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_label_text(self.labels, label_values, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_label_text(self.labels, label_values, le)} {count}"
+            yield f"{self.name}_sum{_label_text(self.labels, label_values)} {total}"
+            yield f"{self.name}_count{_label_text(self.labels, label_values)} {count}"
+
+
+class _Timer:
+    __slots__ = ('histogram', 'label_values', 'start')
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+
+def _quantile(sorted_sample, q: float) -> float:
+    if not sorted_sample:
+        return 0.0
+    index = min(len(sorted_sample) - 1, int(q * len(sorted_sample)))
+    return sorted_sample[index]
+
+
+# ===== METRICS =====
+
+COMMAND_LATENCY = Histogram("minimeowth_command_seconds", "Command latency", ("command", "kind"))
+COMMAND_ERRORS = Counter("minimeowth_command_errors", "Commands that raised", ("command",))
+DB_METHOD_LATENCY = Histogram("minimeowth_db_method_seconds", "Database method latency", ("method",))
+MONGO_COMMAND_LATENCY = Histogram("minimeowth_mongo_command_seconds", "MongoDB wire command latency", ("command",))
+MONGO_COMMAND_FAILURES = Counter("minimeowth_mongo_command_failures", "Failed MongoDB commands", ("command",))
+RENDER_LATENCY = Histogram("minimeowth_render_seconds", "Image render time", ("image",))
+HTTP_LATENCY = Histogram("minimeowth_http_fetch_seconds", "Outgoing HTTP fetch time", ("target",))
+LOOP_LAG = Histogram(
+    "minimeowth_event_loop_lag_seconds", "Event loop scheduling delay", (),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+LOOP_STALLS = Counter("minimeowth_event_loop_stalls", "Event loop stalls over the watchdog threshold", ("culprit",))
+CACHE_HITS = Counter("minimeowth_cache_hits", "Cache hits", ("cache",))
+CACHE_MISSES = Counter("minimeowth_cache_misses", "Cache misses", ("cache",))
+
+METRICS = [
+    COMMAND_LATENCY, COMMAND_ERRORS, DB_METHOD_LATENCY, MONGO_COMMAND_LATENCY, MONGO_COMMAND_FAILURES,
+    RENDER_LATENCY, HTTP_LATENCY, LOOP_LAG, LOOP_STALLS, CACHE_HITS, CACHE_MISSES
+]
+
+# name -> callable returning a functools cache_info() (read at scrape time)
+_cache_sources = {}
+
+
+def register_cache(name: str, cache_info):
+    """Report an lru_cache's hits/misses (cache_info: callable, e.g. a wrapper's cache_info)"""
+    _cache_sources[name] = cache_info
+
+
+def cache_stats():
+    """{cache: (hits, misses)} for counted and registered caches"""
+    stats = {}
+    for (name,), hits in list(CACHE_HITS.values.items()):
+        stats[name] = (hits, CACHE_MISSES.get(name))
+    for (name,), misses in list(CACHE_MISSES.values.items()):
+        stats.setdefault(name, (0, misses))
+    for name, cache_info in list(_cache_sources.items()):
+        try:
+            info = cache_info()
+        except Exception:
+            continue
+        stats[name] = (info.hits, info.misses)
+    return stats
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in METRICS:
+        if metric is CACHE_HITS or metric is CACHE_MISSES:
+            continue
+        lines.extend(metric.render())
+
+    # Cache counters include registered lru_caches
+    stats = sorted(cache_stats().items())
+    for suffix, index in (("hits", 0), ("misses", 1)):
+        lines.append(f"# HELP minimeowth_cache_{suffix}_total Cache {suffix}")
+        lines.append(f"# TYPE minimeowth_cache_{suffix}_total counter")
+        for name, values in stats:
+            lines.append(f'minimeowth_cache_{suffix}_total{{cache="{_escape(name)}"}} {values[index]}')
+    return "\n".join(lines) + "\n"
+
+
+# ===== INSTRUMENTATION HELPERS =====
+
+def timed(histogram, *label_values):
+    """Decorator observing a sync or async function's duration"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start, *label_values)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, *label_values)
+        return wrapper
+    return decorator
+
+
+def instrument_class(cls, histogram, skip=(), context=None):
+    """
+    Wrap every public coroutine method of cls with @timed(histogram, method_name)
+    context: optional ContextVar set to "Class.method" while the method runs
+    """
+    for name, member in list(vars(cls).items()):
+        if name.startswith('_') or name in skip or not inspect.iscoroutinefunction(member):
+            continue
+        wrapped = timed(histogram, name)(member)
+        if context is not None:
+            wrapped = _with_context(wrapped, context, f"{cls.__name__}.{name}")
+        setattr(cls, name, wrapped)
+    return cls
+
+
+def _with_context(func, context, value):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = context.set(value)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            context.reset(token)
+    return wrapper
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """pymongo command monitoring -> MONGO_COMMAND_LATENCY (runs on driver threads)"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, event.command_name)
+
+    def failed(self, event):
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, event.command_name)
+        MONGO_COMMAND_FAILURES.inc(event.command_name)
+
+
+# ===== BACKGROUND TASKS =====
+
+async def _loop_lag_probe(interval: float):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, time.perf_counter() - start - interval))
+
+
+def start_loop_monitor(interval: float = LOOP_LAG_INTERVAL):
+    """Measure how late the event loop wakes a sleeping task (returns the task)"""
+    return asyncio.create_task(_loop_lag_probe(interval))
+
+
+async def start_exporter(host: str, port: int):
+    """
+    Serve /metrics in Prometheus text format (returns the aiohttp runner, or None if disabled)
+    Bind to localhost unless the port is firewalled - the endpoint has no auth
+    """
+    if not port:
+        return None
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        body = await asyncio.to_thread(render_prometheus)
+        return web.Response(text=body, content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"📈 Metrics exporter listening on http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,378 @@
+"""
+Versioned schema migrations
+
+The applied schema version lives in bot_meta ("schema_version"). On connect, pending
+migrations run in order and the version is recorded after each one, so indexes are
+created/dropped once per deployment instead of on every boot. A lease document keeps
+several processes (shards, restarts) from migrating at the same time.
+
+Add a migration by appending a @migration(version, description) coroutine taking the
+Database instance; versions must be strictly increasing and never reused.
+"""
+import asyncio
+import os
+import socket
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from id_intervals import IntervalOverrides
+
+SCHEMA_VERSION_KEY = "schema_version"
+LOCK_KEY = "migration_lock"
+LOCK_LEASE = timedelta(minutes=10)
+LOCK_WAIT_TIMEOUT = 300  # Seconds another process waits for a running migration
+
+# Documents per bulk write in backfills
+BACKFILL_BATCH_SIZE = 500
+
+Migration = namedtuple('Migration', ['version', 'description', 'run'])
+MIGRATIONS = []
+
+
+def migration(version: int, description: str):
+    """Register a migration coroutine"""
+    def decorator(func):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"Migration {version} is out of order")
+        MIGRATIONS.append(Migration(version, description, func))
+        return func
+    return decorator
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+# ===== INDEX SET =====
+# Every index the queries in database.py rely on. All queries filter on user_id, so
+# single-field user_id/categories/dex_number indexes and prefixes of compound indexes
+# only add write amplification (see RETIRED_INDEXES).
+
+INDEXES = {
+    'pokemon': [
+        IndexModel([("user_id", ASCENDING), ("categories", ASCENDING), ("gender", ASCENDING)],
+                   name="user_category_gender"),
+        # Keyset pagination for inventory browsing: (iv_percent, pokemon_id) is a total order
+        IndexModel([("user_id", ASCENDING), ("categories", ASCENDING), ("iv_percent", DESCENDING),
+                    ("pokemon_id", DESCENDING)],
+                   name="user_category_iv_id"),
+        IndexModel([("user_id", ASCENDING), ("pokemon_id", ASCENDING)],
+                   unique=True, name="user_pokemon_unique"),
+        # Partial indexes for special types
+        IndexModel([("user_id", ASCENDING), ("is_gmax", ASCENDING)],
+                   partialFilterExpression={"is_gmax": True}, name="user_gmax_partial"),
+        IndexModel([("user_id", ASCENDING), ("is_regional", ASCENDING)],
+                   partialFilterExpression={"is_regional": True}, name="user_regional_partial"),
+    ],
+    'user_data': [
+        IndexModel([("user_id", ASCENDING)], unique=True, name="user_data_user_id"),
+    ],
+    'shinies': [
+        IndexModel([("user_id", ASCENDING), ("pokemon_id", ASCENDING)],
+                   unique=True, name="shiny_user_pokemon"),
+        IndexModel([("user_id", ASCENDING), ("name", ASCENDING), ("gender", ASCENDING)],
+                   name="shiny_user_name_gender"),
+        IndexModel([("user_id", ASCENDING), ("dex_number", ASCENDING)],
+                   name="shiny_user_dex"),
+    ],
+    'event_shinies': [
+        IndexModel([("user_id", ASCENDING), ("pokemon_id", ASCENDING)],
+                   unique=True, name="event_shiny_user_pokemon"),
+        IndexModel([("user_id", ASCENDING), ("name", ASCENDING)],
+                   name="event_shiny_user_name"),
+    ],
+    'shiny_summaries': [
+        IndexModel([("user_id", ASCENDING)], unique=True, name="shiny_summary_user_id"),
+    ],
+}
+
+# Indexes created by earlier versions that are covered by a compound index above, plus
+# the auto-generated names the same keys get when they were created without a name
+RETIRED_INDEXES = {
+    'pokemon': ["user_id_idx", "categories_idx", "dex_number_idx", "user_category_iv",
+                "user_id_1", "categories_1", "dex_number_1", "user_id_1_categories_1_iv_percent_-1"],
+    'shinies': ["shiny_user_id", "shiny_dex_number", "shiny_user_name",
+                "user_id_1", "dex_number_1", "user_id_1_name_1"],
+    'event_shinies': ["event_shiny_user_id", "user_id_1"],
+}
+
+# createIndexes errors for an index that exists under another name / with other options
+INDEX_CONFLICT_CODES = (85, 86)  # IndexOptionsConflict, IndexKeySpecsConflict
+
+
+async def _has_duplicate_keys(collection, model) -> bool:
+    """Check if existing documents would violate a unique index model"""
+    spec = model.document
+    pipeline = []
+    if 'partialFilterExpression' in spec:
+        pipeline.append({"$match": spec['partialFilterExpression']})
+    pipeline += [
+        {"$group": {"_id": {field.replace('.', '_'): f"${field}" for field in spec['key']},
+                    "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": 1},
+    ]
+    return bool(await collection.aggregate(pipeline).to_list(length=1))
+
+
+async def _recreate_index(collection, index: dict):
+    """Recreate an index from its list_indexes document"""
+    options = {k: v for k, v in index.items() if k not in ('v', 'key', 'ns')}
+    await collection.create_index(list(index['key'].items()), **options)
+    print(f"↩️ Restored index {collection.name}.{index['name']}")
+
+
+async def _replace_conflicting_index(collection, model) -> bool:
+    """
+    Replace indexes clashing with model by name or key pattern
+    A unique model over duplicate data is skipped (the legacy index stays); if the create fails
+    after the drop, the dropped indexes are restored before the error propagates.
+    Returns: False when the model was skipped
+    """
+    spec = model.document
+    key = list(spec['key'].items())
+    conflicts = []
+    async for index in collection.list_indexes():
+        if index['name'] != '_id_' and (index['name'] == spec['name'] or list(index['key'].items()) == key):
+            conflicts.append(index)
+
+    if spec.get('unique') and await _has_duplicate_keys(collection, model):
+        print(f"⚠️ {collection.name} has duplicate {', '.join(spec['key'])} values, "
+              f"keeping the existing index instead of {spec['name']}")
+        return False
+
+    for index in conflicts:
+        await collection.drop_index(index['name'])
+        print(f"🗑️ Dropped conflicting index {collection.name}.{index['name']}")
+    try:
+        await collection.create_indexes([model])
+    except Exception:
+        for index in conflicts:
+            await _recreate_index(collection, index)
+        raise
+    return True
+
+
+async def create_indexes(db, indexes: dict):
+    """
+    Create indexes, one createIndexes command per collection (collections in parallel)
+    If an index already exists under another name or with other options (legacy deployments),
+    the collection falls back to one index at a time and conflicting indexes are recreated
+    (unique indexes over duplicate data are skipped and show up as 'missing' in the usage report)
+    """
+    async def create(collection_name, models):
+        collection = db.db[collection_name]
+        try:
+            names = await collection.create_indexes(models)
+        except OperationFailure as e:
+            if e.code not in INDEX_CONFLICT_CODES:
+                raise
+            names = []
+            for model in models:
+                try:
+                    await collection.create_indexes([model])
+                except OperationFailure as e:
+                    if e.code not in INDEX_CONFLICT_CODES:
+                        raise
+                    print(f"⚠️ Index {collection_name}.{model.document['name']} conflicts with an existing index ({e.code}), recreating it")
+                    if not await _replace_conflicting_index(collection, model):
+                        continue
+                names.append(model.document['name'])
+        print(f"✅ Indexes ready on {collection_name}: {', '.join(names)}")
+
+    await asyncio.gather(*(create(name, models) for name, models in indexes.items()))
+
+
+async def drop_indexes(db, indexes: dict):
+    """Drop indexes by name (missing indexes are skipped)"""
+    for collection_name, names in indexes.items():
+        collection = db.db[collection_name]
+        existing = set()
+        async for index in collection.list_indexes():
+            existing.add(index['name'])
+        for name in names:
+            if name in existing:
+                await collection.drop_index(name)
+                print(f"🗑️ Dropped index {collection_name}.{name}")
+
+
+async def backfill(collection, query: dict, projection: dict, transform, label: str,
+                   batch_size: int = BACKFILL_BATCH_SIZE):
+    """
+    Rewrite matching documents in batches
+    transform(doc) -> (filter, update) or None to skip; updates are flushed with unordered
+    bulk writes every batch_size documents, with a progress line per batch
+    Returns: number of documents modified
+    """
+    total = await collection.count_documents(query)
+    if not total:
+        print(f"✅ Backfill {label}: nothing to do")
+        return 0
+
+    seen = modified = 0
+    ops = []
+    start = time.perf_counter()
+
+    async def flush():
+        nonlocal modified, ops
+        if ops:
+            result = await collection.bulk_write(ops, ordered=False)
+            modified += result.modified_count
+            ops = []
+        print(f"⏳ Backfill {label}: {seen}/{total} scanned, {modified} updated")
+
+    async for doc in collection.find(query, projection).batch_size(batch_size):
+        seen += 1
+        change = transform(doc)
+        if change:
+            ops.append(UpdateOne(*change))
+        if len(ops) >= batch_size:
+            await flush()
+    await flush()
+
+    print(f"✅ Backfill {label} finished in {time.perf_counter() - start:.1f}s")
+    return modified
+
+
+# ===== MIGRATIONS =====
+
+@migration(1, "Create the index set")
+async def _create_index_set(db):
+    await create_indexes(db, INDEXES)
+
+
+@migration(2, "Retire redundant single-field and prefix indexes")
+async def _retire_redundant_indexes(db):
+    await drop_indexes(db, RETIRED_INDEXES)
+
+
+@migration(3, "Backfill id_override_ranges from legacy per-ID id_overrides")
+async def _backfill_id_override_ranges(db):
+    def transform(doc):
+        overrides = IntervalOverrides.from_storage(doc.get('id_override_ranges'), doc.get('id_overrides'))
+        # Matching on the legacy map skips documents a live write already converted
+        return (
+            {"_id": doc["_id"], "id_overrides": doc["id_overrides"]},
+            {"$set": {"id_override_ranges": overrides.to_storage()}, "$unset": {"id_overrides": ""}}
+        )
+
+    await backfill(
+        db.user_data,
+        {"id_overrides": {"$exists": True}},
+        {"id_overrides": 1, "id_override_ranges": 1},
+        transform,
+        "id_override_ranges"
+    )
+
+
+# ===== RUNNER =====
+
+async def _acquire_lock(db, owner: str) -> bool:
+    now = datetime.utcnow()
+    try:
+        await db.meta.update_one(
+            {"_id": LOCK_KEY, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "expires_at": now + LOCK_LEASE}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False  # Held by another process (the upsert collided with its document)
+
+
+async def _release_lock(db, owner: str):
+    await db.meta.delete_one({"_id": LOCK_KEY, "owner": owner})
+
+
+async def run_migrations(db):
+    """
+    Apply pending migrations in order, recording the schema version after each
+    A failed migration is logged and retried on the next start; later ones wait for it.
+    Returns: the schema version now recorded
+    """
+    current = await db.get_meta(SCHEMA_VERSION_KEY, 0)
+    if current >= latest_version():
+        print(f"✅ Schema up to date (version {current})")
+        return current
+
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    deadline = time.monotonic() + LOCK_WAIT_TIMEOUT
+    while not await _acquire_lock(db, owner):
+        if time.monotonic() > deadline:
+            print("⚠️ Timed out waiting for another process to finish migrations")
+            return await db.get_meta(SCHEMA_VERSION_KEY, 0)
+        await asyncio.sleep(2)
+
+    try:
+        # Re-read: another process may have migrated while we waited
+        current = await db.get_meta(SCHEMA_VERSION_KEY, 0)
+        for pending in MIGRATIONS:
+            if pending.version <= current:
+                continue
+            print(f"🔧 Migration {pending.version}: {pending.description}")
+            start = time.perf_counter()
+            try:
+                await pending.run(db)
+            except Exception as e:
+                print(f"❌ Migration {pending.version} failed (will retry next start): {e}")
+                break
+            await db.set_meta(SCHEMA_VERSION_KEY, pending.version)
+            current = pending.version
+            print(f"✅ Schema version {current} ({(time.perf_counter() - start) * 1000:.0f}ms)")
+    finally:
+        await _release_lock(db, owner)
+
+    return current
+
+
+# ===== INDEX USAGE REPORT =====
+
+IndexUsage = namedtuple('IndexUsage', ['collection', 'name', 'key', 'ops', 'since', 'status'])
+
+
+def _is_prefix(key, other) -> bool:
+    return len(key) < len(other) and other[:len(key)] == key
+
+
+async def index_usage_report(db):
+    """
+    $indexStats for every managed collection with a status per index:
+    'expected'/'retire' (declared above), 'redundant' (non-unique prefix of another index),
+    'missing' (declared but absent) or 'unknown'. ops counts reset when mongod restarts.
+    """
+    report = []
+    for collection_name in sorted(set(INDEXES) | set(RETIRED_INDEXES)):
+        collection = db.db[collection_name]
+        expected = {model.document['name'] for model in INDEXES.get(collection_name, ())}
+        retired = set(RETIRED_INDEXES.get(collection_name, ()))
+
+        stats = await collection.aggregate([{"$indexStats": {}}]).to_list(length=None)
+        specs = {}
+        async for index in collection.list_indexes():
+            specs[index['name']] = index
+
+        keys = {name: list(spec['key'].items()) for name, spec in specs.items()}
+        for stat in sorted(stats, key=lambda s: s['name']):
+            name = stat['name']
+            key = keys.get(name, list(stat.get('key', {}).items()))
+            if name == '_id_' or name in expected:
+                status = 'expected'
+            elif name in retired:
+                status = 'retire'
+            elif not specs.get(name, {}).get('unique') and any(
+                _is_prefix(key, other) for other_name, other in keys.items() if other_name != name
+            ):
+                status = 'redundant'
+            else:
+                status = 'unknown'
+            accesses = stat.get('accesses', {})
+            report.append(IndexUsage(
+                collection_name, name, key, accesses.get('ops', 0), accesses.get('since'), status
+            ))
+
+        for name in sorted(expected - set(specs)):
+            report.append(IndexUsage(collection_name, name, [], 0, None, 'missing'))
+
+    return report
@@ -0,0 +1,190 @@
+"""
+Accent-insensitive name search index
+
+Every display name (and its localized aliases) is normalized once at build time and
+indexed by character trigrams. Substring queries intersect trigram postings and verify
+the few candidates; fuzzy "did you mean" queries rank candidates by trigram overlap.
+Built with the reference data snapshot and shared by the dex and list commands.
+"""
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+
+# Queries shorter than this cannot use trigrams and fall back to a key scan
+TRIGRAM = 3
+
+
+def normalize_name(name: str) -> str:
+    """Remove accents and lowercase a name for searching"""
+    normalized = unicodedata.normalize('NFD', name)
+    without_accents = ''.join(char for char in normalized if unicodedata.category(char) != 'Mn')
+    return without_accents.lower().strip()
+
+
+def _trigrams(text: str):
+    """Set of trigrams of a padded string (padding lets short words match by prefix)"""
+    padded = f"  {text} "
+    return {padded[i:i + TRIGRAM] for i in range(len(padded) - TRIGRAM + 1)}
+
+
+class NameSearchIndex:
+    """Trigram + sorted-key index over normalized names"""
+
+    def __init__(self, entries):
+        """
+        entries: iterable of (display_name, aliases) - aliases may include the display name
+        Indexed keys and queries both go through normalize_name
+        """
+        self.names = []            # entry id -> display name
+        self.entry_ids = {}        # display name -> entry id
+        key_entries = {}           # normalized key -> set of entry ids
+        key_primary = {}           # normalized key -> entry ids whose display name it is
+
+        for display_name, aliases in entries:
+            if display_name in self.entry_ids:
+                eid = self.entry_ids[display_name]
+            else:
+                eid = len(self.names)
+                self.names.append(display_name)
+                self.entry_ids[display_name] = eid
+            key = normalize_name(display_name)
+            if key:
+                key_primary.setdefault(key, set()).add(eid)
+            for alias in (display_name, *aliases):
+                key = normalize_name(alias)
+                if key:
+                    key_entries.setdefault(key, set()).add(eid)
+
+        self.keys = sorted(key_entries)                       # for prefix scans
+        self.key_entries = [tuple(sorted(key_entries[key])) for key in self.keys]
+        self.key_primary = [tuple(sorted(key_primary.get(key, ()))) for key in self.keys]
+
+        postings = {}
+        for kid, key in enumerate(self.keys):
+            for gram in _trigrams(key):
+                postings.setdefault(gram, []).append(kid)
+        self.postings = {gram: tuple(kids) for gram, kids in postings.items()}
+        self.key_gram_counts = [len(_trigrams(key)) for key in self.keys]
+
+        self._reset_caches()
+
+    def __getstate__(self):
+        # The memo is rebuilt on load
+        state = self.__dict__.copy()
+        state.pop('matching_names', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_caches()
+
+    def _reset_caches(self):
+        """Per-instance memo for repeated filter terms"""
+        self.matching_names = lru_cache(maxsize=256)(self._matching_names)
+
+    # ===== QUERIES =====
+
+    def _substring_keys(self, query: str):
+        """Key ids whose normalized key contains the (normalized) query"""
+        if len(query) < TRIGRAM:
+            return [kid for kid, key in enumerate(self.keys) if query in key]
+
+        grams = {query[i:i + TRIGRAM] for i in range(len(query) - TRIGRAM + 1)}
+        candidate_lists = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+        if not candidate_lists[0]:
+            return []
+
+        candidates = set(candidate_lists[0])
+        for kids in candidate_lists[1:]:
+            candidates.intersection_update(kids)
+            if not candidates:
+                return []
+
+        return [kid for kid in candidates if query in self.keys[kid]]
+
+    def _matching_names(self, query: str, aliases: bool = False) -> frozenset:
+        """
+        Display names containing the query (accent/case-insensitive)
+        aliases=True also matches localized names
+        """
+        query = normalize_name(query)
+        if not query:
+            return frozenset()
+
+        names = self.names
+        key_entries = self.key_entries if aliases else self.key_primary
+        return frozenset(
+            names[eid]
+            for kid in self._substring_keys(query)
+            for eid in key_entries[kid]
+        )
+
+    def matching_any(self, queries, aliases: bool = False) -> frozenset:
+        """Display names matching at least one query"""
+        result = frozenset()
+        for query in queries:
+            result = result | self.matching_names(query, aliases)
+        return result
+
+    def matcher(self, queries, aliases: bool = False):
+        """
+        Predicate name -> bool for a list of queries
+        Indexed names use the precomputed result; unknown names fall back to a substring check
+        """
+        allowed = self.matching_any(queries, aliases)
+        normalized_queries = [normalize_name(query) for query in queries]
+        entry_ids = self.entry_ids
+
+        def matches(name: str) -> bool:
+            if name in allowed:
+                return True
+            if name in entry_ids:
+                return False
+            normalized = normalize_name(name)
+            return any(query in normalized for query in normalized_queries)
+
+        return matches
+
+    def prefix(self, query: str, limit: int = 25):
+        """Display names with an alias starting with the query, in key order"""
+        query = normalize_name(query)
+        results = []
+        seen = set()
+        start = bisect_left(self.keys, query)
+        for kid in range(start, len(self.keys)):
+            if not self.keys[kid].startswith(query):
+                break
+            for eid in self.key_entries[kid]:
+                if eid not in seen:
+                    seen.add(eid)
+                    results.append(self.names[eid])
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def fuzzy(self, query: str, limit: int = 5, min_score: float = 0.3):
+        """
+        Ranked "did you mean" suggestions: [(display_name, score)], best first
+        Score is trigram Jaccard similarity of the best-matching alias
+        """
+        query = normalize_name(query)
+        if not query:
+            return []
+
+        grams = _trigrams(query)
+        shared = {}
+        for gram in grams:
+            for kid in self.postings.get(gram, ()):
+                shared[kid] = shared.get(kid, 0) + 1
+
+        best = {}
+        for kid, common in shared.items():
+            score = common / (len(grams) + self.key_gram_counts[kid] - common)
+            if score < min_score:
+                continue
+            for eid in self.key_entries[kid]:
+                if score > best.get(eid, 0):
+                    best[eid] = score
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1], self.names[item[0]]))
+        return [(self.names[eid], round(score, 3)) for eid, score in ranked[:limit]]
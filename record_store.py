@@ -0,0 +1,136 @@
+"""
+Lazy, memory-mapped record store for large JSON datasets
+
+A JSON object file ({key: record, ...}) is compiled once into an indexed binary file:
+
+    header   <8s I>   magic + length of the index blob
+    index    pickle   {'version', 'fingerprint', 'keys': {key: (offset, length)}}
+    records  bytes    each record as compact UTF-8 JSON
+
+The records file is memory-mapped and a record is only decoded on first access,
+with a small LRU of decoded records. Startup skips parsing the JSON entirely.
+"""
+import json
+import mmap
+import os
+import pickle
+import struct
+from collections import OrderedDict
+from collections.abc import Mapping
+
+STORE_MAGIC = b'MMREC001'
+STORE_VERSION = 1
+HEADER = struct.Struct('<8sI')
+
+# Decoded records kept per store
+DEFAULT_CACHE_SIZE = 128
+
+
+def source_fingerprint(source_path: str) -> str:
+    """mtime/size fingerprint of the source JSON file"""
+    stat = os.stat(source_path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def compile_store(source_path: str, store_path: str):
+    """Compile a JSON object file into an indexed records file"""
+    with open(source_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    keys = {}
+    chunks = []
+    offset = 0
+    for key, record in records.items():
+        blob = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        keys[key] = (offset, len(blob))
+        chunks.append(blob)
+        offset += len(blob)
+
+    index = pickle.dumps({
+        'version': STORE_VERSION,
+        'fingerprint': source_fingerprint(source_path),
+        'keys': keys
+    }, protocol=pickle.HIGHEST_PROTOCOL)
+
+    tmp_path = f"{store_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(STORE_MAGIC, len(index)))
+        f.write(index)
+        for blob in chunks:
+            f.write(blob)
+    os.replace(tmp_path, store_path)
+
+
+class RecordStore(Mapping):
+    """Read-only mapping backed by a memory-mapped records file"""
+
+    def __init__(self, store_path: str, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.store_path = store_path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+        with open(store_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, index_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != STORE_MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{store_path} is not a record store")
+
+        index = pickle.loads(self._mmap[HEADER.size:HEADER.size + index_length])
+        self.version = index['version']
+        self.fingerprint = index['fingerprint']
+        self._keys = index['keys']
+        self._data_start = HEADER.size + index_length
+
+    def __getitem__(self, key):
+        cache = self._cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        offset, length = self._keys[key]
+        start = self._data_start + offset
+        record = json.loads(self._mmap[start:start + length].decode('utf-8'))
+
+        cache[key] = record
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return record
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def close(self):
+        """Release the memory map"""
+        self._cache.clear()
+        self._mmap.close()
+
+
+def open_store(source_path: str, cache_size: int = DEFAULT_CACHE_SIZE) -> RecordStore:
+    """
+    Open the records file for a JSON source, (re)compiling it when missing or stale
+    The records file lives next to the source with a .records extension
+    """
+    store_path = os.path.splitext(source_path)[0] + '.records'
+    fingerprint = source_fingerprint(source_path)
+
+    try:
+        store = RecordStore(store_path, cache_size)
+        if store.version == STORE_VERSION and store.fingerprint == fingerprint:
+            return store
+        store.close()
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️ Rebuilding unreadable record store {store_path}: {e}")
+
+    compile_store(source_path, store_path)
+    print(f"🔨 Compiled {source_path} -> {store_path}")
+    return RecordStore(store_path, cache_size)
@@ -0,0 +1,562 @@
+"""
+Precompiled reference data snapshot
+
+All static game data (data/*.csv and alldata/pokemon_data.json) is parsed once and
+written to a single pickle snapshot together with every derived index the cogs use.
+The snapshot is rebuilt automatically whenever a source file's mtime or size changes
+(including the modules that build it).
+The large alldata/*.json datasets themselves are served by lazy record stores.
+
+Each loaded snapshot is a numbered generation. reload_reference_data() builds the next
+generation in a worker thread, validates it and swaps it in atomically; cogs register
+reload listeners to rebind their references and drop derived caches.
+
+Build it ahead of time with:  python -m reference_data
+"""
+import asyncio
+import csv
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+import time
+
+import config
+import dex_views
+import filter_engine
+import filters
+
+import name_search
+from name_search import normalize_name
+import record_store
+import smartlist_utils
+import species_registry
+
+# Bump when the snapshot payload layout changes (old snapshots are then ignored);
+# code changes in the builder modules are covered by BUILDER_FILES
+SNAPSHOT_VERSION = 9
+SNAPSHOT_PATH = 'data/reference_data.snapshot'
+
+# Large JSON datasets served lazily from memory-mapped record stores
+POKEDEX_JSON = 'alldata/pokemon_data.json'
+MOVESETS_JSON = 'alldata/pokemon_movesets.json'
+EVENT_POKEDEX_JSON = 'alldata/eventpokemon_data.json'
+
+SOURCE_FILES = [
+    'data/dex_number.csv',
+    'data/dex_number_updated.csv',
+    'data/egg_groups.csv',
+    'data/male.csv',
+    'data/female.csv',
+    'data/pokemon_data.csv',
+    'data/event_pokemon.csv',
+    'data/pokemon_cdn_mapping.csv',
+    'data/pokemonnames.txt',
+    POKEDEX_JSON,
+    # Python sources with reference data (RARE, regional prefixes, named filters)
+    'config.py',
+    'filters.py',
+]
+
+# Modules whose code defines and builds the pickled objects. They are stamped once at import,
+# i.e. for the code actually running: editing them on disk invalidates the snapshot on the
+# next start, but never triggers a hot reload that would rebuild with the old code.
+BUILDER_FILES = [
+    'reference_data.py',
+    'species_registry.py',
+    'name_search.py',
+    'dex_views.py',
+    'filter_engine.py',
+    'smartlist_utils.py',
+]
+
+# Process-wide cache so every cog (and cog reloads) share one copy
+_loaded = None
+_loaded_fingerprint = None
+_generation = 0
+_stores = {}
+_reload_listeners = []
+_reload_lock = None
+
+
+def _stat_digest(paths) -> str:
+    """Hash of (path, mtime, size) for every path"""
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+        except OSError:
+            digest.update(f"{path}:missing;".encode())
+    return digest.hexdigest()
+
+
+_BUILDER_STAMP = _stat_digest(BUILDER_FILES)
+
+
+def source_fingerprint() -> str:
+    """Hash of (path, mtime, size) for every source file, plus the builder code stamp"""
+    return f"{_stat_digest(SOURCE_FILES)}:{_BUILDER_STAMP}"
+
+
+# ===== CSV PARSERS =====
+
+def _read_csv(path: str):
+    """Read a CSV file into a list of row dicts (empty list if missing)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+    except Exception as e:
+        print(f"❌ Error loading {path}: {e}")
+        return []
+
+
+def _build_dex_numbers(data: dict):
+    """dex_number.csv (breeding) and dex_number_updated.csv (shiny dex)"""
+    dex_numbers = data['dex_numbers']
+    dex_forms = data['dex_forms']
+    for row in _read_csv('data/dex_number.csv'):
+        try:
+            dex_num = int(row['Number']) if row['Number'] else 0
+            name = row['Name'].strip()
+            form = row['Form'].strip() if row['Form'] else ""
+
+            full_name = f"{form} {name}".strip() if form else name
+            dex_numbers[full_name] = dex_num
+            if not form:
+                dex_numbers[name] = dex_num
+            dex_forms[(dex_num, form)] = full_name
+        except (ValueError, KeyError):
+            continue
+
+    dex_data = data['dex_data']
+    dex_by_number = data['dex_by_number']
+    for row in _read_csv('data/dex_number_updated.csv'):
+        try:
+            dex_num = int(row['Number']) if row['Number'] else 0
+            name = row['Name'].strip()
+            has_gender_diff = row.get('HasGenderDifference', '').strip().lower() == 'yes'
+
+            dex_data[name] = {
+                'dex_number': dex_num,
+                'has_gender_diff': has_gender_diff
+            }
+            dex_by_number.setdefault(dex_num, []).append((name, has_gender_diff))
+        except (ValueError, KeyError):
+            continue
+
+
+def _build_egg_groups(data: dict):
+    """egg_groups.csv"""
+    egg_groups = data['egg_groups']
+    for row in _read_csv('data/egg_groups.csv'):
+        name = row['Name'].strip()
+        groups = row['Egg Groups'].strip()
+        if groups:
+            egg_groups[name] = [g.strip() for g in groups.split(',')]
+
+
+def _build_gender_only(data: dict):
+    """male.csv / female.csv (by dex number)"""
+    for path, key in (('data/male.csv', 'male_only_dex'), ('data/female.csv', 'female_only_dex')):
+        for row in _read_csv(path):
+            if 'dex' in row:
+                try:
+                    data[key].add(int(row['dex']))
+                except ValueError:
+                    continue
+
+
+def _build_pokemon_info(data: dict):
+    """pokemon_data.csv (region/type filtering)"""
+    pokemon_info = data['pokemon_info']
+    for row in _read_csv('data/pokemon_data.csv'):
+        name = row['name'].strip()
+        pokemon_info[name] = {
+            'region': row['region'].strip() if row['region'] else "",
+            'type1': row['type1'].strip() if row['type1'] else "",
+            'type2': row['type2'].strip() if row['type2'] else ""
+        }
+
+
+def _build_event_pokemon(data: dict):
+    """event_pokemon.csv"""
+    for row in _read_csv('data/event_pokemon.csv'):
+        try:
+            name = row['Name'].strip()
+            has_gender_diff = row['HasGenderDifference'].strip().lower() == 'yes'
+            data['event_data'][name] = {'has_gender_diff': has_gender_diff}
+            data['event_pokemon_list'].append((name, has_gender_diff))
+        except (ValueError, KeyError):
+            continue
+
+
+def _build_cdn_mapping(data: dict):
+    """pokemon_cdn_mapping.csv (lowercase name -> CDN number)"""
+    for row in _read_csv('data/pokemon_cdn_mapping.csv'):
+        pokemon_name = row.get('name', '').strip()
+        cdn_number = row.get('cdn_number', '').strip()
+        if pokemon_name and cdn_number:
+            data['pokemon_cdn_mapping'][pokemon_name.lower()] = int(cdn_number)
+
+
+def _read_listed_names():
+    """pokemonnames.txt (one name per line, used for list extraction)"""
+    try:
+        with open('data/pokemonnames.txt', 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+    except Exception as e:
+        print(f"❌ Error loading data/pokemonnames.txt: {e}")
+        return []
+
+
+# ===== POKEDEX JSON =====
+
+def _build_pokedex(data: dict):
+    """
+    Name index and dex number -> forms mapping for alldata/pokemon_data.json
+    (the records themselves are served lazily by get_pokedex)
+    """
+    try:
+        with open(POKEDEX_JSON, 'r', encoding='utf-8') as f:
+            pokedex = json.load(f)
+    except Exception as e:
+        print(f"❌ Error loading {POKEDEX_JSON}: {e}")
+        return
+
+    name_index = data['name_index']
+    dex_number_forms = data['dex_number_forms']
+    localized_names = data['localized_names']
+
+    def index_name(name, form_key):
+        name_index[name.lower()] = form_key
+        name_index[normalize_name(name)] = form_key
+
+    for form_key, entry in pokedex.items():
+        dex_num = entry.get('dex_number', '0')
+        pokemon_name = entry.get('name', '')
+
+        dex_number_forms.setdefault(dex_num, []).append((form_key, pokemon_name))
+
+        if pokemon_name:
+            index_name(pokemon_name, form_key)
+
+        aliases = localized_names.setdefault(pokemon_name, [])
+        for names in entry.get('names', {}).values():
+            if isinstance(names, list):
+                for name in names:
+                    index_name(name, form_key)
+                    aliases.append(name)
+            else:
+                index_name(names, form_key)
+                aliases.append(names)
+
+
+def build_reference_data(config_module=config, filters_module=filters) -> dict:
+    """
+    Parse every source file and derive the registry plus all lookup indexes
+    config_module/filters_module: the Python-defined reference data to build from
+    (hot reloads pass fresh copies that are only installed once the build validates)
+    """
+    parsed = {
+        'dex_numbers': {},
+        'dex_forms': {},
+        'dex_data': {},
+        'dex_by_number': {},
+        'egg_groups': {},
+        'male_only_dex': set(),
+        'female_only_dex': set(),
+        'pokemon_info': {},
+        'event_data': {},
+        'event_pokemon_list': [],
+        'pokemon_cdn_mapping': {},
+        'name_index': {},
+        'dex_number_forms': {},
+        'localized_names': {},
+    }
+
+    _build_dex_numbers(parsed)
+    _build_egg_groups(parsed)
+    _build_gender_only(parsed)
+    _build_pokemon_info(parsed)
+    _build_event_pokemon(parsed)
+    _build_cdn_mapping(parsed)
+    _build_pokedex(parsed)
+
+    dex_by_number = parsed['dex_by_number']
+    event_pokemon_list = parsed['event_pokemon_list']
+    listed_names = _read_listed_names()
+
+    # Search entries: every English display name plus its localized aliases
+    localized_names = parsed['localized_names']
+    search_names = {}
+    for source in (parsed['dex_data'], parsed['event_data'], localized_names, listed_names):
+        for name in source:
+            if name:
+                search_names.setdefault(name, localized_names.get(name, ()))
+
+    registry = species_registry.build_registry(parsed, listed_names, config_module)
+
+    # Immutable, sorted entry arrays used by the dex commands
+    basic_dex_entries = tuple(
+        (dex_num, dex_by_number[dex_num][0][0])
+        for dex_num in sorted(dex_by_number)
+        if dex_by_number[dex_num]
+    )
+    full_dex_entries = tuple(
+        (dex_num, name, has_gender_diff)
+        for dex_num in sorted(dex_by_number)
+        for name, has_gender_diff in dex_by_number[dex_num]
+    )
+    event_pokemon_list = tuple(event_pokemon_list)
+    named_filters = {key: data['pokemon'] for key, data in filters_module.FILTERS.items()}
+
+    search_index = name_search.NameSearchIndex(search_names.items())
+    views = dex_views.build_dex_views(
+        registry, basic_dex_entries, full_dex_entries, event_pokemon_list,
+        named_filters, lambda name: registry.resolve(name).dex_number
+    )
+
+    # Only the registry and derived indexes are kept; the string-keyed dicts are dropped
+    return {
+        'registry': registry,
+        'name_search': search_index,
+        'dex_views': views,
+        'smartlist': smartlist_utils.SmartlistTable(registry, config_module),
+        'filter_engine': filter_engine.FilterEngine(
+            views['universe'], filters_module.ALIAS_MAP,
+            {key: data['name'].strip() for key, data in filters_module.FILTERS.items()},
+            search_index
+        ),
+        'male_only_dex': frozenset(parsed['male_only_dex']),
+        'female_only_dex': frozenset(parsed['female_only_dex']),
+        'event_pokemon_list': event_pokemon_list,
+        'name_index': parsed['name_index'],
+        'dex_number_forms': parsed['dex_number_forms'],
+        'basic_dex_entries': basic_dex_entries,
+        'full_dex_entries': full_dex_entries,
+        'total_unique_dex': len(dex_by_number),
+        'total_forms_count': sum(
+            2 if has_gender_diff else 1
+            for forms in dex_by_number.values()
+            for _, has_gender_diff in forms
+        ),
+        'total_event_count': sum(2 if has_gender_diff else 1 for _, has_gender_diff in event_pokemon_list),
+    }
+
+
+def get_registry():
+    """Shared species registry"""
+    return load_reference_data()['registry']
+
+
+def save_snapshot(data: dict, fingerprint: str, path: str = SNAPSHOT_PATH):
+    """Atomically write the snapshot file"""
+    payload = {'version': SNAPSHOT_VERSION, 'fingerprint': fingerprint, 'data': data}
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # Per process: cluster workers may rebuild concurrently
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _read_snapshot(fingerprint: str, path: str = SNAPSHOT_PATH):
+    """Return snapshot data if it is current, otherwise None"""
+    try:
+        with open(path, 'rb') as f:
+            payload = pickle.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable reference data snapshot: {e}")
+        return None
+
+    if payload.get('version') != SNAPSHOT_VERSION or payload.get('fingerprint') != fingerprint:
+        return None
+    return payload['data']
+
+
+def load_reference_data() -> dict:
+    """
+    Get the current reference data generation (shared, read-only)
+    Uses the in-process copy, then the snapshot file, and only parses sources when stale.
+    Once loaded, source changes are picked up by reload_reference_data(), not here.
+    """
+    global _loaded, _loaded_fingerprint, _generation
+
+    if _loaded is not None:
+        return _loaded
+
+    fingerprint = source_fingerprint()
+    start = time.perf_counter()
+    data = _read_snapshot(fingerprint)
+
+    if data is None:
+        data = build_reference_data()
+        try:
+            save_snapshot(data, fingerprint)
+        except OSError as e:
+            print(f"⚠️ Could not write reference data snapshot: {e}")
+        print(f"🔨 Rebuilt reference data snapshot in {(time.perf_counter() - start) * 1000:.0f}ms")
+    else:
+        print(f"✅ Loaded reference data snapshot in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    _loaded = data
+    _loaded_fingerprint = fingerprint
+    _generation += 1
+    return data
+
+
+# ===== HOT RELOAD =====
+
+def get_generation() -> int:
+    """Number of the reference data generation currently in use (0 = not loaded)"""
+    return _generation
+
+
+def add_reload_listener(callback):
+    """Register callback(generation, data), called on the event loop after each swap"""
+    if callback not in _reload_listeners:
+        _reload_listeners.append(callback)
+
+
+def remove_reload_listener(callback):
+    """Unregister a reload listener (call from cog_unload)"""
+    if callback in _reload_listeners:
+        _reload_listeners.remove(callback)
+
+
+def sources_changed() -> bool:
+    """True when a source file changed since the current generation was loaded"""
+    return _loaded is not None and source_fingerprint() != _loaded_fingerprint
+
+
+def validate_reference_data(data: dict):
+    """Sanity-check a freshly built generation before it replaces the current one"""
+    registry = data['registry']
+    if not len(registry) or not data['full_dex_entries'] or not data['basic_dex_entries']:
+        raise ValueError("reference data is empty (missing or unreadable source files?)")
+    if not data['name_index']:
+        raise ValueError("pokedex name index is empty")
+
+    missing = [name for _, name, _ in data['full_dex_entries'] if name not in registry]
+    missing += [name for name, _ in data['event_pokemon_list'] if name not in registry]
+    missing += [name for _, name, _ in data['full_dex_entries'] if name not in data['name_search'].entry_ids]
+    if missing:
+        raise ValueError(f"{len(missing)} dex entries are not registered (e.g. {missing[0]})")
+
+    if _loaded is not None and len(data['full_dex_entries']) < len(_loaded['full_dex_entries']) // 2:
+        raise ValueError(
+            f"shiny dex shrank from {len(_loaded['full_dex_entries'])} to "
+            f"{len(data['full_dex_entries'])} forms, refusing to swap"
+        )
+
+
+def _fresh_module(module):
+    """Execute a module's current source into a new module object (sys.modules is untouched)"""
+    spec = importlib.util.spec_from_file_location(module.__name__, module.__file__)
+    fresh = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(fresh)
+    return fresh
+
+
+def _install_module(module, fresh):
+    """
+    Swap fresh's definitions into the live module in place (as importlib.reload does), so every
+    `import config` / `import filters` binding and every function defined there sees them
+    """
+    for key, value in vars(fresh).items():
+        if key not in ('__name__', '__spec__', '__loader__', '__builtins__'):
+            setattr(module, key, value)
+
+
+def _build_generation():
+    """
+    Build, validate and persist the next generation (runs in a worker thread)
+    Returns: (data, fingerprint, new config module, new filters module) - nothing is live yet
+    """
+    fingerprint = source_fingerprint()
+    new_config = _fresh_module(config)
+    new_filters = _fresh_module(filters)
+    data = build_reference_data(new_config, new_filters)
+    validate_reference_data(data)
+    try:
+        save_snapshot(data, fingerprint)
+    except OSError as e:
+        print(f"⚠️ Could not write reference data snapshot: {e}")
+    return data, fingerprint, new_config, new_filters
+
+
+async def reload_reference_data() -> int:
+    """
+    Build a new generation in the background and swap it in atomically
+    config.py/filters.py are built from fresh copies and only installed together with the new
+    generation, so a failed build leaves config, filters and the data untouched.
+    In-flight commands keep the references they already hold; new lookups see the new data.
+    Raises ValueError (current generation stays active) when validation fails.
+    Returns: the new generation number
+    """
+    global _loaded, _loaded_fingerprint, _generation, _reload_lock
+
+    if _reload_lock is None:
+        _reload_lock = asyncio.Lock()
+
+    async with _reload_lock:
+        start = time.perf_counter()
+        data, fingerprint, new_config, new_filters = await asyncio.to_thread(_build_generation)
+
+        # Validated: install the new config/filters and the data together, on the loop thread
+        _install_module(config, new_config)
+        _install_module(filters, new_filters)
+        _loaded = data
+        _loaded_fingerprint = fingerprint
+        _generation += 1
+
+        for callback in list(_reload_listeners):
+            try:
+                callback(_generation, data)
+            except Exception as e:
+                print(f"⚠️ Reference data reload listener failed: {e}")
+
+        print(f"🔄 Reference data generation {_generation} swapped in "
+              f"({(time.perf_counter() - start) * 1000:.0f}ms)")
+        return _generation
+
+
+def get_record_store(source_path: str):
+    """Shared lazy record store for a large JSON dataset (reopened if the source changed)"""
+    store = _stores.get(source_path)
+    if store is not None and store.fingerprint == record_store.source_fingerprint(source_path):
+        return store
+
+    # A replaced store is not closed: open views may still read from it,
+    # and its memory map is released once the last reference goes away
+    store = record_store.open_store(source_path)
+    _stores[source_path] = store
+    return store
+
+
+def get_pokedex():
+    """Pokedex entries keyed by form key (e.g. '1_Bulbasaur'), decoded on access"""
+    return get_record_store(POKEDEX_JSON)
+
+
+def get_movesets():
+    """Moveset entries keyed by species name, decoded on access"""
+    return get_record_store(MOVESETS_JSON)
+
+
+def get_event_pokedex():
+    """Event Pokedex entries keyed by form key, decoded on access"""
+    return get_record_store(EVENT_POKEDEX_JSON)
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    snapshot = build_reference_data()
+    save_snapshot(snapshot, source_fingerprint())
+    for source_path in (POKEDEX_JSON, MOVESETS_JSON, EVENT_POKEDEX_JSON):
+        record_store.compile_store(source_path, os.path.splitext(source_path)[0] + '.records')
+    print(f"✅ Wrote {SNAPSHOT_PATH} and record stores in {(time.perf_counter() - start) * 1000:.0f}ms")
+    print(f"   {len(snapshot['registry'])} species, {len(snapshot['full_dex_entries'])} shiny dex forms, "
+          f"{len(snapshot['name_index'])} indexed names")
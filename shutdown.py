@@ -0,0 +1,158 @@
+"""
+Graceful shutdown coordinator
+
+SIGINT/SIGTERM (or the bot stopping on its own) run one ordered shutdown:
+1. stop accepting work: new prefix commands are dropped by the message dispatcher, slash
+   commands get a "restarting" reply, and ingestion sessions stop waiting for more pages
+2. wait up to config.SHUTDOWN_DRAIN_SECONDS for in-flight command tasks and tracked
+   background tasks (every Mongo write they issue is awaited inside them), then cancel the rest
+3. flush the command log queue
+4. stop the cluster heartbeat, stall watchdog, loop monitor and metrics exporter
+5. close the gateway and Discord HTTP session (bot.close also unloads the cogs), then MongoDB
+
+A second Ctrl+C skips the drain wait. Commands and sessions get the drain signal from
+bot.shutdown_coordinator (draining, wait_for).
+"""
+import asyncio
+import signal
+import time
+from database import db
+
+CANCEL_GRACE = 5.0  # Seconds cancelled tasks get to unwind
+
+
+class ShutdownCoordinator:
+    """Tracks in-flight work and runs the shutdown sequence exactly once"""
+
+    def __init__(self, bot, drain_seconds: float):
+        self.bot = bot
+        self.drain_seconds = drain_seconds
+        self.draining = False
+        self.drain_event = asyncio.Event()
+        self.force_event = asyncio.Event()
+        self.tasks = set()  # In-flight command tasks and tracked background tasks
+        self.shutdown_task = None
+
+    # ===== TRACKING =====
+
+    def track(self, task=None):
+        """Register a task (default: the current one) that shutdown waits for; returns it"""
+        task = task or asyncio.current_task()
+        if task is not None and not task.done():
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def wait_for(self, event: str, *, check=None, timeout: float = None):
+        """bot.wait_for that also gives up (asyncio.TimeoutError) as soon as shutdown starts"""
+        if self.draining:
+            raise asyncio.TimeoutError
+        waiter = asyncio.ensure_future(self.bot.wait_for(event, check=check, timeout=timeout))
+        drained = asyncio.ensure_future(self.drain_event.wait())
+        try:
+            await asyncio.wait({waiter, drained}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            drained.cancel()
+            if not waiter.done():
+                waiter.cancel()
+        if waiter.done() and not waiter.cancelled():
+            return waiter.result()
+        raise asyncio.TimeoutError
+
+    # ===== SIGNALS =====
+
+    def install_signal_handlers(self):
+        """Run the shutdown on SIGINT/SIGTERM (call from inside the running loop)"""
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self._on_signal, signum)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C arrives as KeyboardInterrupt instead
+
+    def _on_signal(self, signum):
+        if self.shutdown_task is not None:
+            if signum == signal.SIGINT and not self.force_event.is_set():
+                print("⚠️ Second Ctrl+C: not waiting for in-flight work")
+                self.force_event.set()
+            return
+        self.request(f"signal {signal.Signals(signum).name}")
+
+    def request(self, reason: str):
+        """Start the shutdown in the background (idempotent); returns its task"""
+        if self.shutdown_task is None:
+            self.shutdown_task = asyncio.create_task(self._shutdown(reason))
+        return self.shutdown_task
+
+    async def shutdown(self, reason: str):
+        """Run the shutdown (or wait for the one already running)"""
+        await asyncio.shield(self.request(reason))
+
+    # ===== SEQUENCE =====
+
+    async def _drain(self):
+        """Wait for in-flight tasks until the deadline (or a forced stop), then cancel the rest"""
+        current = asyncio.current_task()
+        pending = {task for task in self.tasks if task is not current and not task.done()}
+        if not pending:
+            return
+
+        print(f"⏳ Waiting up to {self.drain_seconds:.0f}s for {len(pending)} in-flight task(s)...")
+        start = time.perf_counter()
+        deadline = start + self.drain_seconds
+        forced = asyncio.ensure_future(self.force_event.wait())
+        try:
+            while pending and not forced.done() and time.perf_counter() < deadline:
+                await asyncio.wait(pending | {forced}, timeout=deadline - time.perf_counter(),
+                                   return_when=asyncio.FIRST_COMPLETED)
+                pending = {task for task in pending if not task.done()}
+        finally:
+            forced.cancel()
+
+        pending = {task for task in pending if not task.done()}
+        if not pending:
+            print(f"✅ In-flight work finished in {(time.perf_counter() - start) * 1000:.0f}ms")
+            return
+
+        for task in pending:
+            print(f"⚠️ Cancelling unfinished task: {task.get_name()}")
+            task.cancel()
+        await asyncio.wait(pending, timeout=CANCEL_GRACE)
+
+    async def _step(self, name: str, coro):
+        try:
+            await coro
+        except Exception as e:
+            print(f"❌ Shutdown step '{name}' failed: {e}")
+
+    async def _shutdown(self, reason: str):
+        bot = self.bot
+        print(f"\n🛑 Shutting down ({reason})...")
+
+        # 1. Stop accepting work
+        self.draining = True
+        self.drain_event.set()
+        bot.message_dispatch.accepting_commands = False
+
+        # 2. Let in-flight commands, sessions and downloads finish
+        await self._step("drain", self._drain())
+
+        # 3. Flush write-behind queues while the gateway and HTTP session are still up
+        await self._step("command log", bot.command_logger.stop())
+
+        # 4. Background monitors
+        if bot.cluster and bot.cluster.task:
+            bot.cluster.task.cancel()
+        bot.stall_watchdog.stop()
+        loop_monitor = getattr(bot, 'loop_monitor', None)
+        if loop_monitor:
+            loop_monitor.cancel()
+        metrics_runner = getattr(bot, 'metrics_runner', None)
+        if metrics_runner:
+            await self._step("metrics exporter", metrics_runner.cleanup())
+
+        # 5. Discord (gateway, HTTP session, cog unloads), then MongoDB last
+        if not bot.is_closed():
+            await self._step("discord", bot.close())
+        await self._step("database", db.close())
+        print("✅ Shutdown complete")
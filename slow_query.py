@@ -0,0 +1,238 @@
+"""
+Slow-query log with explain plans
+
+A pymongo command listener times every query/write command. Commands slower than
+config.SLOW_QUERY_MS are logged with:
+- the Database method that issued them (current_method, set by the method wrapper)
+- the query shape: field names and operators kept, values replaced by their type
+- the explain() winning plan (COLLSCAN vs IXSCAN + index) and docs/keys examined vs returned
+
+Explains run on the event loop, at most once per query shape every EXPLAIN_COOLDOWN
+seconds (explain executes the query plan again, but never applies writes).
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timezone
+from pymongo import monitoring
+import metrics
+
+# "Database.method" currently running in this context (None outside Database methods)
+# Motor copies the context into its executor threads, so listeners can read it
+current_method = contextvars.ContextVar('current_database_method', default=None)
+
+HISTORY_SIZE = 100
+EXPLAIN_COOLDOWN = 600  # Seconds between explains of the same shape
+EXPLAIN_TIMEOUT = 10.0
+
+# Commands worth explaining -> field holding the collection name is the command name itself
+QUERY_COMMANDS = ('find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify')
+
+# Session/transport fields that must not be sent inside an explain
+_TRANSPORT_FIELDS = (
+    'lsid', '$clusterTime', '$db', 'txnNumber', 'startTransaction', 'autocommit',
+    '$readPreference', 'readConcern', 'writeConcern', 'apiVersion', 'apiStrict',
+    'apiDeprecationErrors', 'ordered', 'bypassDocumentValidation', 'cursor'
+)
+
+SLOW_QUERIES = metrics.Counter("minimeowth_slow_queries", "MongoDB commands over the slow query threshold",
+                               ("method", "command"))
+metrics.METRICS.append(SLOW_QUERIES)
+
+# plan: "IXSCAN user_pokemon_unique > FETCH" style summary, or None until explained
+SlowQuery = namedtuple('SlowQuery', [
+    'when', 'duration', 'method', 'command', 'collection', 'shape', 'plan',
+    'docs_examined', 'keys_examined', 'returned'
+])
+
+
+# ===== SHAPES =====
+
+def _type_name(value) -> str:
+    return f"<{type(value).__name__}>"
+
+
+def query_shape(value, depth: int = 0):
+    """Redact values: keep field names/operators, replace values by their type"""
+    if depth > 8:
+        return "<...>"
+    if isinstance(value, dict):
+        return {key: query_shape(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return []
+        if all(not isinstance(item, (dict, list, tuple)) for item in value):
+            types = sorted({type(item).__name__ for item in value})
+            return f"[{len(value)} × {'|'.join(types)}]"
+        return [query_shape(item, depth + 1) for item in value[:5]]
+    return _type_name(value)
+
+
+def command_shape(command_name: str, command: dict):
+    """The query-relevant parts of a command, redacted"""
+    if command_name == 'find':
+        parts = {key: command.get(key) for key in ('filter', 'sort', 'projection', 'limit') if key in command}
+    elif command_name == 'aggregate':
+        parts = {'pipeline': command.get('pipeline', [])}
+    elif command_name in ('count', 'distinct'):
+        parts = {key: command.get(key) for key in ('query', 'key') if key in command}
+    elif command_name == 'update':
+        updates = command.get('updates') or [{}]
+        parts = {'q': updates[0].get('q'), 'u': updates[0].get('u'), 'multi': updates[0].get('multi', False),
+                 'statements': len(updates)}
+    elif command_name == 'delete':
+        deletes = command.get('deletes') or [{}]
+        parts = {'q': deletes[0].get('q'), 'limit': deletes[0].get('limit'), 'statements': len(deletes)}
+    else:  # findAndModify
+        parts = {key: command.get(key) for key in ('query', 'sort', 'update') if key in command}
+    return query_shape(parts)
+
+
+def _explainable(command_name: str, command: dict) -> dict:
+    """Copy of the command suitable for explain (single statement, no session fields)"""
+    explain = {key: value for key, value in command.items() if key not in _TRANSPORT_FIELDS}
+    if command_name == 'update':
+        explain['updates'] = command.get('updates', [])[:1]
+    elif command_name == 'delete':
+        explain['deletes'] = command.get('deletes', [])[:1]
+    elif command_name == 'aggregate':
+        explain['cursor'] = {}
+    return explain
+
+
+# ===== EXPLAIN PARSING =====
+
+def _plan_stages(plan) -> list:
+    """Stage names from the leaf up, e.g. ['IXSCAN user_pokemon_unique', 'FETCH']"""
+    stages = []
+    while plan:
+        stage = plan.get('stage', '?')
+        if plan.get('indexName'):
+            stage += f" {plan['indexName']}"
+        stages.append(stage)
+        inputs = plan.get('inputStages')
+        plan = plan.get('inputStage') or (inputs[0] if inputs else None)
+    return stages[::-1]
+
+
+def summarize_explain(result: dict):
+    """(plan summary, docs examined, keys examined, returned) from an explain result"""
+    planner = result.get('queryPlanner')
+    execution = result.get('executionStats', {})
+    if planner is None:
+        # Aggregations: the query part is explained inside the first $cursor stage
+        for stage in result.get('stages', []):
+            cursor = stage.get('$cursor')
+            if cursor:
+                planner = cursor.get('queryPlanner')
+                execution = cursor.get('executionStats', {})
+                break
+    if planner is None:
+        return "unknown", None, None, None
+
+    winning = planner.get('winningPlan', {})
+    winning = winning.get('queryPlan', winning)  # Slot-based engine wraps the plan
+    return (
+        " > ".join(_plan_stages(winning)) or "unknown",
+        execution.get('totalDocsExamined'),
+        execution.get('totalKeysExamined'),
+        execution.get('nReturned'),
+    )
+
+
+# ===== LOG =====
+
+class SlowQueryLog(monitoring.CommandListener):
+    """Command listener recording slow commands; explains run on the attached loop"""
+
+    def __init__(self, threshold_ms: int):
+        self.threshold = threshold_ms / 1000
+        self.entries = deque(maxlen=HISTORY_SIZE)
+        self.loop = None
+        self.database = None
+        self.lock = threading.Lock()
+        self.started_commands = {}  # (connection, request_id) -> (name, collection, command, method)
+        self.last_explained = {}    # shape key -> monotonic time
+
+    def attach(self, loop, database):
+        """Enable explains (database: a Motor database)"""
+        self.loop = loop
+        self.database = database
+
+    def recent(self, limit: int = 10):
+        return list(self.entries)[::-1][:limit]
+
+    # ===== LISTENER (driver threads) =====
+
+    def started(self, event):
+        if event.command_name not in QUERY_COMMANDS:
+            return
+        command = event.command
+        with self.lock:
+            self.started_commands[(event.connection_id, event.request_id)] = (
+                event.command_name, command.get(event.command_name), command, current_method.get()
+            )
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        with self.lock:
+            started = self.started_commands.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        duration = event.duration_micros / 1e6
+        if duration < self.threshold:
+            return
+
+        command_name, collection, command, method = started
+        method = method or "unknown"
+        shape = command_shape(command_name, command)
+        entry = SlowQuery(datetime.now(timezone.utc), duration, method, command_name, collection,
+                          shape, None, None, None, None)
+        SLOW_QUERIES.inc(method, command_name)
+        print(f"🐌 Slow query {duration * 1000:.0f}ms in {method}: {collection}.{command_name} {shape}")
+
+        shape_key = (collection, command_name, repr(shape))
+        now = time.monotonic()
+        with self.lock:
+            self.entries.append(entry)
+            due = now - self.last_explained.get(shape_key, -EXPLAIN_COOLDOWN) >= EXPLAIN_COOLDOWN
+            if due:
+                self.last_explained[shape_key] = now
+
+        if due and self.loop is not None and self.database is not None:
+            explain = _explainable(command_name, command)
+            self.loop.call_soon_threadsafe(self._schedule_explain, entry, explain)
+
+    # ===== EXPLAIN (event loop) =====
+
+    def _schedule_explain(self, entry, command):
+        asyncio.ensure_future(self._explain(entry, command))
+
+    async def _explain(self, entry, command):
+        try:
+            result = await asyncio.wait_for(
+                self.database.command({"explain": command, "verbosity": "executionStats"}),
+                timeout=EXPLAIN_TIMEOUT
+            )
+        except Exception as e:
+            print(f"⚠️ Could not explain slow {entry.collection}.{entry.command}: {e}")
+            return
+
+        plan, docs, keys, returned = summarize_explain(result)
+        explained = entry._replace(plan=plan, docs_examined=docs, keys_examined=keys, returned=returned)
+        with self.lock:
+            # Replace the entry in place so the slowqueries command shows the plan
+            for index, existing in enumerate(self.entries):
+                if existing is entry:
+                    self.entries[index] = explained
+                    break
+
+        warning = " ⚠️ COLLSCAN" if "COLLSCAN" in plan else ""
+        print(f"   ↳ {plan}: examined {docs} docs / {keys} keys for {returned} returned{warning}")
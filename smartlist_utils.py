@@ -1,50 +1,66 @@
 """Utility functions for smartlist generation"""
 import config
+import species_registry
+
+# Smartlist categories
+REGULAR = 0
+RARE = 1
+GIGANTAMAX = 2
+MEGA = 3
+TRANSFORMABLE = 4
+HARD_TO_OBTAIN = 5
+
+
+def smartlist_category(name: str, rare_set, transformable_set, hard_to_obtain_set) -> int:
+    """Categorize one Pokemon name (first matching category wins)"""
+    name_lower = name.lower()
+
+    # Check Gigantamax first
+    if 'gigantamax' in name_lower:
+        return GIGANTAMAX
+    # Check if it's a Mega Pokemon (but not Meganium)
+    if name_lower.startswith('mega ') or (name_lower.startswith('mega') and name_lower != 'meganium'):
+        return MEGA
+    if name in transformable_set:
+        return TRANSFORMABLE
+    if name in hard_to_obtain_set:
+        return HARD_TO_OBTAIN
+    if name in rare_set:
+        return RARE
+    return REGULAR
+
+
+class SmartlistTable:
+    """
+    Precomputed smartlist lookup for every known form:
+    name -> (category, '--n name' fragment, has_gender_diff)
+    Built with the reference data snapshot, so config lists are read once per generation
+    """
 
+    def __init__(self, registry, config_module=config):
+        self.rare_set = frozenset(getattr(config_module, 'RARE_POKEMONS', ()))
+        self.transformable_set = frozenset(getattr(config_module, 'TRANSFORMABLE_POKEMONS', ()))
+        self.hard_to_obtain_set = frozenset(getattr(config_module, 'HARD_TO_OBTAIN_POKEMONS', ()))
 
-def categorize_pokemon(pokemon_names: list):
-    """Categorize Pokemon into different groups
+        self.entries = {
+            name: self._entry(name, bool(registry.flags[sid] & species_registry.GENDER_DIFF))
+            for sid, name in enumerate(registry.names)
+        }
 
-    Returns: (regular, rare, gigantamax, mega, transformable, hard_to_obtain)
-    """
-    regular = []
-    rare = []
-    gigantamax = []
-    mega = []
-    transformable = []
-    hard_to_obtain = []
-
-    # Get sets from config
-    rare_set = set(config.RARE_POKEMONS) if hasattr(config, 'RARE_POKEMONS') else set()
-    transformable_set = set(config.TRANSFORMABLE_POKEMONS) if hasattr(config, 'TRANSFORMABLE_POKEMONS') else set()
-    hard_to_obtain_set = set(config.HARD_TO_OBTAIN_POKEMONS) if hasattr(config, 'HARD_TO_OBTAIN_POKEMONS') else set()
-
-    for name in pokemon_names:
-        name_lower = name.lower()
-
-        # Check Gigantamax first
-        if 'gigantamax' in name_lower:
-            gigantamax.append(name)
-        # Check if it's a Mega Pokemon (but not Meganium)
-        elif name_lower.startswith('mega ') or (name_lower.startswith('mega') and name_lower != 'meganium'):
-            mega.append(name)
-        # Check if it's transformable
-        elif name in transformable_set:
-            transformable.append(name)
-        # Check if it's hard to obtain
-        elif name in hard_to_obtain_set:
-            hard_to_obtain.append(name)
-        # Check if it's rare
-        elif name in rare_set:
-            rare.append(name)
-        else:
-            regular.append(name)
+    def _entry(self, name: str, has_gender_diff: bool):
+        category = smartlist_category(name, self.rare_set, self.transformable_set, self.hard_to_obtain_set)
+        return category, f"--n {name.lower()}", has_gender_diff
 
-    return regular, rare, gigantamax, mega, transformable, hard_to_obtain
+    def lookup(self, name: str):
+        """(category, fragment, has_gender_diff) - unknown names are categorized on the fly"""
+        entry = self.entries.get(name)
+        if entry is None:
+            entry = self._entry(name, False)
+        return entry
 
 
 def build_smartlist_sections(pokemon_data: list, utils):
-    """Build smartlist sections from pokemon data
+    """Build smartlist sections from pokemon data in a single grouped pass
 
     Args:
         pokemon_data: list of tuples (name, gender_key, count)
@@ -53,77 +69,47 @@ def build_smartlist_sections(pokemon_data: list, utils):
     Returns:
         list of sections (strings) and total_count, gender_diff_count
     """
-    # Separate by gender difference status
-    no_gender_diff = []
-    male_gender_diff = []
-    female_gender_diff = []
+    lookup = utils.smartlist.lookup
+
+    # (gender bucket, category) -> preformatted fragments
+    groups = {}
+    gender_diff_species = set()
+    total_count = 0
 
     for name, gender_key, count in pokemon_data:
-        has_gender_diff = utils.has_gender_difference(name)
+        category, fragment, has_gender_diff = lookup(name)
 
         if has_gender_diff:
-            if gender_key == 'male':
-                male_gender_diff.append(name)
-            elif gender_key == 'female':
-                female_gender_diff.append(name)
+            # Count unique species with gender differences that appear in this list
+            gender_diff_species.add(name)
+            if gender_key not in ('male', 'female'):
+                continue
+            bucket = gender_key
         else:
-            no_gender_diff.append(name)
-
-    # Categorize each group
-    regular, rare, gigantamax, mega, transformable, hard_to_obtain = categorize_pokemon(no_gender_diff)
-    male_regular, male_rare, male_gmax, male_mega, male_transform, male_hard = categorize_pokemon(male_gender_diff)
-    female_regular, female_rare, female_gmax, female_mega, female_transform, female_hard = categorize_pokemon(female_gender_diff)
-
-    # Build the formatted output
-    sections = []
+            bucket = None
 
-    # Calculate total count based on actual entries in the list
-    total_count = len(no_gender_diff) + len(male_gender_diff) + len(female_gender_diff)
+        total_count += 1
+        groups.setdefault((bucket, category), []).append(fragment)
 
-    # Count unique species with gender differences that appear in this list
-    gender_diff_species = set()
-    for name, gender_key, count in pokemon_data:
-        if utils.has_gender_difference(name):
-            gender_diff_species.add(name)
     gender_diff_count = len(gender_diff_species)
 
-    # Helper function to format pokemon names to lowercase
-    def format_names(names):
-        return " ".join([f"--n {name.lower()}" for name in names])
-
     # Header
-    sections.append(f"**total pokemon: {total_count}** ({gender_diff_count} species with gender differences)\n")
-
-    # Regular Pokemon (no gender difference)
-    if regular:
-        sections.append(format_names(regular))
-
-    # Transformable Pokemon (no gender difference)
-    if transformable:
-        sections.append(format_names(transformable))
-
-    # Hard to Obtain Pokemon (no gender difference)
-    if hard_to_obtain:
-        sections.append(format_names(hard_to_obtain))
-
-    # Mega Pokemon (no gender difference)
-    if mega:
-        sections.append(format_names(mega))
-
-    # Male Gender Difference Pokemon (regular only)
-    if male_regular:
-        sections.append(format_names(male_regular) + " --g male")
-
-    # Female Gender Difference Pokemon (regular only)
-    if female_regular:
-        sections.append(format_names(female_regular) + " --g female")
-
-    # Rare Pokemon (no gender difference)
-    if rare:
-        sections.append(format_names(rare))
-
-    # Gigantamax Pokemon (no gender difference)
-    if gigantamax:
-        sections.append(format_names(gigantamax))
+    sections = [f"**total pokemon: {total_count}** ({gender_diff_count} species with gender differences)\n"]
+
+    # Section order; gender difference Pokemon are listed for the regular category only
+    section_order = (
+        ((None, REGULAR), ""),
+        ((None, TRANSFORMABLE), ""),
+        ((None, HARD_TO_OBTAIN), ""),
+        ((None, MEGA), ""),
+        (('male', REGULAR), " --g male"),
+        (('female', REGULAR), " --g female"),
+        ((None, RARE), ""),
+        ((None, GIGANTAMAX), ""),
+    )
+    for key, suffix in section_order:
+        fragments = groups.get(key)
+        if fragments:
+            sections.append(" ".join(fragments) + suffix)
 
     return sections, total_count, gender_diff_count
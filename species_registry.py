@@ -0,0 +1,313 @@
+"""
+Shared species registry
+
+Every known form name is interned to a compact integer ID, and per-form attributes
+live in array-backed columns indexed by that ID. Built once with the reference data
+snapshot and shared (read-only) by every cog.
+"""
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+
+import config
+
+# Flag bits (flags column)
+IN_SHINY_DEX = 1 << 0        # Listed in dex_number_updated.csv
+GENDER_DIFF = 1 << 1         # Shiny dex gender difference
+EVENT = 1 << 2               # Listed in event_pokemon.csv
+EVENT_GENDER_DIFF = 1 << 3   # Event gender difference
+RARE = 1 << 4                # config.RARE
+REGIONAL = 1 << 5            # Regional form prefix
+GMAX = 1 << 6                # Gigantamax form
+HAS_INFO = 1 << 7            # Has region/type info (pokemon_data.csv)
+
+# Column sentinels
+NO_DEX = -1
+NO_CDN = -1
+
+# Unknown (user-typed) names resolved per registry, least recently used evicted first
+UNKNOWN_NAME_CACHE_SIZE = 4096
+
+# Resolved form attributes (dex_number is 0 when neither the form nor its base species is known)
+FormInfo = namedtuple('FormInfo', ['base_species', 'dex_number', 'is_regional', 'is_gigantamax'])
+
+
+def base_species(name: str, prefixes=None) -> str:
+    """Strip the first form prefix (regional, Mega, Gigantamax, ...) from a name"""
+    for prefix in prefixes if prefixes is not None else config.BASE_SPECIES_PREFIXES:
+        if name.startswith(prefix):
+            name = name.replace(prefix, '', 1)
+            break  # Only remove first matching prefix
+    return name.strip()
+
+
+class SpeciesRegistry:
+    """Immutable, columnar species table keyed by interned integer IDs"""
+
+    def __init__(self, names, dex, cdn, region, type1, type2, egg, egg_mask, flags,
+                 regions, types, egg_group_names, egg_group_sets, listed_names,
+                 base, resolved_dex, base_names):
+        self.names = names                      # tuple: id -> name
+
+        self.dex = dex                          # array('i'): breeding/shiny dex number
+        self.cdn = cdn                          # array('i'): CDN image number
+        self.region = region                    # array('B'): index into regions
+        self.type1 = type1                      # array('B'): index into types
+        self.type2 = type2                      # array('B'): index into types
+        self.egg = egg                          # array('H'): index into egg_group_sets
+        self.egg_mask = egg_mask                # array('I'): bitmask over egg_group_names
+        self.flags = flags                      # array('B'): flag bits above
+        self.base = base                        # array('I'): index into base_names
+        self.resolved_dex = resolved_dex        # array('i'): own dex, else base species dex, else 0
+
+        self.regions = regions                  # tuple, index 0 = ''
+        self.types = types                      # tuple, index 0 = ''
+        self.egg_group_names = egg_group_names  # tuple of group names (bit order)
+        self.egg_group_sets = egg_group_sets    # tuple of tuples, index 0 = no entry
+        self.listed_names = listed_names        # tuple: data/pokemonnames.txt order
+        self.base_names = base_names            # tuple: names + base species not registered themselves
+
+        self._build_lookups()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __getstate__(self):
+        # Lookup tables are rebuilt on load, keeping the pickled snapshot small
+        state = self.__dict__.copy()
+        for key in ('ids', 'ids_lower', 'forms', '_resolve_unknown'):
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_lookups()
+
+    def _build_lookups(self):
+        """Name -> ID dicts, per-form FormInfo and the bounded unknown-name LRU"""
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.ids_lower = {}                     # lowercase name -> id (first wins)
+        for i, name in enumerate(self.names):
+            self.ids_lower.setdefault(name.lower(), i)
+
+        self.forms = tuple(
+            FormInfo(
+                self.base_names[self.base[sid]],
+                self.resolved_dex[sid],
+                bool(self.flags[sid] & REGIONAL),
+                bool(self.flags[sid] & GMAX)
+            )
+            for sid in range(len(self.names))
+        )
+        self._resolve_unknown = lru_cache(maxsize=UNKNOWN_NAME_CACHE_SIZE)(self._compute_form_info)
+
+    # ===== LOOKUPS =====
+
+    def id_of(self, name: str):
+        """Interned ID for an exact name, or None"""
+        return self.ids.get(name)
+
+    def id_of_lower(self, name: str):
+        """Interned ID for a case-insensitive name, or None"""
+        return self.ids_lower.get(name.lower())
+
+    def has_flag(self, name: str, flag: int) -> bool:
+        """Check a flag bit for a name (False for unknown names)"""
+        sid = self.ids.get(name)
+        return sid is not None and bool(self.flags[sid] & flag)
+
+    def dex_number(self, name: str):
+        """Dex number for an exact name, or None when unknown"""
+        sid = self.ids.get(name)
+        if sid is None or self.dex[sid] == NO_DEX:
+            return None
+        return self.dex[sid]
+
+    def egg_groups(self, name: str):
+        """Egg groups tuple for an exact name, or None when there is no entry"""
+        sid = self.ids.get(name)
+        if sid is None or not self.egg[sid]:
+            return None
+        return self.egg_group_sets[self.egg[sid]]
+
+    def egg_group_mask(self, name: str) -> int:
+        """Egg group bitmask for an exact name (0 when there is no entry)"""
+        sid = self.ids.get(name)
+        return self.egg_mask[sid] if sid is not None else 0
+
+    def info(self, name: str):
+        """Region/type info dict for a name, or None"""
+        sid = self.ids.get(name)
+        if sid is None or not self.flags[sid] & HAS_INFO:
+            return None
+        return {
+            'region': self.regions[self.region[sid]],
+            'type1': self.types[self.type1[sid]],
+            'type2': self.types[self.type2[sid]]
+        }
+
+    def resolve(self, name: str) -> FormInfo:
+        """
+        Base species, dex number, regional and gigantamax flags for any name
+        Known forms are precomputed; unknown names go through a size-bounded LRU
+        """
+        sid = self.ids.get(name)
+        if sid is not None:
+            return self.forms[sid]
+        return self._resolve_unknown(name)
+
+    def _compute_form_info(self, name: str) -> FormInfo:
+        base_name = base_species(name)
+        dex_num = self.dex_number(base_name)
+        return FormInfo(
+            base_name,
+            dex_num if dex_num is not None else 0,
+            name.startswith(config.REGIONAL_PREFIXES),
+            'Gigantamax' in name
+        )
+
+    def cdn_number(self, name: str):
+        """CDN number for a case-insensitive name, or None"""
+        sid = self.ids_lower.get(name.lower())
+        if sid is None or self.cdn[sid] == NO_CDN:
+            return None
+        return self.cdn[sid]
+
+
+def _intern(values, seed=('',)):
+    """Build a value -> index table (index 0 reserved for the seed/empty value)"""
+    table = list(seed)
+    index = {value: i for i, value in enumerate(table)}
+    for value in values:
+        if value not in index:
+            index[value] = len(table)
+            table.append(value)
+    return tuple(table), index
+
+
+def build_registry(data: dict, listed_names: list, config_module=config) -> SpeciesRegistry:
+    """
+    Build the registry from parsed reference data
+    data: dict from reference_data parsers (dex_numbers, dex_data, pokemon_info,
+          event_data, egg_groups, pokemon_cdn_mapping)
+    config_module: where RARE / REGIONAL_PREFIXES / BASE_SPECIES_PREFIXES are read
+                   (a not-yet-installed copy of config during a hot reload)
+    """
+    dex_numbers = data['dex_numbers']
+    dex_data = data['dex_data']
+    pokemon_info = data['pokemon_info']
+    event_data = data['event_data']
+    egg_groups = data['egg_groups']
+    cdn_mapping = data['pokemon_cdn_mapping']
+
+    # Intern every name seen in any source (insertion order keeps IDs stable per build)
+    ordered = {}
+    for source in (dex_data, dex_numbers, pokemon_info, event_data, egg_groups, listed_names):
+        for name in source:
+            ordered.setdefault(name, None)
+
+    # CDN mapping is keyed by lowercase name; names only known to it are interned as-is
+    lower_to_name = {}
+    for name in ordered:
+        lower_to_name.setdefault(name.lower(), name)
+    for lower_name in cdn_mapping:
+        if lower_name not in lower_to_name:
+            lower_to_name[lower_name] = lower_name
+            ordered[lower_name] = None
+
+    names = tuple(ordered)
+    name_ids = {name: i for i, name in enumerate(names)}
+
+    regions, region_index = _intern(info['region'] for info in pokemon_info.values())
+    types, type_index = _intern(
+        t for info in pokemon_info.values() for t in (info['type1'], info['type2'])
+    )
+    egg_group_names = tuple(sorted({g for groups in egg_groups.values() for g in groups}))
+    egg_bit = {group: 1 << i for i, group in enumerate(egg_group_names)}
+    egg_group_sets, egg_set_index = _intern(
+        (tuple(groups) for groups in egg_groups.values()), seed=((),)
+    )
+
+    size = len(names)
+    dex = array('i', [NO_DEX]) * size
+    cdn = array('i', [NO_CDN]) * size
+    region = array('B', [0]) * size
+    type1 = array('B', [0]) * size
+    type2 = array('B', [0]) * size
+    egg = array('H', [0]) * size
+    egg_mask = array('I', [0]) * size
+    flags = array('B', [0]) * size
+
+    for sid, name in enumerate(names):
+        flag = 0
+
+        # Same precedence as Utils.get_dex_number: breeding CSV first, then shiny dex
+        if name in dex_numbers:
+            dex[sid] = dex_numbers[name]
+        elif name in dex_data:
+            dex[sid] = dex_data[name]['dex_number']
+
+        if name in dex_data:
+            flag |= IN_SHINY_DEX
+            if dex_data[name]['has_gender_diff']:
+                flag |= GENDER_DIFF
+
+        if name in event_data:
+            flag |= EVENT
+            if event_data[name]['has_gender_diff']:
+                flag |= EVENT_GENDER_DIFF
+
+        info = pokemon_info.get(name)
+        if info is not None:
+            flag |= HAS_INFO
+            region[sid] = region_index[info['region']]
+            type1[sid] = type_index[info['type1']]
+            type2[sid] = type_index[info['type2']]
+
+        groups = egg_groups.get(name)
+        if groups:
+            egg[sid] = egg_set_index[tuple(groups)]
+            mask = 0
+            for group in groups:
+                mask |= egg_bit[group]
+            egg_mask[sid] = mask
+
+        if name in config_module.RARE:
+            flag |= RARE
+        if name.startswith(config_module.REGIONAL_PREFIXES):
+            flag |= REGIONAL
+        if 'Gigantamax' in name:
+            flag |= GMAX
+
+        flags[sid] = flag
+
+    for lower_name, number in cdn_mapping.items():
+        cdn[name_ids[lower_to_name[lower_name]]] = number
+
+    # Base species and resolved dex number (same rules as Utils.get_dex_number)
+    base_names = list(names)
+    base_ids = dict(name_ids)
+    base = array('I', [0]) * size
+    resolved_dex = array('i', [0]) * size
+    for sid, name in enumerate(names):
+        base_name = base_species(name, config_module.BASE_SPECIES_PREFIXES)
+        if base_name not in base_ids:
+            base_ids[base_name] = len(base_names)
+            base_names.append(base_name)
+        base[sid] = base_ids[base_name]
+
+        if dex[sid] != NO_DEX:
+            resolved_dex[sid] = dex[sid]
+        else:
+            base_sid = name_ids.get(base_name)
+            if base_sid is not None and dex[base_sid] != NO_DEX:
+                resolved_dex[sid] = dex[base_sid]
+
+    return SpeciesRegistry(
+        names, dex, cdn, region, type1, type2, egg, egg_mask, flags,
+        regions, types, egg_group_names, egg_group_sets, tuple(listed_names),
+        base, resolved_dex, tuple(base_names)
+    )
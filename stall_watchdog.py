@@ -0,0 +1,125 @@
+"""
+Event loop stall watchdog
+
+A heartbeat task stamps the time every HEARTBEAT_INTERVAL. A daemon thread checks the
+stamp; when the loop has not run for longer than the threshold it samples the loop
+thread's stack (sys._current_frames), so the blocking function is caught while it is
+still running. When the loop resumes, the stall is recorded with its real duration.
+
+Recent stalls are kept for the owner-only stalls command and counted in metrics.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque, namedtuple
+from datetime import datetime, timezone
+import metrics
+
+HEARTBEAT_INTERVAL = 0.05  # Seconds between loop heartbeats
+HISTORY_SIZE = 50          # Recent stalls kept in memory
+STACK_DEPTH = 12           # Frames kept per stall
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# culprit/entry: "file.py:line in function" (innermost / outermost frame in this project)
+Stall = namedtuple('Stall', ['when', 'duration', 'culprit', 'entry', 'stack'])
+
+
+def _is_project_frame(frame_summary) -> bool:
+    filename = os.path.abspath(frame_summary.filename)
+    return filename.startswith(PROJECT_ROOT) and 'site-packages' not in filename
+
+
+def _describe(frame_summary) -> str:
+    if _is_project_frame(frame_summary):
+        filename = os.path.relpath(frame_summary.filename, PROJECT_ROOT)
+    else:
+        filename = os.path.basename(frame_summary.filename)
+    return f"{filename}:{frame_summary.lineno} in {frame_summary.name}"
+
+
+class StallWatchdog:
+    """Detects event loop stalls and captures what was running"""
+
+    def __init__(self, threshold_ms: int = 250):
+        self.threshold = threshold_ms / 1000
+        self.stalls = deque(maxlen=HISTORY_SIZE)
+        self.loop = None
+        self.loop_thread_id = None
+        self.heartbeat_task = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+        self.last_beat = time.monotonic()
+        self.lock = threading.Lock()
+        self.pending = None  # (wall time, stack) captured by the watcher for the current stall
+
+    # ===== LIFECYCLE =====
+
+    def start(self):
+        """Start watching the running loop (call from the loop thread)"""
+        if self.thread is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.heartbeat_task = self.loop.create_task(self._heartbeat())
+        self.thread = threading.Thread(target=self._watch, name='stall-watchdog', daemon=True)
+        self.thread.start()
+        print(f"🐕 Stall watchdog started (threshold {self.threshold * 1000:.0f}ms)")
+
+    def stop(self):
+        self.stopping.set()
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+            self.heartbeat_task = None
+        self.thread = None
+
+    def recent(self, limit: int = 10):
+        """Most recent stalls, newest first"""
+        return list(self.stalls)[::-1][:limit]
+
+    # ===== LOOP SIDE =====
+
+    async def _heartbeat(self):
+        while True:
+            now = time.monotonic()
+            gap = now - self.last_beat
+            self.last_beat = now
+
+            with self.lock:
+                pending, self.pending = self.pending, None
+            if pending is not None:
+                self._record(pending, max(0.0, gap - HEARTBEAT_INTERVAL))
+
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    def _record(self, pending, duration: float):
+        when, stack = pending
+        project_frames = [frame for frame in stack if _is_project_frame(frame)]
+        culprit = _describe(project_frames[-1] if project_frames else stack[-1]) if stack else "unknown"
+        entry = _describe(project_frames[0]) if project_frames else culprit
+
+        stall = Stall(when, duration, culprit, entry, [_describe(frame) for frame in stack[-STACK_DEPTH:]])
+        self.stalls.append(stall)
+        metrics.LOOP_STALLS.inc(culprit)
+        print(f"🐢 Event loop stalled {duration * 1000:.0f}ms in {culprit} (entered via {entry})")
+
+    # ===== WATCHER THREAD =====
+
+    def _watch(self):
+        captured_beat = None
+        while not self.stopping.wait(self.threshold / 4):
+            beat = self.last_beat
+            if beat == captured_beat or time.monotonic() - beat < self.threshold:
+                continue
+
+            # Loop is blocked right now: sample what it is running
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = traceback.extract_stack(frame) if frame is not None else []
+            with self.lock:
+                self.pending = (datetime.now(timezone.utc), stack)
+            captured_beat = beat
@@ -0,0 +1,129 @@
+"""
+Staged bot startup, run once from setup_hook
+
+Stage 1 runs concurrently: MongoDB connection + index verification, the reference data
+snapshot load and imports of the heavy modules the cogs share (both in worker threads).
+Cog modules themselves are not pre-imported: load_extension always re-executes them.
+Stage 2 registers the cogs (reference data is already in memory, so Utils binds it instantly).
+Stage 3 syncs slash commands only when the command tree hash differs from the last sync
+(in cluster mode only cluster 0 syncs).
+
+on_ready fires again after every gateway reconnect; none of this runs there.
+"""
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import time
+from database import db
+import reference_data
+
+# Heavy non-cog modules the cogs import; warming them in a thread keeps load_extension fast
+SHARED_MODULES = ("PIL.Image", "PIL.ImageDraw", "PIL.ImageFont", "aiohttp", "dex_image_generator")
+
+# bot_meta key holding the last synced command tree hash (per application)
+COMMAND_TREE_HASH_KEY = "command_tree_hash:{application_id}"
+
+
+class StageTimer:
+    """Collects per-stage wall times for the startup summary"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []  # (name, ms)
+
+    async def run(self, name: str, coro):
+        """Await coro as a named stage and record how long it took"""
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stages.append((name, elapsed))
+            print(f"⏱️ {name}: {elapsed:.0f}ms")
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def summary(self) -> str:
+        return ", ".join(f"{name} {ms:.0f}ms" for name, ms in self.stages)
+
+
+def _import_modules(modules):
+    """Import shared modules ahead of load_extension (they stay cached in sys.modules)"""
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            # load_extension reports the real error for the cog that needs it later
+            print(f"⚠️ Pre-import failed for {module}: {e}")
+
+
+def command_tree_hash(tree) -> str:
+    """Stable hash of the global application command payload"""
+    payload = []
+    for command in tree.get_commands():
+        try:
+            payload.append(command.to_dict(tree))
+        except TypeError:
+            payload.append(command.to_dict())  # discord.py < 2.4
+    payload.sort(key=lambda c: (c.get('type', 1), c['name']))
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+async def sync_command_tree(bot, force: bool = False):
+    """
+    Sync slash commands only when the tree changed since the last successful sync
+    Set FORCE_COMMAND_SYNC=1 (or pass force) to always sync
+    Returns: number of synced commands, or None when the sync was skipped
+    """
+    key = COMMAND_TREE_HASH_KEY.format(application_id=bot.application_id)
+    tree_hash = command_tree_hash(bot.tree)
+    force = force or os.getenv("FORCE_COMMAND_SYNC", "").lower() in ("1", "true", "yes")
+
+    if not force and await db.get_meta(key) == tree_hash:
+        print(f"✅ Slash commands unchanged ({tree_hash[:12]}), skipping sync")
+        return None
+
+    synced = await bot.tree.sync()
+    await db.set_meta(key, tree_hash)
+    print(f"✅ Synced {len(synced)} slash commands ({tree_hash[:12]})")
+    return len(synced)
+
+
+async def run_startup(bot, cogs, extensions=(), sync_commands: bool = True):
+    """
+    Run the startup pipeline; returns the StageTimer with per-stage timings
+    sync_commands: False skips stage 3 (cluster workers other than cluster 0)
+    """
+    timer = StageTimer()
+
+    # ===== STAGE 1: I/O and CPU-heavy loading in parallel =====
+    await timer.run("prepare", asyncio.gather(
+        timer.run("database", db.connect()),
+        timer.run("reference data", asyncio.to_thread(reference_data.load_reference_data)),
+        timer.run("shared imports", asyncio.to_thread(_import_modules, SHARED_MODULES))
+    ))
+
+    # ===== STAGE 2: Register cogs =====
+    async def load_extensions():
+        for name in list(cogs) + list(extensions):
+            try:
+                await bot.load_extension(name)
+                print(f'✅ Loaded extension: {name}')
+            except Exception as e:
+                print(f'❌ Failed to load extension {name}: {e}')
+
+    await timer.run("cogs", load_extensions())
+
+    # ===== STAGE 3: Slash commands =====
+    if sync_commands:
+        try:
+            await timer.run("command sync", sync_command_tree(bot))
+        except Exception as e:
+            print(f'❌ Failed to sync commands: {e}')
+
+    print(f"🚀 Startup pipeline finished in {timer.elapsed_ms():.0f}ms ({timer.summary()})")
+    return timer